@@ -0,0 +1,578 @@
+# -*- coding: utf-8 -*-
+"""
+Тексты ответов для режимов бота — без зависимости от telegram.
+Каждый режим разбит на три шага:
+  parse   — токены строки → аргументы расчёта или текст ошибки;
+  compute — все аргументы пачкой через *_batch из calc;
+  render  — аргументы + результат → текст ответа.
+Одно сообщение — это пачка из одной строки, поэтому многострочный ввод и обычный
+идут по одному коду и дают одинаковые ответы.
+"""
+import math
+from typing import Callable, Dict, List, Sequence, Tuple, Union
+
+from calc import (
+    DEFAULT_RIEGEL_EXP, format_seconds_to_hhmmss, km_to_miles, km_to_m,
+    pace_to_sec_per_km, sec_per_km_to_sec_per_mile,
+    distance_by_time_batch, hr_at_percent_batch, pace_by_time_batch, pace_to_speed_batch,
+    riegel_batch, speed_to_pace_batch, time_by_pace_batch,
+)
+from calc.lexer import (
+    PACE, SPEED, TIME, NUM, RANGE, ARROW, SEP, WORD, Token,
+    split_tokens, find_keyed, as_distance_km, as_seconds, as_pace,
+)
+from calc.errors import InputError
+from calc.fit import EXP_MAX, EXP_MIN, fit_riegel, predict_riegel_batch
+from calc.splits import MAX_ROWS, STANDARD_DISTANCES, lap_splits, pace_range, range_splits, standard_splits
+from calc.units import SPEED_UNIT_MPS
+from calc.zones import HRMAX, KARVONEN, LTHR, zone_lines
+
+MESSAGE_LIMIT = 4096  # максимальная длина сообщения Telegram
+
+
+def _single(group):
+    """Единственный токен группы или None."""
+    return group[0] if len(group) == 1 else None
+
+def _fmt(seconds) -> str:
+    return format_seconds_to_hhmmss(float(seconds))
+
+
+# -------------------- % ПУЛЬСА И ЗОНЫ --------------------
+HR_FORMAT = "Формат: HRmax[, проценты][, покой=…] или пано=… (напр. 196, 72-83 | 196, покой=55 | пано=172)"
+ZONE_TITLES = {
+    HRMAX: "Зоны по % от HRmax {value:g}:",
+    KARVONEN: "Зоны по Карвонену (HRmax {value:g}, покой {rest:g}):",
+    LTHR: "Зоны по ПАНО {value:g} уд/мин (Фрил):",
+}
+
+def _keyed_value(tokens: List[Token], key: str):
+    """Значение «ключ=число» (None — ключа нет, False — значение не число > 0)."""
+    tok = find_keyed(tokens, key)
+    if tok is None:
+        return None
+    return tok.value if tok.kind == NUM and not tok.unit and tok.value > 0 else False
+
+def _strip_name(tokens: List[Token]) -> List[Token]:
+    """Подпись спортсмена в начале строки («Иванов: 196, покой=55», «Спортсмен 3: 180») —
+    всё до первого слова с двоеточием, если среди слов подписи есть буквы. Без двоеточия строка не трогается.
+    Смотрит только на слова (у WORD значение и есть текст): ключ кэша ответов исходного текста не содержит."""
+    for i, tok in enumerate(tokens):
+        if tok.kind == SEP or tok.key:
+            break
+        if tok.kind == WORD and tok.value.endswith(":"):
+            if any(ch.isalpha() for t in tokens[:i + 1] if t.kind == WORD for ch in t.value):
+                return tokens[i + 1:]
+            break
+    return tokens
+
+def _parse_hr(tokens: List[Token]):
+    tokens = _strip_name(tokens)
+    rest, lthr = _keyed_value(tokens, "rest"), _keyed_value(tokens, "lthr")
+    if rest is False:
+        return "Пульс покоя не распознан (покой=55)."
+    if lthr is False:
+        return "ПАНО не распознан (пано=172)."
+    keyed = find_keyed(tokens, "hrmax")
+    groups = [g for g in split_tokens([t for t in tokens if not t.key]) if g]
+    if lthr is not None:
+        if groups or keyed or rest is not None:
+            return "Для зон по ПАНО нужен только пульс на пороге: пано=172."
+        return "zones", LTHR, lthr, None
+    if keyed is not None:
+        groups.insert(0, [keyed])
+    if not groups:
+        return HR_FORMAT
+
+    hr_tok = _single(groups[0])
+    hrmax = hr_tok.value if hr_tok is not None and hr_tok.kind == NUM else None
+    if hrmax is None or hrmax <= 0:
+        return "Не удалось распознать HRmax (>0)."
+    if rest is not None and rest >= hrmax:
+        return "Пульс покоя должен быть меньше HRmax."
+    if len(groups) == 1:
+        return "zones", KARVONEN if rest is not None else HRMAX, hrmax, rest
+
+    pct_tok = _single(groups[1])
+    if pct_tok is not None and pct_tok.kind == RANGE:
+        p1, p2 = pct_tok.value
+        return "percent", hrmax, p1, p2, rest
+    if pct_tok is not None and pct_tok.kind == NUM:
+        return "percent", hrmax, pct_tok.value, None, rest
+    # диапазон с лишним («72-83 x», «72–83 x») или дефис в слове («70-x») — по виду токена, не по тексту
+    if any(t.kind == RANGE or (t.kind == WORD and "-" in t.value) for t in groups[1]):
+        return "Проблема с процентами. Пример: 72-83."
+    return "Процент не распознан."
+
+def _compute_hr(jobs):
+    """Проценты — пакетом (по Карвонену — от резерва плюс покой), зоны — из таблиц calc.zones."""
+    out = [None] * len(jobs)
+    idx = [i for i, j in enumerate(jobs) if j[0] == "percent"]
+    if idx:
+        pct = [jobs[i] for i in idx]
+        rest = [0.0 if j[4] is None else j[4] for j in pct]
+        base = [j[1] - r for j, r in zip(pct, rest)]
+        low = hr_at_percent_batch(base, [j[2] if j[3] is None else min(j[2], j[3]) for j in pct])
+        high = hr_at_percent_batch(base, [j[2] if j[3] is None else max(j[2], j[3]) for j in pct])
+        for i, r, lo, hi in zip(idx, rest, low, high):
+            out[i] = (float(lo) + r, float(hi) + r) if r else (lo, hi)
+    for i, j in enumerate(jobs):
+        if j[0] == "zones":
+            out[i] = zone_lines(j[1], j[2], j[3])
+    return out
+
+def _render_hr(job, result) -> str:
+    if job[0] == "zones":
+        _, model, value, rest = job
+        return ZONE_TITLES[model].format(value=value, rest=rest) + "\n" + result
+    _, hrmax, p1, p2, rest = job
+    low, high = (int(round(float(x))) for x in result)
+    if rest is not None:
+        # по Карвонену: проценты от резерва ЧСС
+        if p2 is None:
+            return f"{p1:.0f}% резерва ЧСС = {low} уд/мин (HRmax {hrmax:g}, покой {rest:g})."
+        return f"Диапазон: {low}–{high} уд/мин ({p1:.0f}–{p2:.0f}% резерва ЧСС; HRmax {hrmax:g}, покой {rest:g})."
+    if p2 is None:
+        return f"{p1:.0f}% от {hrmax:.0f} = {low} уд/мин."
+    return f"Диапазон: {low}–{high} уд/мин (из {p1:.0f}–{p2:.0f}% от {hrmax:.0f})."
+
+
+# -------------------- ВРЕМЯ ПО ТЕМПУ --------------------
+def _parse_time_by_pace(tokens: List[Token]):
+    groups = split_tokens(tokens)
+    if len(groups) == 1 and len(groups[0]) == 2:  # «10км 4:00» без запятой
+        groups = [groups[0][:1], groups[0][1:]]
+    if len(groups) < 2:
+        return "Формат: дистанция, темп (например 1000м, 4:00)"
+
+    dist_km = as_distance_km(_single(groups[0]))
+    if dist_km is None:
+        return "Дистанция не распознана."
+
+    pace = as_pace(_single(groups[1]))
+    if pace is None:
+        return "Темп не распознан (ожидал m:ss[/км|/mi])."
+    return dist_km, pace_to_sec_per_km(*pace)
+
+def _compute_time_by_pace(jobs):
+    return time_by_pace_batch([j[0] for j in jobs], [j[1] for j in jobs])
+
+def _render_time_by_pace(job, time_sec) -> str:
+    return f"Время: {_fmt(time_sec)}"
+
+
+# -------------------- РАСКЛАДКА --------------------
+_DEFAULT_STEP = 5       # шаг диапазона темпов, сек
+_DEFAULT_LAPS = 10      # кругов, если дистанция не указана
+
+def _lap_km(tok):
+    """Длина круга: с единицами — как дистанция, число без единиц — метры."""
+    if tok is not None and tok.kind == NUM and not tok.unit:
+        return tok.value / 1000.0
+    return as_distance_km(tok)
+
+def _pace_label(sec_per_km: float) -> str:
+    return f"{_fmt(sec_per_km)}/км ({_fmt(sec_per_km_to_sec_per_mile(sec_per_km))}/mi)"
+
+def _parse_splits(tokens: List[Token]):
+    free = [t for t in tokens if not t.key]
+    pace_tok = find_keyed(tokens, "pace") or next((t for t in free if t.kind in (PACE, RANGE)), None)
+
+    if pace_tok is not None and pace_tok.kind == RANGE:
+        if pace_tok.unit not in ("/km", "/mi"):
+            return "Диапазон темпов: 3:30-5:00 или 6:00-7:00/mi."
+        step = as_seconds(find_keyed(tokens, "step")) or _DEFAULT_STEP
+        try:
+            paces = pace_range(*pace_tok.value, step)
+        except InputError as e:
+            return f"Ошибка: {e}"
+        if paces[-1] <= 0 or paces[0] <= 0:
+            return "Ошибка: Темп должен быть > 0."
+        return "range", tuple(paces), pace_tok.unit
+
+    dist_tok = find_keyed(tokens, "dist") or next((t for t in free if as_distance_km(t) is not None), None)
+    dist_km = as_distance_km(dist_tok)
+    time_tok = find_keyed(tokens, "time") or (next((t for t in free if t.kind == TIME), None) if dist_km else None)
+    goal_sec = as_seconds(time_tok)
+    if pace_tok is None and dist_km is None:
+        pace_tok = next((t for t in free if t.kind == TIME), None)
+    pace = as_pace(pace_tok)
+
+    if pace is not None:
+        sec_per_km = pace_to_sec_per_km(*pace)
+        goal_sec = None
+    elif dist_km is not None and goal_sec is not None:
+        if dist_km <= 0:
+            return "Ошибка: Дистанция должна быть > 0."
+        sec_per_km = goal_sec / dist_km
+    else:
+        return "Укажите темп (4:00, 6:30/mi), цель (21.1км, 1:30:00) или диапазон (3:30-5:00, шаг=5)."
+    if sec_per_km <= 0:
+        return "Ошибка: Темп должен быть > 0."
+
+    lap_tok = find_keyed(tokens, "lap")
+    if lap_tok is not None:
+        lap_km = _lap_km(lap_tok)
+        if lap_km is None or lap_km <= 0:
+            return "Длина круга не распознана (например круг=400 или круг=1км)."
+        total_km = dist_km or lap_km * _DEFAULT_LAPS
+        if total_km / lap_km > MAX_ROWS:
+            return f"Слишком много кругов, максимум {MAX_ROWS}."
+        return "laps", sec_per_km, lap_km, total_km
+    return "table", sec_per_km, goal_sec, dist_km
+
+def _compute_splits(jobs):
+    out = []
+    for job in jobs:
+        kind = job[0]
+        if kind == "table":
+            out.append(standard_splits(job[1]))
+        elif kind == "laps":
+            out.append(lap_splits(*job[1:]))
+        else:
+            out.append(None)
+    # все диапазоны сообщения — одной сеткой
+    range_idx = [i for i, j in enumerate(jobs) if j[0] == "range"]
+    if range_idx:
+        paces = [pace_to_sec_per_km(p, jobs[i][2]) for i in range_idx for p in jobs[i][1]]
+        rows = iter(range_splits(paces))
+        for i in range_idx:
+            out[i] = [next(rows) for _ in jobs[i][1]]
+    return out
+
+def _render_splits(job, result) -> str:
+    kind = job[0]
+    if kind == "table":
+        _, sec_per_km, goal_sec, dist_km = job
+        head = f"Темп {_pace_label(sec_per_km)}"
+        if goal_sec is not None:
+            head = f"Цель {_fmt(goal_sec)} на {dist_km:.3f} км → {head.lower()}"
+        return "\n".join([head] + [f"• {name} — {t}" for (name, _), t in zip(STANDARD_DISTANCES, result)])
+    if kind == "laps":
+        _, sec_per_km, lap_km, _ = job
+        marks, times = result
+        lines = [f"Темп {_pace_label(sec_per_km)}, круг {km_to_m(lap_km):.0f} м — {_fmt(sec_per_km * lap_km)}"]
+        lines += [f"{i}) {km_to_m(m):.0f} м — {_fmt(t)}" for i, (m, t) in enumerate(zip(marks, times), 1)]
+        return "\n".join(lines)
+    _, paces, unit = job
+    label = "км" if unit == "/km" else "mi"
+    return "\n".join(
+        f"{_fmt(p)}/{label}: " + " · ".join(f"{name} {t}" for (name, _), t in zip(STANDARD_DISTANCES, row))
+        for p, row in zip(paces, result)
+    )
+
+
+# -------------------- КАЛЬКУЛЯТОР --------------------
+def _parse_calc(tokens: List[Token]):
+    free = [t for t in tokens if not t.key]
+
+    dist_tok = find_keyed(tokens, "dist") or next((t for t in free if as_distance_km(t) is not None), None)
+    pace_tok = find_keyed(tokens, "pace") or next((t for t in free if t.kind == PACE), None)
+    time_tok = find_keyed(tokens, "time") or next((t for t in free if t.kind == TIME), None)
+
+    dist_km = as_distance_km(dist_tok)
+    pace = as_pace(pace_tok)
+    sec_per_km = pace_to_sec_per_km(*pace) if pace else None
+    time_sec = as_seconds(time_tok)
+
+    known = sum(x is not None for x in (dist_km, sec_per_km, time_sec))
+    if known < 2:
+        return "Нужно указать любые ДВА параметра из: дистанция, темп, время."
+    if dist_km is None:
+        if sec_per_km <= 0:
+            return "Ошибка: Темп должен быть > 0."
+        return "dist", time_sec, sec_per_km
+    if sec_per_km is None:
+        if dist_km <= 0:
+            return "Ошибка: Дистанция должна быть > 0."
+        return "pace", time_sec, dist_km
+    # известно время или все три — пересчитываем время по дистанции и темпу
+    return "time", dist_km, sec_per_km
+
+_CALC_BATCH = {"dist": distance_by_time_batch, "pace": pace_by_time_batch, "time": time_by_pace_batch}
+
+def _compute_calc(jobs):
+    out = [None] * len(jobs)
+    for what, fn in _CALC_BATCH.items():
+        idx = [i for i, j in enumerate(jobs) if j[0] == what]
+        if idx:
+            for i, r in zip(idx, fn([jobs[i][1] for i in idx], [jobs[i][2] for i in idx])):
+                out[i] = r
+    return out
+
+def _render_calc(job, value) -> str:
+    what = job[0]
+    value = float(value)
+    if what == "dist":
+        return f"Дистанция: {value:.3f} км ({int(round(km_to_m(value)))} м, {km_to_miles(value):.3f} mi)"
+    if what == "pace":
+        return f"Темп: {_fmt(value)}/км  |  {_fmt(sec_per_km_to_sec_per_mile(value))}/mi"
+    return f"Время: {_fmt(value)}"
+
+
+# -------------------- РИГЕЛЬ --------------------
+def _parse_riegel(tokens: List[Token]):
+    sides = split_tokens(tokens, ARROW)
+    if len(sides) < 2:
+        return "Ожидал формат: dist1, time1 -> dist2[, exp=x.xx]"
+
+    left = split_tokens(sides[0])
+    if len(left) == 1 and len(left[0]) == 2:  # «10км 41:30» без запятой
+        left = [left[0][:1], left[0][1:]]
+    if len(left) < 2:
+        return "Слева укажите 'дистанция, время' (например '10км, 41:30')."
+    d1_km = as_distance_km(_single(left[0]))
+    if d1_km is None:
+        return "Первая дистанция не распознана."
+    t1 = as_seconds(_single(left[1]))
+    if t1 is None:
+        return "Время слева не распознано."
+
+    d2_km = as_distance_km(_single(split_tokens(sides[1])[0]))
+    if d2_km is None:
+        return "Целевая дистанция не распознана."
+    if d1_km <= 0 or d2_km <= 0:
+        return "Ошибка: Дистанции должны быть > 0."
+
+    exp = DEFAULT_RIEGEL_EXP
+    exp_tok = find_keyed(sides[1], "exp")
+    if exp_tok is not None and exp_tok.kind == NUM and 0.9 <= exp_tok.value <= 1.2:
+        exp = exp_tok.value
+    return t1, d1_km, d2_km, exp
+
+def _compute_riegel(jobs):
+    d2 = [j[2] for j in jobs]
+    t2 = riegel_batch([j[0] for j in jobs], [j[1] for j in jobs], d2, [j[3] for j in jobs])
+    return list(zip(t2, pace_by_time_batch(t2, d2)))
+
+def _render_riegel(job, result) -> str:
+    t2, pace_per_km = result
+    return (
+        "Прогноз:\n"
+        f"• Время: {_fmt(t2)}\n"
+        f"• Темп: {_fmt(pace_per_km)}/км  |  {_fmt(sec_per_km_to_sec_per_mile(float(pace_per_km)))}/mi\n"
+        f"(exp={job[3]:.2f})"
+    )
+
+
+# -------------------- ЛИЧНЫЙ ПОКАЗАТЕЛЬ РИГЕЛЯ --------------------
+# цели по умолчанию — стандартные дистанции от 1 км
+_FIT_TARGETS = tuple((name, km) for name, km in STANDARD_DISTANCES if km >= 1)
+
+def _dist_label(tok: Token) -> str:
+    """Подпись дистанции по разобранному значению, а не по тексту: ключ кэша ответов текста не содержит,
+    и «15km» и «15 км» должны получить один и тот же ответ."""
+    if tok.unit == "m":
+        return f"{round(km_to_m(tok.value), 3):g} м"
+    if tok.unit == "mi":
+        return f"{round(km_to_miles(tok.value), 6):g} mi"
+    return f"{tok.value:g} км"
+
+def _parse_riegel_fit(tokens: List[Token]):
+    sides = split_tokens(tokens, ARROW)
+    values = [t for t in sides[0] if t.kind != SEP]
+    if len(values) < 4 or len(values) % 2:
+        return "Формат: '5км 19:00, 10км 40:00, 21.1км 1:28:00 -> 42.195км, 30км' (не меньше двух результатов)."
+    dists, times = [], []
+    for dist_tok, time_tok in zip(values[::2], values[1::2]):
+        d, t = as_distance_km(dist_tok), as_seconds(time_tok)
+        if d is None or t is None or not math.isfinite(d):
+            return f"Результат не распознан (пара №{len(dists) + 1})."
+        if d <= 0 or t <= 0:
+            return "Ошибка: Дистанции и время должны быть > 0."
+        dists.append(d); times.append(t)
+    if len(set(dists)) < 2:
+        return "Нужны результаты хотя бы на двух разных дистанциях."
+    # подбор — здесь, до прогноза: неправдоподобный показатель — ошибка этой строки, а не всей пачки
+    fit = fit_riegel(dists, times)
+    if not EXP_MIN <= fit.exp <= EXP_MAX:
+        return (f"Ошибка: показатель exp={fit.exp:.3g} вне правдоподобного диапазона {EXP_MIN:g}–{EXP_MAX:g} — "
+                "проверьте результаты.")
+
+    if len(sides) < 2:
+        targets = _FIT_TARGETS
+    else:
+        targets = []
+        for tok in sides[1]:
+            if tok.kind == SEP:
+                continue
+            d = as_distance_km(tok)
+            if d is None or not math.isfinite(d):
+                return "Целевая дистанция не распознана."
+            if d <= 0:
+                return "Ошибка: Дистанции должны быть > 0."
+            targets.append((_dist_label(tok), d))
+        if not targets:
+            return "Укажите целевые дистанции после '->' или не пишите стрелку — посчитаю для стандартных."
+    return tuple(dists), tuple(times), tuple(targets), fit
+
+def _compute_riegel_fit(jobs):
+    fits = [j[3] for j in jobs]
+    # прогнозы всех строк — одним пакетным вызовом
+    coef, exp, dist = [], [], []
+    for fit, job in zip(fits, jobs):
+        for _, d in job[2]:
+            coef.append(fit.coef); exp.append(fit.exp); dist.append(d)
+    times = iter(predict_riegel_batch(coef, exp, dist))
+    return [(fit, [next(times) for _ in job[2]]) for fit, job in zip(fits, jobs)]
+
+def _render_riegel_fit(job, result) -> str:
+    fit, times = result
+    lines = [f"Личный показатель: exp={fit.exp:.3f} (по {fit.n} результатам)"]
+    if fit.n == 2:
+        lines.append("По двум результатам кривая проходит точно через них — качество не оценить.")
+    else:
+        lines.append(f"Качество: R²={fit.r2:.3f}, ошибка ±{fit.rmse_pct:.1f}%")
+    if not 0.9 <= fit.exp <= 1.2:
+        lines.append("⚠ Показатель вне обычного диапазона 0.9–1.2 — проверьте результаты.")
+    lines.append("Прогноз:")
+    for (label, d), t in zip(job[2], times):
+        lines.append(f"• {label} — {_fmt(t)} ({_fmt(float(t) / d)}/км)")
+    return "\n".join(lines)
+
+
+# -------------------- ДОРОЖКА ↔ ТЕМП --------------------
+def _parse_tread(tokens: List[Token]):
+    values = [t for t in tokens if t.kind != SEP]
+    tok = values[0] if values else None
+    if tok is not None and (tok.key == "speed" or tok.kind == SPEED):
+        if tok.kind == SPEED:
+            v, unit = tok.value, tok.unit
+        elif tok.kind == NUM and not tok.unit:
+            v, unit = tok.value, "kmh"
+        else:
+            v, unit = None, "kmh"
+        if v is None or v <= 0:
+            return "Скорость не распознана (>0)."
+        return "speed", v * SPEED_UNIT_MPS[unit]
+
+    if tok is not None and (tok.key == "pace" or tok.kind in (PACE, TIME)):
+        pace = as_pace(tok)
+        if pace is None:
+            return "Темп не распознан."
+        if pace[0] <= 0:
+            return "Ошибка: Темп должен быть > 0."
+        return "pace", pace_to_sec_per_km(*pace)
+
+    return "Укажите либо speed=12.5kmh|7.5mph|3.5mps, либо pace=4:48/км|7:30/mi."
+
+def _compute_tread(jobs):
+    out = [None] * len(jobs)
+    speed_idx = [i for i, j in enumerate(jobs) if j[0] == "speed"]
+    pace_idx = [i for i, j in enumerate(jobs) if j[0] == "pace"]
+    if speed_idx:
+        mps = [jobs[i][1] for i in speed_idx]
+        rows = zip(speed_to_pace_batch(mps, "mps", "/km"), speed_to_pace_batch(mps, "mps", "/mi"))
+        for i, r in zip(speed_idx, rows):
+            out[i] = r
+    if pace_idx:
+        secs = [jobs[i][1] for i in pace_idx]
+        rows = zip(*(pace_to_speed_batch(secs, "/km", u) for u in ("kmh", "mph", "mps")))
+        for i, r in zip(pace_idx, rows):
+            out[i] = r
+    return out
+
+def _render_tread(job, result) -> str:
+    if job[0] == "speed":
+        pace_km, pace_mi = result
+        return f"Темп: {_fmt(pace_km)}/км  |  {_fmt(pace_mi)}/mi"
+    s_kmh, s_mph, s_mps = result
+    return f"Скорость: {s_kmh:.2f} км/ч  |  {s_mph:.2f} mph  |  {s_mps:.2f} м/с"
+
+
+# -------------------- ОБЩИЙ ВХОД --------------------
+_Mode = Tuple[Callable[[List[Token]], Union[str, tuple]], Callable[[list], Sequence], Callable[[tuple, object], str]]
+
+ANSWERS: Dict[str, _Mode] = {
+    "hr": (_parse_hr, _compute_hr, _render_hr),
+    "time_by_pace": (_parse_time_by_pace, _compute_time_by_pace, _render_time_by_pace),
+    "splits": (_parse_splits, _compute_splits, _render_splits),
+    "calc": (_parse_calc, _compute_calc, _render_calc),
+    "riegel": (_parse_riegel, _compute_riegel, _render_riegel),
+    "riegel_fit": (_parse_riegel_fit, _compute_riegel_fit, _render_riegel_fit),
+    "tread": (_parse_tread, _compute_tread, _render_tread),
+}
+
+def parse_lines(mode: str, token_lines: Sequence[List[Token]]) -> list:
+    """Разбор строк: для каждой — аргументы расчёта (tuple) или текст ошибки (str)."""
+    parse = ANSWERS[mode][0]
+    return [parse(tokens) for tokens in token_lines]
+
+def _render_one(compute, render, job) -> str:
+    """Расчёт одной строки; ошибка расчёта (переполнение, недопустимые значения) — текстом ответа."""
+    try:
+        return render(job, compute([job])[0])
+    except ArithmeticError:
+        return "Ошибка: числа вне допустимого диапазона."
+    except ValueError as e:
+        return f"Ошибка: {e}"
+
+def render_lines(mode: str, parsed: Sequence) -> List[str]:
+    """Пакетный расчёт разобранных строк и тексты ответов; ошибки разбора проходят как есть.
+    Если пачка падает, строки считаются по одной — ошибка одной строки не отнимает ответы у остальных."""
+    _, compute, render = ANSWERS[mode]
+    out = list(parsed)
+    idx = [i for i, p in enumerate(out) if not isinstance(p, str)]
+    if idx:
+        jobs = [out[i] for i in idx]
+        try:
+            replies = [render(job, result) for job, result in zip(jobs, compute(jobs))]
+        except (ArithmeticError, ValueError):
+            replies = [_render_one(compute, render, job) for job in jobs]
+        for i, reply in zip(idx, replies):
+            out[i] = reply
+    return out
+
+def answer_lines(mode: str, token_lines: Sequence[List[Token]]) -> List[str]:
+    """Ответ на каждую строку; строки с ошибкой разбора не мешают остальным."""
+    return render_lines(mode, parse_lines(mode, token_lines))
+
+def answer(mode: str, tokens: List[Token]) -> str:
+    return answer_lines(mode, [tokens])[0]
+
+
+def detect_modes(tokens: List[Token]) -> List[str]:
+    """Режимы, на которые похожа строка, — для инлайн-запросов, где режим не выбран в меню.
+    Пустой список — строка ещё не похожа ни на один расчёт."""
+    if any(t.kind == ARROW for t in tokens):
+        left = [t for t in split_tokens(tokens, ARROW)[0] if t.kind != SEP]
+        return ["riegel_fit"] if len(left) >= 4 else ["riegel"]
+    values = [t for t in tokens if t.kind != SEP]
+    if not values:
+        return []
+    if len(values) >= 2 and any(t.key in ("dist", "pace", "time") for t in values):
+        return ["calc"]
+    if any(t.key in ("hrmax", "rest", "lthr") for t in values):
+        return ["hr"]
+    first = values[0]
+    if len(values) == 1:
+        return ["tread"] if first.kind in (SPEED, PACE, TIME) or first.key in ("speed", "pace") else []
+    second = values[1]
+    if as_distance_km(first) is not None and second.kind in (PACE, TIME):
+        return ["time_by_pace"]
+    if first.kind == NUM and not first.unit and second.kind in (NUM, RANGE) and second.unit in ("", "%"):
+        return ["hr"]
+    return []
+
+
+def split_message(blocks: Sequence[str], limit: int = MESSAGE_LIMIT, sep: str = "\n\n") -> List[str]:
+    """Склеивает блоки в сообщения не длиннее limit; блок режется только если сам длиннее limit —
+    по последнему переводу строки, а если его нет — ровно по limit."""
+    chunks: List[str] = []
+    cur = ""
+    for block in blocks:
+        while len(block) > limit:
+            if cur:
+                chunks.append(cur); cur = ""
+            cut = block.rfind("\n", 0, limit + 1)
+            cut = cut if cut > 0 else limit
+            chunks.append(block[:cut]); block = block[cut:].lstrip("\n")
+        if not cur:
+            cur = block
+        elif len(cur) + len(sep) + len(block) <= limit:
+            cur += sep + block
+        else:
+            chunks.append(cur); cur = block
+    if cur:
+        chunks.append(cur)
+    return chunks
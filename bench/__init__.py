@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Бенчмарки. Запуск из корня репозитория: python -m bench.<имя>"""
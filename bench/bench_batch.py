@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""
+Многострочные сообщения: пакетный расчёт (answers.answer_lines, *_batch из calc)
+против построчного вызова answer() на каждую строку. Кэш ответов не участвует.
+Для каждого режима — строк в секунду при 1, 10 и 1000 строках в сообщении.
+
+    python -m bench.bench_batch
+"""
+import itertools
+
+from answers import answer, answer_lines
+from calc import HAVE_NUMPY
+from calc.lexer import tokenize
+
+from ._util import ops_per_sec, print_table
+
+LINES = {
+    "hr":           ["196, 72-83", "190, 70", "185, 60-70", "200, 85"],
+    "time_by_pace": ["1000м, 4:00", "1mi, 6:00/mi", "3км, 3:45", "21.1km, 4:30"],
+    "calc":         ["dist=10км, pace=3:45", "5000м, time=18:30", "pace=4:10, time=45:00"],
+    "riegel":       ["10км, 41:30 -> 21.1км", "3000м, 10:00 -> 5000м, exp=1.07"],
+    "tread":        ["speed=12.5kmh", "pace=4:48/км", "7.5mph", "pace=7:30/mi"],
+}
+SIZES = (1, 10, 1000)
+
+
+def run_bench() -> None:
+    rows = []
+    for mode, sample in LINES.items():
+        for n in SIZES:
+            token_lines = [tokenize(s) for s in itertools.islice(itertools.cycle(sample), n)]
+            batched = ops_per_sec(lambda: answer_lines(mode, token_lines)) * n
+            per_line = ops_per_sec(lambda: [answer(mode, t) for t in token_lines]) * n
+            rows.append((f"{mode} x{n}", batched, per_line, f"{batched / per_line:.2f}x"))
+    print(f"NumPy: {'да' if HAVE_NUMPY else 'нет (чистый Python)'}")
+    print_table(("message", "batch lines/s", "per-line lines/s", "speedup"), rows)
+
+
+if __name__ == "__main__":
+    run_bench()
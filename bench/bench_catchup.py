@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Догон очереди после перезапуска: бот стартует, когда у фейкового Bot API уже накоплено N апдейтов
+(по умолчанию 50 000 — сессии «меню → вводы → ⬅ Назад» пары тысяч пользователей вперемешку).
+
+Меряется, когда каждый пользователь получил ответ на своё последнее действие (последний ответ
+в его чате — последний апдейт пользователя при свёртке никогда не отбрасывается), сколько
+исходящих запросов понадобилось и совпал ли ответ на последний текст с ответом, посчитанным напрямую.
+Лимитер отправки выключен (SEND_RATE=0); сколько длился бы догон при лимите Bot API 30 сообщений/с,
+видно по числу отправок. С --compare тот же прогон без догона (CATCHUP=0), не дольше --timeout секунд.
+Код выхода 1, если после догона кто-то остался без ответа или последний ответ неверен.
+
+    python -m bench.bench_catchup [--updates 50000] [--users 2000] [--compare]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from main import compute_reply
+
+from ._util import percentile, print_table
+from .fake_api import FakeBotAPI
+from .loadtest import bot_log_tail, start_bot, stop_bot, synthetic_sessions
+
+USER_BASE = 100_000
+SENDS = ("sendMessage", "editMessageText")
+
+
+def make_backlog(updates: int, users: int, seed: int = 1) -> List[Tuple[int, dict]]:
+    """(пользователь, шаг) вперемешку между пользователями, по порядку внутри сессии пользователя."""
+    rnd = random.Random(seed)
+    sessions = synthetic_sessions(1000, seed)
+    per_user = -(-updates // users)
+    timeline = []
+    for u in range(users):
+        steps: List[dict] = []
+        while len(steps) < per_user:
+            steps += rnd.choice(sessions)
+        t = rnd.uniform(0, 60)
+        for step in steps[:per_user]:
+            t += rnd.expovariate(1 / 5)
+            timeline.append((t, USER_BASE + u, step))
+    timeline.sort(key=lambda x: x[0])
+    return [(user, step) for _, user, step in timeline[:updates]]
+
+def expected_last_text(backlog: List[Tuple[int, dict]]) -> Dict[int, Optional[str]]:
+    """Ожидаемый ответ на последний шаг пользователя, если это текст (None — последним было нажатие)."""
+    mode: Dict[int, str] = {}
+    last: Dict[int, Optional[str]] = {}
+    for user, step in backlog:
+        if "tap" in step:
+            data = step["tap"]
+            mode[user] = data[len("menu_"):] if data.startswith("menu_") else ""
+            last[user] = None
+        else:
+            last[user] = compute_reply(mode[user], step["text"]) if mode.get(user) else None
+    return last
+
+
+async def run(backlog: List[Tuple[int, dict]], catchup: bool, timeout: float, quiet: float = 2.0) -> dict:
+    api = FakeBotAPI()
+    url = await api.start()
+    for user, step in backlog:
+        api.push_update(api.callback_update(user, step["tap"]) if "tap" in step else api.message_update(user, step["text"]))
+    users = sorted({u for u, _ in backlog})
+    t0 = time.perf_counter()
+    proc = start_bot(url, "polling", {"SEND_RATE": "0", "CATCHUP": "1" if catchup else "0"})
+    last: Dict[int, object] = {}
+    deadline = t0 + timeout
+    try:
+        # ответы читаются, пока бот не замолчит на quiet секунд (или не выйдет время)
+        idle_since = time.perf_counter()
+        while time.perf_counter() < deadline:
+            got = False
+            for u in users:
+                q = api.replies(u)
+                while not q.empty():
+                    last[u] = q.get_nowait()
+                    got = True
+            now = time.perf_counter()
+            if got:
+                idle_since = now
+            elif last and now - idle_since > quiet:
+                break
+            await asyncio.sleep(0.05)
+        if not last:
+            raise RuntimeError(f"бот не ответил за {timeout} с\n{bot_log_tail(proc)}")
+    finally:
+        await stop_bot(proc)
+        await api.stop()
+    done = sorted(r.at - t0 for r in last.values())
+    return {"last": last, "done": done, "users": len(users), "sends": sum(api.calls[m] for m in SENDS),
+            "calls": sum(api.calls.values())}
+
+
+def check(r: dict, expected: Dict[int, Optional[str]]) -> Tuple[int, int, int]:
+    """(ответили пользователям, неверных последних ответов, проверено последних ответов)."""
+    checked = [u for u, text in expected.items() if text is not None and len(text) <= 4096]
+    wrong = sum(1 for u in checked if u not in r["last"] or r["last"][u].text != expected[u])
+    return len(r["last"]), wrong, len(checked)
+
+def report_row(label: str, r: dict, expected: Dict[int, Optional[str]]) -> tuple:
+    answered, wrong, checked = check(r, expected)
+    d = r["done"]
+    return (label, f"{answered}/{r['users']}", f"{percentile(d, 50):.2f}", f"{percentile(d, 99):.2f}",
+            f"{d[-1]:.2f}" if d else "-", r["sends"], f"{r['sends'] / 30:.0f}", f"{wrong}/{checked}")
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--updates", type=int, default=50_000)
+    p.add_argument("--users", type=int, default=2000)
+    p.add_argument("--timeout", type=float, default=300.0, help="предел прогона, с")
+    p.add_argument("--compare", action="store_true", help="ещё прогон без догона (CATCHUP=0)")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args(argv)
+
+    backlog = make_backlog(args.updates, args.users, args.seed)
+    expected = expected_last_text(backlog)
+    result = asyncio.run(run(backlog, True, args.timeout))
+    rows = [report_row("catch-up", result, expected)]
+    if args.compare:
+        rows.append(report_row("plain polling", asyncio.run(run(backlog, False, args.timeout)), expected))
+    print(f"апдейтов в очереди: {len(backlog)}, пользователей: {result['users']}")
+    print_table(("run", "answered", "p50 s", "p99 s", "all s", "sends", "s @30/s", "wrong last"), rows)
+    # догон обязан ответить каждому пользователю и верно; прогон без догона — только для сравнения
+    answered, wrong, _ = check(result, expected)
+    if answered < result["users"] or wrong:
+        print(f"FAIL: без ответа {result['users'] - answered} пользователей, неверных последних ответов {wrong}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+Таблицы (CSV): скорость и память потоковой обработки.
+Файл с N строками «имя, дистанция, время» генерируется на диск, затем process_csv_file
+пишет результат с прогнозами по Ригелю в отдельном процессе. Пик RSS этого процесса не должен расти с N.
+
+    python -m bench.bench_csv [N]
+"""
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+from calc.table import DEFAULT_TARGETS, process_csv_file
+
+from ._util import print_table
+
+DISTANCES = ("1500м", "3км", "5км", "10км", "21.1км", "42.195км")
+
+
+def make_csv(path: str, n: int, seed: int = 1) -> None:
+    rnd = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("name;distance;time\n")
+        for i in range(n):
+            f.write(f"athlete{i};{rnd.choice(DISTANCES)};{rnd.randint(0, 3)}:{rnd.randint(10, 59):02d}:{rnd.randint(0, 59):02d}\n")
+
+def _child(src: str, dst: str, out) -> None:
+    t0 = time.perf_counter()
+    rows, _ = process_csv_file(src, dst, DEFAULT_TARGETS)
+    dt = time.perf_counter() - t0
+    out.put((rows, dt, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024))  # ru_maxrss в КБ (Linux)
+
+def run_one(n: int) -> tuple:
+    """(строк, секунд, пик RSS, размер входа, размер выхода); расчёт — в чистом процессе (spawn)."""
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        src, dst = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+        make_csv(src, n)
+        out = ctx.Queue()
+        proc = ctx.Process(target=_child, args=(src, dst, out))
+        proc.start()
+        rows, dt, peak = out.get()
+        proc.join()
+        return rows, dt, peak, os.path.getsize(src), os.path.getsize(dst)
+
+
+def run_bench(n: int) -> None:
+    out = []
+    for size in sorted({n // 10, n}):
+        rows, dt, peak, in_size, out_size = run_one(size)
+        out.append((f"{rows:,}", f"{dt:.2f}", rows / dt, f"{in_size / 2**20:.1f}", f"{out_size / 2**20:.1f}",
+                    f"{peak / 2**20:.1f}"))
+    print_table(("rows", "s", "rows/s", "in MB", "out MB", "peak RSS MB"), out)
+
+
+if __name__ == "__main__":
+    run_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Личный показатель Ригеля офлайн: N спортсменов по 3–6 результатов, прогноз на M дистанций.
+  • fit_riegel_batch — подбор для всех сразу (и проверка, что он находит заданный exp);
+  • predict_riegel_batch против riegel() в цикле Python (от лучшего результата спортсмена).
+
+    python -m bench.bench_fit [N]
+"""
+import random
+import sys
+import time
+
+from calc import HAVE_NUMPY, riegel
+from calc.fit import fit_riegel_batch, predict_riegel_batch
+
+from ._util import print_table
+
+DISTANCES = (1.5, 3.0, 5.0, 10.0, 15.0, 21.0975)
+TARGETS = (5.0, 10.0, 21.0975, 30.0, 42.195)
+
+
+def make_athletes(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    exps, dists, times = [], [], []
+    for _ in range(n):
+        exp = rnd.uniform(1.02, 1.12)
+        coef = rnd.uniform(170, 330)   # сек на 1 км
+        ds = rnd.sample(DISTANCES, rnd.randint(3, 6))
+        exps.append(exp)
+        dists.append(ds)
+        times.append([coef * d ** exp * rnd.uniform(0.99, 1.01) for d in ds])
+    return exps, dists, times
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def run_bench(n: int) -> None:
+    exps, dists, times = make_athletes(n)
+    fits, t_fit = _timed(lambda: fit_riegel_batch(dists, times))
+    fit_exp, fit_coef = list(fits[0]), list(fits[1])
+    err = sum(abs(a - b) for a, b in zip(fit_exp, exps)) / n
+
+    m = len(TARGETS)
+    if HAVE_NUMPY:
+        import numpy as np
+        args = (np.asarray(fit_coef)[:, None], np.asarray(fit_exp)[:, None], np.asarray(TARGETS)[None, :])
+    else:
+        args = ([c for c in fit_coef for _ in TARGETS], [e for e in fit_exp for _ in TARGETS], list(TARGETS) * n)
+    _, t_vec = _timed(lambda: predict_riegel_batch(*args))
+
+    anchors = [(ds[-1], ts[-1]) for ds, ts in zip(dists, times)]
+    _, t_loop = _timed(lambda: [[riegel(t1, d1, d2, e) for d2 in TARGETS]
+                                for (d1, t1), e in zip(anchors, fit_exp)])
+
+    print(f"NumPy: {'да' if HAVE_NUMPY else 'нет (чистый Python)'}; спортсменов: {n}, целей: {m}")
+    print(f"средняя ошибка подобранного exp: {err:.4f}")
+    print_table(("step", "ms", "per second"), [
+        ("fit_riegel_batch", f"{t_fit * 1e3:.1f}", n / t_fit),
+        ("predict_riegel_batch", f"{t_vec * 1e3:.1f}", n * m / t_vec),
+        ("riegel() loop", f"{t_loop * 1e3:.1f}", n * m / t_loop),
+    ])
+
+
+if __name__ == "__main__":
+    run_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
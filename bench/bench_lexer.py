@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Лексер против прежних парсеров.
+1) Сверка на корпусе: значения токенов DIST/PACE/TIME совпадают с parse_distance /
+   parse_pace / parse_time_to_seconds (для входов, которые понимают оба).
+2) Микробенчмарк: операций в секунду на типовых формах сообщений — лексер против
+   прежнего разбора из обработчиков (split/replace + parse_*). Для масштаба рядом —
+   разбор самого апдейта (json + Update.de_json), который PTB делает для каждого сообщения.
+Сверка ответов по целым сообщениям — в tests/test_lexer.py.
+
+    python -m bench.bench_lexer
+"""
+import json
+import math
+import sys
+
+from telegram import Update
+
+from calc import parse_distance, parse_float, parse_pace, parse_time_to_seconds
+from calc.lexer import NUM, PACE, TIME, tokenize, as_distance_km, as_pace, as_seconds
+
+from ._util import ops_per_sec, print_table
+
+DISTANCES = ["10км", "10km", "1000м", "1000m", "3 км", "21.1km", "42.195км", "1mi", "1.5mi",
+             "1mile", "2miles", "5", "0.4", "400m", "13.1mi", "100 m"]
+PACES = ["4:10", "4:10/км", "4:10/km", "6:30/mi", "6:30/mile", "3:05 /км", "240", "10:00/mi"]
+TIMES = ["41:30", "1:05:00", "18:45", "225", "2:59:59", "0:59"]
+
+SHAPES = {
+    "hr":           "196, 72-83",
+    "time_by_pace": "1000м, 4:00",
+    "calc":         "dist=10км, pace=3:45",
+    "riegel":       "3000м, 10:00 -> 5000м, exp=1.07",
+    "tread":        "speed=12.5kmh",
+}
+
+
+def _close(a, b) -> bool:
+    return a is not None and b is not None and math.isclose(a, b, rel_tol=1e-12)
+
+def check_corpus() -> int:
+    bad = []
+    for s in DISTANCES:
+        toks = tokenize(s)
+        km = as_distance_km(toks[0]) if len(toks) == 1 else None
+        legacy = parse_distance(s)
+        if not _close(km, legacy and legacy[0]):
+            bad.append(("dist", s, toks, legacy))
+    for s in PACES:
+        toks = tokenize(s)
+        got = as_pace(toks[0]) if len(toks) == 1 and toks[0].kind in (PACE, TIME, NUM) else None
+        if got != parse_pace(s):
+            bad.append(("pace", s, toks, parse_pace(s)))
+    for s in TIMES:
+        toks = tokenize(s)
+        got = as_seconds(toks[0]) if len(toks) == 1 else None
+        if got != parse_time_to_seconds(s):
+            bad.append(("time", s, toks, parse_time_to_seconds(s)))
+    for item in bad:
+        print("MISMATCH", *item)
+    print(f"corpus: {len(DISTANCES) + len(PACES) + len(TIMES)} inputs, {len(bad)} mismatches")
+    return len(bad)
+
+
+# -------------------- ПРЕЖНИЙ РАЗБОР (как в обработчиках до лексера) --------------------
+def _legacy_hr(text):
+    line = text.replace("%", "").replace(" ", "")
+    left, right = line.split(",", 1)
+    if "-" in right:
+        a, b = right.split("-", 1)
+        return parse_float(left), parse_float(a), parse_float(b)
+    return parse_float(left), parse_float(right)
+
+def _legacy_time_by_pace(text):
+    ds, pace_s = text.split(",", 1)
+    return parse_distance(ds), parse_pace(pace_s)
+
+def _extract_named(parts, keys):
+    for p in parts:
+        pl = p.lower().strip()
+        for k in keys:
+            if pl.startswith(k):
+                return p.split("=", 1)[1].strip()
+    return None
+
+def _legacy_calc(text):
+    raw = [t for chunk in text.replace(";", ",").split(",") for t in chunk.strip().split() if t.strip()]
+    dist_tok = _extract_named(raw, ("dist=", "дист=", "distance="))
+    pace_tok = _extract_named(raw, ("pace=", "темп="))
+    time_tok = _extract_named(raw, ("time=", "время=", "t="))
+    if dist_tok is None:
+        for p in raw:
+            if p.lower().endswith(("км", "km", "м", "m", "mi", "mile", "miles")) or p.replace(",", ".").replace(".", "", 1).isdigit():
+                dist_tok = p; break
+    if pace_tok is None:
+        for p in raw:
+            if ":" in p and ("/" in p or "pace" in p.lower() or "темп" in p.lower()):
+                pace_tok = p; break
+    if time_tok is None:
+        for p in raw:
+            if ":" in p and (("pace" not in p.lower()) and ("/" not in p)):
+                time_tok = p; break
+    dist_km = parse_distance(dist_tok)[0] if dist_tok and parse_distance(dist_tok) else None
+    pace = parse_pace(pace_tok) if pace_tok else None
+    time_sec = parse_time_to_seconds(time_tok) if time_tok else None
+    return dist_km, pace, time_sec
+
+def _legacy_riegel(text):
+    parts = [p.strip() for p in text.replace("→", "->").split("->")]
+    ld, lt = [x.strip() for x in parts[0].replace(";", ",").split(",", 1)]
+    rparts = [p.strip() for p in parts[1].split(",")]
+    exp = None
+    for rp in rparts[1:]:
+        if rp.lower().startswith("exp="):
+            exp = parse_float(rp.split("=", 1)[1])
+    return parse_distance(ld), parse_time_to_seconds(lt), parse_distance(rparts[0]), exp
+
+def _legacy_tread(text):
+    q = text.strip().lower().replace(" ", "")
+    val = q.split("=", 1)[1]
+    for suffix in ("kmh", "mph", "mps"):
+        if val.endswith(suffix):
+            return parse_float(val[:-3]), suffix
+    return parse_float(val), "kmh"
+
+LEGACY = {"hr": _legacy_hr, "time_by_pace": _legacy_time_by_pace, "calc": _legacy_calc,
+          "riegel": _legacy_riegel, "tread": _legacy_tread}
+
+
+def _update_json(text: str) -> str:
+    return json.dumps({"update_id": 1, "message": {
+        "message_id": 1, "date": 1700000000, "text": text,
+        "chat": {"id": 42, "type": "private", "first_name": "A"},
+        "from": {"id": 42, "is_bot": False, "first_name": "A"},
+    }})
+
+def run_bench() -> None:
+    rows = []
+    for name, text in SHAPES.items():
+        legacy = LEGACY[name]
+        rows.append((name, ops_per_sec(lambda: tokenize(text)), ops_per_sec(lambda: legacy(text))))
+    print_table(("shape", "lexer ops/s", "legacy ops/s"), rows)
+    raw = _update_json(SHAPES["hr"])
+    decode = ops_per_sec(lambda: Update.de_json(json.loads(raw), None))
+    print(f"\nдля масштаба: json + Update.de_json одного апдейта — {decode:,.0f} ops/s")
+
+
+if __name__ == "__main__":
+    mismatches = check_corpus()
+    run_bench()
+    sys.exit(1 if mismatches else 0)
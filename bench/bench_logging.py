@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+Логирование под потоком ошибок: сколько времени event loop проводит в вызовах логгера.
+
+В одном event loop --chats чатов обрабатывают --updates апдейтов: ответ через main.compute_reply
+и, с вероятностью --error-rate, исключение из глубины стека обработчика — как правило ожидаемое
+(Forbidden — бот заблокирован пользователем, InputError ввода),
+изредка (--unexpected от ошибок) RuntimeError. Лог пишется в pipe, который читает поток
+со скоростью --sink-kbps (0 — без ограничения; ограничение — медленный сборщик логов).
+
+Варианты:
+- sync — прежний logging.basicConfig: запись из event loop, logger.exception на каждую ошибку;
+- queue — logs.setup_logging без выборки, но так же logger.exception: эффект одной очереди;
+- queue+classify — main.log_error: ожидаемые ошибки одной строкой без трассировки;
+- queue+sample — то же с выборкой (LOG_SAMPLE_BURST записей на ключ за LOG_SAMPLE_INTERVAL).
+
+Отчёт: время в вызовах логгера (в event loop), задержка тиков loop (p99, max), время прогона,
+CPU процесса, записано/отброшено записей, дозапись очереди после прогона.
+
+    python -m bench.bench_logging [--updates 20000] [--error-rate 0.5] [--sink-kbps 0]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from typing import List
+
+from telegram.error import Forbidden
+
+from calc import InputError
+from logs import TEXT_FORMAT, setup_logging, stop_logging
+from main import compute_reply, log_error, logger
+from metrics import LOG_RECORDS
+
+from ._util import percentile, print_table
+
+INPUTS = [("hr", "196, 72-83"), ("time_by_pace", "1000м, 4:00"), ("riegel", "10км, 41:30 -> 21.1км"),
+          ("tread", "speed=12.5kmh"), ("splits", "4:00")]
+DEPTH = 12   # кадров между обработчиком и местом исключения (PTB, бот, httpx)
+VARIANTS = ("sync", "queue", "queue+classify", "queue+sample")
+
+
+class Sink:
+    """Читающий конец pipe в отдельном потоке; kbps > 0 — не быстрее заданной скорости."""
+
+    def __init__(self, kbps: float) -> None:
+        r, w = os.pipe()
+        self._r = r
+        self.stream = open(w, "w", encoding="utf-8")
+        self.kbps = kbps
+        self.bytes = 0
+        self.lines = 0
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self) -> None:
+        started = time.perf_counter()
+        while True:
+            chunk = os.read(self._r, 65536)
+            if not chunk:
+                break
+            self.bytes += len(chunk)
+            self.lines += chunk.count(b"\n")
+            if self.kbps > 0:
+                ahead = self.bytes / (self.kbps * 1024) - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+        os.close(self._r)
+
+    def close(self) -> None:
+        self.stream.close()
+        self._thread.join()
+
+
+async def _fail(depth: int, exc: Exception) -> None:
+    if depth:
+        await _fail(depth - 1, exc)
+    raise exc
+
+def make_errors(n: int, rate: float, unexpected: float, seed: int) -> List[object]:
+    rnd = random.Random(seed)
+    out: List[object] = []
+    for _ in range(n):
+        if rnd.random() >= rate:
+            out.append(None)
+        elif rnd.random() < unexpected:
+            out.append(RuntimeError)
+        elif rnd.random() < 0.8:
+            out.append(Forbidden)
+        else:
+            out.append(InputError)
+    return out
+
+def _new_error(kind) -> Exception:
+    if kind is Forbidden:
+        return Forbidden("Forbidden: bot was blocked by the user")
+    if kind is InputError:
+        return InputError("Темп должен быть > 0.")
+    return RuntimeError("unexpected state")
+
+
+async def run(variant: str, errors: List[object], chats: int, kbps: float,
+              burst: int, interval: float) -> dict:
+    sink = Sink(kbps)
+    listener = None
+    if variant == "sync":
+        logging.basicConfig(stream=sink.stream, format=TEXT_FORMAT, level=logging.INFO, force=True)
+    else:
+        listener = setup_logging(stream=sink.stream, burst=burst if variant == "queue+sample" else 0,
+                                 interval=interval)
+    classify = variant in ("queue+classify", "queue+sample")
+    dropped0 = sum(LOG_RECORDS.labels(o).value for o in ("sampled", "overflow"))
+    in_log: List[float] = []
+    lags: List[float] = []
+    done = asyncio.Event()
+
+    async def ticker() -> None:
+        while not done.is_set():
+            t = time.perf_counter()
+            await asyncio.sleep(0.001)
+            lags.append(time.perf_counter() - t - 0.001)
+
+    async def chat(i: int) -> None:
+        for n in range(i, len(errors), chats):
+            mode, text = INPUTS[n % len(INPUTS)]
+            compute_reply(mode, text)
+            await asyncio.sleep(0)              # отправка ответа
+            kind = errors[n]
+            if kind is None:
+                continue
+            try:
+                await _fail(DEPTH, _new_error(kind))
+            except Exception as e:
+                t = time.perf_counter()
+                if classify:
+                    log_error("Ошибка обработки", e, mode=mode)
+                else:
+                    logger.exception("Ошибка обработки")
+                in_log.append(time.perf_counter() - t)
+
+    tick = asyncio.create_task(ticker())
+    cpu0, t0 = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(chat(i) for i in range(chats)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await tick
+    t1 = time.perf_counter()
+    if listener is not None:
+        stop_logging(listener)
+    else:
+        logging.getLogger().handlers[0].flush()
+    drain = time.perf_counter() - t1
+    cpu = time.process_time() - cpu0
+    logging.getLogger().handlers.clear()
+    sink.close()
+    lags.sort()
+    return {"variant": variant, "in_log": sum(in_log), "calls": len(in_log), "wall": wall, "cpu": cpu,
+            "lag_p99": percentile(lags, 99), "lag_max": lags[-1] if lags else 0.0, "lines": sink.lines,
+            "bytes": sink.bytes, "drain": drain,
+            "dropped": sum(LOG_RECORDS.labels(o).value for o in ("sampled", "overflow")) - dropped0}
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--updates", type=int, default=20_000)
+    p.add_argument("--chats", type=int, default=64)
+    p.add_argument("--error-rate", type=float, default=0.5, help="доля апдейтов с исключением")
+    p.add_argument("--unexpected", type=float, default=0.01, help="доля неожиданных среди исключений")
+    p.add_argument("--sink-kbps", type=float, default=0.0, help="скорость чтения лога, КБ/с (0 — без ограничения)")
+    p.add_argument("--burst", type=int, default=20)
+    p.add_argument("--interval", type=float, default=60.0)
+    p.add_argument("--variant", action="append", choices=VARIANTS, help="по умолчанию — все")
+    p.add_argument("--seed", type=int, default=1)
+    args = p.parse_args(argv)
+
+    errors = make_errors(args.updates, args.error_rate, args.unexpected, args.seed)
+    for mode, text in INPUTS:   # прогрев кэша ответов и импортов
+        compute_reply(mode, text)
+    rows = []
+    base = None
+    for variant in args.variant or VARIANTS:
+        r = asyncio.run(run(variant, errors, args.chats, args.sink_kbps, args.burst, args.interval))
+        base = base or r["in_log"]
+        rows.append((variant, f"{r['in_log'] * 1e3:.0f}", f"{r['in_log'] / max(r['calls'], 1) * 1e6:.1f}",
+                     f"{base / r['in_log']:.1f}x" if r["in_log"] else "-",
+                     f"{r['lag_p99'] * 1e3:.2f}", f"{r['lag_max'] * 1e3:.1f}", f"{r['wall']:.2f}", f"{r['cpu']:.2f}",
+                     r["lines"], r["dropped"], f"{r['bytes'] / 1024:.0f}", f"{r['drain'] * 1e3:.0f}"))
+    sink = f"{args.sink_kbps:.0f} КБ/с" if args.sink_kbps else "без ограничения"
+    print(f"апдейтов: {args.updates}, ошибок: {sum(e is not None for e in errors)}, чтение лога: {sink}")
+    print_table(("variant", "loop in log ms", "us/call", "saved", "lag p99 ms", "lag max ms", "wall s", "cpu s",
+                 "lines", "dropped", "KB", "drain ms"), rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Цена метрик.
+  • одиночные операции: Histogram.labels(...).observe, Counter.inc, время рендера /metrics;
+  • compute_replies из main.py (с замерами этапов) против той же логики без метрик —
+    на попадании в кэш (самый дешёвый путь, где доля метрик наибольшая) и на промахе.
+
+    python -m bench.bench_metrics
+"""
+import time
+
+import main
+from answers import answer_lines
+from cache import LRUReplyCache, ReplyCache, cache_key
+from calc.lexer import tokenize
+from metrics import Counter, Histogram, Registry
+
+from ._util import ops_per_sec, print_table
+
+TEXT = ["10км, 41:30 -> 21.1км"]
+ROUNDS = 5
+
+
+def _plain_compute_replies(mode, lines):
+    """compute_replies без метрик — точка отсчёта."""
+    token_lines = [tokenize(line) for line in lines]
+    keys = [cache_key(mode, tokens) for tokens in token_lines]
+    replies = [main.reply_cache.get(key) for key in keys]
+    misses = [i for i, r in enumerate(replies) if r is None]
+    if misses:
+        for i, reply in zip(misses, answer_lines(mode, [token_lines[i] for i in misses])):
+            replies[i] = reply
+            main.reply_cache.put(keys[i], reply)
+    return replies
+
+
+def run_bench() -> None:
+    reg = Registry()
+    hist = Histogram("h", "h", ["mode", "stage"], registry=reg)
+    cnt = Counter("c", "c", ["mode"], registry=reg)
+    for mode in ("hr", "calc", "riegel", "tread", "splits"):
+        for stage in ("parse", "compute", "send"):
+            hist.labels(mode, stage).observe(0.001)
+    ns_obs = 1e9 / ops_per_sec(lambda: hist.labels("riegel", "parse").observe(0.0012))
+    ns_inc = 1e9 / ops_per_sec(lambda: cnt.labels("riegel").inc())
+    t0 = time.perf_counter()
+    reg.render()
+    render_ms = (time.perf_counter() - t0) * 1e3
+    print(f"observe: {ns_obs:.0f} нс, inc: {ns_inc:.0f} нс, рендер /metrics (15 серий): {render_ms:.2f} мс")
+
+    rows = []
+    for name, cache in (("cache hit", LRUReplyCache()), ("cache miss", ReplyCache())):
+        main.reply_cache = cache
+        # попеременно и лучший из раундов — чтобы шум машины не перекосил сравнение
+        base = inst = 0.0
+        for _ in range(ROUNDS):
+            base = max(base, ops_per_sec(lambda: _plain_compute_replies("riegel", TEXT)))
+            inst = max(inst, ops_per_sec(lambda: main.compute_replies("riegel", TEXT)))
+        rows.append((name, base, inst, f"{(base / inst - 1) * 100:+.1f}%", f"{(1 / inst - 1 / base) * 1e9:.0f}"))
+    print_table(("path", "plain ops/s", "instrumented ops/s", "overhead", "ns/request"), rows)
+
+
+if __name__ == "__main__":
+    run_bench()
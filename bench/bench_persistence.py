@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Стоимость сохранения сессий в зависимости от числа пользователей в хранилище:
+  • старт — время до первого ответа на get() (SQLite: ленивое чтение одной строки;
+    pickle: как PicklePersistence — загрузить весь словарь);
+  • сброс — запись пачки из 500 изменений (SQLite: только эти строки;
+    pickle: файл переписывается целиком).
+
+    python -m bench.bench_persistence [N ...]
+"""
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import time
+
+from persistence import SqliteSessionBackend
+from sessions import SessionStore
+
+from ._util import print_table
+
+BASE_ID = 100_000_000
+BATCH = 500
+
+
+def _seed_sqlite(path: str, n: int) -> None:
+    SqliteSessionBackend(path).close()        # создаёт схему
+    db = sqlite3.connect(path)
+    now = time.time()
+    db.executemany("INSERT INTO sessions (user_id, mode, updated_at) VALUES (?, ?, ?)",
+                   ((BASE_ID + i, 1 + i % 5, now) for i in range(n)))
+    db.commit()
+    db.close()
+
+def bench_sqlite(tmp: str, n: int):
+    path = os.path.join(tmp, f"s{n}.db")
+    _seed_sqlite(path, n)
+    t0 = time.perf_counter()
+    backend = SqliteSessionBackend(path)
+    store = SessionStore(backend=backend)
+    assert store.get(BASE_ID + n // 2) is not None
+    startup = time.perf_counter() - t0
+    for i in range(BATCH):
+        store.set(BASE_ID + i * 7 % n, "calc")
+    t0 = time.perf_counter()
+    backend.flush()
+    flush = time.perf_counter() - t0
+    backend.close()
+    return startup, flush
+
+def bench_pickle(tmp: str, n: int):
+    path = os.path.join(tmp, f"s{n}.pickle")
+    modes = ("hr", "time_by_pace", "calc", "riegel", "tread")
+    with open(path, "wb") as f:
+        pickle.dump({BASE_ID + i: {"mode": modes[i % 5]} for i in range(n)}, f)
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    assert data[BASE_ID + n // 2]
+    startup = time.perf_counter() - t0
+    for i in range(BATCH):
+        data[BASE_ID + i * 7 % n]["mode"] = "calc"
+    t0 = time.perf_counter()
+    with open(path, "wb") as f:
+        pickle.dump(data, f)
+    flush = time.perf_counter() - t0
+    return startup, flush
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            s_start, s_flush = bench_sqlite(tmp, n)
+            p_start, p_flush = bench_pickle(tmp, n)
+            rows.append((f"{n:,}", f"{s_start * 1e3:.2f}", f"{p_start * 1e3:.1f}",
+                         f"{s_flush * 1e3:.2f}", f"{p_flush * 1e3:.1f}"))
+    print_table(("stored users", "start sqlite ms", "start pickle ms",
+                 f"flush {BATCH} sqlite ms", f"flush {BATCH} pickle ms"), rows)
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Горизонтальное масштабирование: пропускная способность супервизора с N воркерами (WORKERS=N).
+Каждый прогон — bench.loadtest в режиме вебхука против фейкового Bot API с одинаковой нагрузкой;
+лимитер отправки выключен (SEND_RATE=0), иначе потолком будет лимит Bot API, а не CPU.
+
+Фейковый API и симулированные пользователи живут в процессе бенчмарка и тоже занимают ядро,
+поэтому рост виден при числе ядер ≥ N + 1. По умолчанию N = 1, 2, 4, … до os.cpu_count().
+
+    python -m bench.bench_scaling [N ...] [--users 200] [--duration 10]
+"""
+import argparse
+import asyncio
+import os
+
+from ._util import print_table
+from .loadtest import make_parser, run
+
+
+def default_workers() -> list:
+    n, out = os.cpu_count() or 1, [1]
+    while out[-1] * 2 <= max(n, 2):
+        out.append(out[-1] * 2)
+    return out
+
+
+def run_bench(workers: list, users: int, duration: float) -> None:
+    rows, base = [], None
+    for n in workers:
+        args = make_parser().parse_args([
+            "--mode", "webhook", "--workers", str(n), "--users", str(users),
+            "--duration", str(duration), "--warmup", "2", "--env", "SEND_RATE=0"])
+        r = asyncio.run(run(args))
+        base = base or r["throughput_rps"]
+        rows.append((n, r["throughput_rps"], f"{r['throughput_rps'] / base:.2f}x", f"{r['p50_ms']:.1f}",
+                     f"{r['p99_ms']:.1f}", r["timeouts"], r["rss_end_mb"]))
+    print(f"ядер: {os.cpu_count()}, пользователей: {users}")
+    print_table(("workers", "steps/s", "speedup", "p50 ms", "p99 ms", "timeouts", "RSS MB"), rows)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("workers", nargs="*", type=int)
+    p.add_argument("--users", type=int, default=200)
+    p.add_argument("--duration", type=float, default=10.0)
+    a = p.parse_args()
+    run_bench(a.workers or default_workers(), a.users, a.duration)
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Память под сессии: прирост RSS процесса на 10k/100k/1M пользователей.
+  before — как раньше: словарь user_data на пользователя ({"mode": ...} в defaultdict(dict));
+  after  — SessionStore (массивы).
+Каждое измерение — в отдельном процессе, чтобы не мешал уже занятый кучей объём.
+
+    python -m bench.bench_sessions [N ...]
+"""
+import subprocess
+import sys
+from collections import defaultdict
+
+from ._util import print_table
+
+MODES = ("hr", "time_by_pace", "calc", "riegel", "tread")
+BASE_ID = 100_000_000
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096
+
+def _fill(kind: str, n: int) -> int:
+    before = rss_bytes()
+    if kind == "before":
+        store = defaultdict(dict)
+        for i in range(n):
+            d = store[BASE_ID + i]
+            d.clear(); d["mode"] = MODES[i % 5]
+    else:
+        from sessions import SessionStore
+        store = SessionStore(max_entries=max(n, 1))
+        for i in range(n):
+            store.set(BASE_ID + i, MODES[i % 5])
+    grown = rss_bytes() - before
+    assert len(store) == n
+    return grown
+
+def measure(kind: str, n: int) -> int:
+    out = subprocess.run([sys.executable, "-m", "bench.bench_sessions", "--one", kind, str(n)],
+                         capture_output=True, text=True, check=True)
+    return int(out.stdout.strip())
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--one"]:
+        print(_fill(sys.argv[2], int(sys.argv[3])))
+        sys.exit(0)
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    rows = []
+    for n in sizes:
+        b, a = measure("before", n), measure("after", n)
+        rows.append((f"{n:,}", f"{b / 2**20:.1f} MiB", f"{a / 2**20:.1f} MiB",
+                     f"{b / n:.0f}", f"{a / n:.0f}"))
+    print_table(("users", "RSS before", "RSS after", "B/user before", "B/user after"), rows)
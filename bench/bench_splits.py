@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Раскладки: сколько стоит одна таблица.
+  • standard_splits для целого темпа — поиск в заранее посчитанной сетке;
+  • то же для дробного темпа (например /mi) — расчёт и форматирование одной строки;
+  • диапазон 3:30–5:00 с шагом 5 с — range_splits против цикла по темпам и дистанциям.
+
+    python -m bench.bench_splits
+"""
+import time
+
+from calc import format_seconds_to_hhmmss
+from calc.splits import STANDARD_DISTANCES, pace_range, range_splits, standard_grid, standard_splits
+
+from ._util import print_table
+
+
+def _naive_table(paces):
+    return [[format_seconds_to_hhmmss(p * d) for _, d in STANDARD_DISTANCES] for p in paces]
+
+def _us_per_call(fn, min_time: float = 0.2) -> float:
+    n = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            fn()
+        dt = time.perf_counter() - t0
+        if dt >= min_time:
+            return dt / n * 1e6
+        n *= 2
+
+
+def run_bench() -> None:
+    t0 = time.perf_counter()
+    standard_grid()
+    print(f"standard_grid (построение при старте): {(time.perf_counter() - t0) * 1e3:.1f} мс")
+    rng = pace_range(210, 300, 5)
+    rows = [
+        ("table, whole pace (grid)", _us_per_call(lambda: standard_splits(240)), _us_per_call(lambda: _naive_table([240]))),
+        ("table, fractional pace", _us_per_call(lambda: standard_splits(240.5)), _us_per_call(lambda: _naive_table([240.5]))),
+        ("range 3:30-5:00 step 5", _us_per_call(lambda: range_splits(rng)), _us_per_call(lambda: _naive_table(rng))),
+    ]
+    print_table(("case", "µs/table", "naive µs/table"), [(n, f"{a:.2f}", f"{b:.2f}") for n, a, b in rows])
+
+
+if __name__ == "__main__":
+    run_bench()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Холодный старт: время импорта и время до первого обработанного апдейта.
+
+Импорт меряется в отдельном процессе на каждый прогон: `import telegram.ext`, затем `import main`
+(наши модули поверх telegram) и build_app(). Время до первого ответа — от запуска `python main.py`
+против фейкового Bot API до ответа на /start, который ждал в очереди ещё до старта:
+- polling — апдейт забирает первый getUpdates;
+- webhook — вебхук уже зарегистрирован (перезапуск/деплой), Telegram повторяет доставку,
+  пока бот не начнёт отвечать 200.
+Медиана по --runs прогонам; с бюджетами (--max-import-ms, --max-first-reply-ms) код выхода 1 при превышении.
+
+    python -m bench.bench_startup [--runs 5] [--mode polling|webhook|both] [--max-first-reply-ms 1500]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from ._util import print_table
+from .fake_api import FakeBotAPI
+from .loadtest import ROOT, _free_port, bot_log_tail, start_bot, stop_bot
+
+USER = 4242
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+import telegram.ext
+t1 = time.perf_counter()
+import main
+t2 = time.perf_counter()
+main.build_app()
+t3 = time.perf_counter()
+print(json.dumps({"telegram": t1 - t0, "main": t2 - t1, "build_app": t3 - t2}))
+"""
+
+
+def measure_imports(runs: int) -> Dict[str, List[float]]:
+    """Фазы импорта в мс по прогонам; process — полное время процесса с запуском интерпретатора."""
+    env = dict(os.environ, BOT_TOKEN="123456:STARTUP")
+    out: Dict[str, List[float]] = {"process": [], "telegram": [], "main": [], "build_app": []}
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        res = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True)
+        wall = time.perf_counter() - t0
+        if res.returncode:
+            raise RuntimeError(res.stderr[-2000:])
+        for k, v in json.loads(res.stdout.strip().splitlines()[-1]).items():
+            out[k].append(v * 1e3)
+        out["process"].append(wall * 1e3)
+    return out
+
+async def first_reply(mode: str, timeout: float = 30.0) -> float:
+    """Мс от запуска процесса бота до ответа на апдейт, ждавший в очереди."""
+    api = FakeBotAPI()
+    url = await api.start()
+    port = None
+    if mode == "webhook":
+        port = _free_port()
+        api.set_webhook(f"http://127.0.0.1:{port}/hook", "loadtest")
+    api.push_update(api.message_update(USER, "/start"))
+    t0 = time.perf_counter()
+    proc = start_bot(url, mode, {}, port=port)
+    try:
+        reply = await api.next_reply(USER, timeout)
+        if reply is None:
+            raise RuntimeError(f"нет ответа за {timeout} с\n{bot_log_tail(proc)}")
+        return (reply.at - t0) * 1e3
+    finally:
+        await stop_bot(proc)
+        await api.stop()
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--mode", choices=("polling", "webhook", "both"), default="both")
+    p.add_argument("--max-import-ms", type=float, help="бюджет: медиана import telegram.ext + import main")
+    p.add_argument("--max-first-reply-ms", type=float, help="бюджет: медиана времени до первого ответа")
+    args = p.parse_args(argv)
+
+    phases = measure_imports(args.runs)
+    phases["import total"] = [t + m for t, m in zip(phases["telegram"], phases["main"])]
+    modes = ("polling", "webhook") if args.mode == "both" else (args.mode,)
+    for mode in modes:
+        phases[f"first reply ({mode})"] = [asyncio.run(first_reply(mode)) for _ in range(args.runs)]
+
+    med = {k: statistics.median(v) for k, v in phases.items()}
+    print(f"прогонов: {args.runs}")
+    print_table(("phase", "median ms", "min ms", "max ms"),
+                [(k, f"{med[k]:.1f}", f"{min(v):.1f}", f"{max(v):.1f}") for k, v in phases.items()])
+    failed = []
+    if args.max_import_ms is not None and med["import total"] > args.max_import_ms:
+        failed.append(f"импорт {med['import total']:.0f} мс > {args.max_import_ms:.0f}")
+    for mode in modes:
+        key = f"first reply ({mode})"
+        if args.max_first_reply_ms is not None and med[key] > args.max_first_reply_ms:
+            failed.append(f"{key} {med[key]:.0f} мс > {args.max_first_reply_ms:.0f}")
+    for msg in failed:
+        print("РЕГРЕССИЯ:", msg)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
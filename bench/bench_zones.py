@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Пульсовые зоны: таблицы calc.zones против расчёта на каждый запрос.
+
+- построение таблиц (мс, байт) — один раз при старте бота;
+- на спортсмена: границы (срез таблицы против формулы с округлением) и текст зон
+  (срез + один шаблон против формулы и форматирования каждой строки); кэш текстов не участвует;
+- команда: ответ на сообщение из --team строк «Имя: HRmax, покой=…» и CSV с HRmax, покоем и ПАНО.
+
+    python -m bench.bench_zones [--team 30] [--rows 100000]
+"""
+import argparse
+import io
+import random
+import time
+
+from answers import answer_lines
+from calc import HAVE_NUMPY
+from calc.lexer import tokenize
+from calc.table import process_csv
+from calc.zones import HRMAX, KARVONEN, LTHR, ZONES, compute_bounds, zone_bounds, zone_lines, zone_table
+
+from ._util import ops_per_sec, print_table
+
+SAMPLES = {HRMAX: (196, None), KARVONEN: (196, 55), LTHR: (172, None)}
+
+
+def direct_lines(model: str, value: float, rest=None) -> str:
+    """Текст зон без таблиц: формула и f-строка на каждую зону."""
+    out = []
+    for label, name, lo, hi in ZONES[model]:
+        def hr(p):
+            return int(round(rest + (value - rest) * p / 100.0 if model == KARVONEN else value * p / 100.0))
+        if lo is None:
+            out.append(f"{label} <{hi}%: <{hr(hi)} ({name})")
+        elif hi is None:
+            out.append(f"{label} >{lo}%: >{hr(lo)} ({name})")
+        else:
+            out.append(f"{label} {lo}–{hi}%: {hr(lo)}–{hr(hi)} ({name})")
+    return "\n".join(out)
+
+def team_lines(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    return [tokenize(f"Спортсмен {i}: {rnd.randint(170, 205)}, покой={rnd.randint(38, 70)}") for i in range(n)]
+
+def team_csv(rows: int, seed: int = 1) -> str:
+    rnd = random.Random(seed)
+    lines = ["name;hrmax;покой;пано"]
+    lines += [f"a{i};{rnd.randint(160, 210)};{rnd.randint(35, 75)};{rnd.randint(140, 190)}" for i in range(rows)]
+    return "\n".join(lines) + "\n"
+
+
+def run_bench(team: int, rows: int) -> None:
+    build = []
+    for model in ZONES:
+        zone_table.cache_clear()
+        t0 = time.perf_counter()
+        table = zone_table(model)
+        build.append((model, f"{(time.perf_counter() - t0) * 1e3:.1f}", len(table) * table.itemsize))
+    print(f"NumPy: {'да' if HAVE_NUMPY else 'нет (чистый Python)'}")
+    print_table(("model", "build ms", "bytes"), build)
+    print()
+
+    rows_out = []
+    for model, (value, rest) in SAMPLES.items():
+        assert zone_lines.__wrapped__(model, value, rest) == direct_lines(model, value, rest)
+        lookup = ops_per_sec(lambda: zone_bounds(model, value, rest))
+        compute = ops_per_sec(lambda: compute_bounds(model, value, rest))
+        text = ops_per_sec(lambda: zone_lines.__wrapped__(model, value, rest))
+        direct = ops_per_sec(lambda: direct_lines(model, value, rest))
+        rows_out.append((model, lookup, compute, f"{lookup / compute:.1f}x", text, direct, f"{text / direct:.1f}x"))
+    print_table(("model", "bounds table/s", "bounds calc/s", "speedup", "text table/s", "text calc/s", "speedup"),
+                rows_out)
+    print()
+
+    lines = team_lines(team)
+    def answer_team():
+        zone_lines.cache_clear()
+        answer_lines("hr", lines)
+    msg = ops_per_sec(answer_team)
+    data = team_csv(rows)
+    t0 = time.perf_counter()
+    process_csv(io.StringIO(data), io.StringIO())
+    csv_s = time.perf_counter() - t0
+    print_table(("workload", "rate"), [
+        (f"сообщение из {team} строк (Карвонен)", f"{msg * team:,.0f} строк/с"),
+        (f"CSV {rows} строк (Карвонен + ПАНО)", f"{rows / csv_s:,.0f} строк/с"),
+    ])
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--team", type=int, default=30)
+    p.add_argument("--rows", type=int, default=100_000)
+    a = p.parse_args()
+    run_bench(a.team, a.rows)
@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Локальная замена Telegram Bot API для нагрузочных тестов (бот подключается через BOT_API_URL).
+
+Методы: getMe, getUpdates (long poll), setWebhook, deleteWebhook, getWebhookInfo,
+sendMessage, editMessageText, answerCallbackQuery, answerInlineQuery, getFile, sendDocument;
+остальные — 404 как у Telegram. Файлы для документов кладутся через add_file() и отдаются по /file/bot<token>/.
+Исходящие методы (send/edit/answer) можно замедлить (latency ± jitter) и часть из них
+отклонять ответом 429 с retry_after. Нажатие старше CALLBACK_QUERY_TTL на answerCallbackQuery
+получает 400 «query is too old», как у Telegram.
+
+Апдейты кладутся через push_update(): при установленном вебхуке они отправляются POST-ом
+на его URL (как и Telegram, с повторами, пока вебхук не ответит 200), иначе ждут getUpdates;
+накопленные апдейты уходят на вебхук сразу после setWebhook. set_webhook() регистрирует вебхук
+без бота — как будто его оставил предыдущий процесс. Ответы бота по чатам читаются через next_reply().
+"""
+import asyncio
+import itertools
+import json
+import random
+import time
+from collections import Counter
+from email.parser import BytesParser
+from email.policy import HTTP
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+from http_server import Request, Response, start_http_server
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Athletics", "username": "athletics_fake_bot"}
+UPLOAD_LIMIT = 50 * 1024 * 1024  # предел загрузки файла ботом в Bot API
+OUTGOING = ("sendMessage", "editMessageText", "answerCallbackQuery", "sendDocument")
+CALLBACK_QUERY_TTL = 15.0         # на более старое нажатие answerCallbackQuery отвечает 400, как Telegram
+REDELIVERY_DELAY = 0.05           # повтор доставки на вебхук каждые 50 мс, до 10 с
+REDELIVERY_ATTEMPTS = 200
+
+
+class Reply(NamedTuple):
+    method: str
+    chat_id: int
+    text: str
+    at: float  # time.perf_counter()
+    document: bytes = b""
+
+
+def _json(status: int, payload: dict) -> Response:
+    return status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+
+def _ok(result) -> Response:
+    return _json(200, {"ok": True, "result": result})
+
+def _error(status: int, description: str, **parameters) -> Response:
+    payload = {"ok": False, "error_code": status, "description": description}
+    if parameters:
+        payload["parameters"] = parameters
+    return _json(status, payload)
+
+def _params(req: Request) -> Dict[str, object]:
+    """Параметры метода: JSON-тело или form-urlencoded (PTB кодирует вложенные значения в JSON)."""
+    out: Dict[str, object] = dict(parse_qsl(req.query))
+    if not req.body:
+        return out
+    ctype = req.headers.get("content-type", "")
+    if ctype.startswith("application/json"):
+        out.update(json.loads(req.body))
+    elif ctype.startswith("multipart/form-data"):
+        # загрузка файлов: поля — строками, файлы — байтами
+        msg = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {ctype}\r\n\r\n".encode("latin-1") + req.body)
+        for part in msg.iter_parts():
+            data = part.get_payload(decode=True)
+            out[part.get_param("name", header="content-disposition")] = (
+                data if part.get_filename() else data.decode("utf-8"))
+    else:
+        out.update(parse_qsl(req.body.decode("utf-8")))
+    return out
+
+
+class _Poster:
+    """Минимальный HTTP/1.1 клиент с keep-alive для доставки апдейтов на вебхук."""
+
+    def __init__(self, url: str, secret: str, connections: int = 8) -> None:
+        parts = urlsplit(url)
+        self.host, self.port, self.path = parts.hostname, parts.port or 80, parts.path or "/"
+        self.secret = secret
+        self._idle: List[tuple] = []
+        self._slots = asyncio.Semaphore(connections)
+
+    async def post(self, body: bytes) -> int:
+        async with self._slots:
+            try:
+                conn = self._idle.pop() if self._idle else await asyncio.open_connection(self.host, self.port)
+            except OSError:  # бот ещё (или уже) не слушает
+                return 0
+            reader, writer = conn
+            head = (f"POST {self.path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                    f"X-Telegram-Bot-Api-Secret-Token: {self.secret}\r\nContent-Length: {len(body)}\r\n\r\n")
+            try:
+                writer.write(head.encode("latin-1") + body)
+                await writer.drain()
+                status = int((await reader.readline()).split()[1])
+                length = 0
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                if length:
+                    await reader.readexactly(length)
+            except (ConnectionError, asyncio.IncompleteReadError, IndexError, ValueError):
+                writer.close()
+                return 0
+            self._idle.append(conn)
+            return status
+
+    def close(self) -> None:
+        for _, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, rate_limit: float = 0.0,
+                 retry_after: int = 1, seed: Optional[int] = None) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit      # доля исходящих вызовов, получающих 429
+        self.retry_after = retry_after
+        self.calls: Counter = Counter()
+        self.limited = 0
+        self.webhook_url = ""
+        self._rnd = random.Random(seed)
+        self._server = None
+        self._poster: Optional[_Poster] = None
+        self._pending: List[dict] = []
+        self._pending_event = asyncio.Event()
+        self._replies: Dict[int, asyncio.Queue] = {}
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1000)
+        self._tasks: set = set()
+        self._inline_users: Dict[str, int] = {}
+        self._callback_at: Dict[str, float] = {}
+        self._files: Dict[str, bytes] = {}
+        self.ready = asyncio.Event()      # бот начал получать апдейты (getUpdates или setWebhook)
+        self.url = ""
+
+    # -------------------- ЖИЗНЕННЫЙ ЦИКЛ --------------------
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._server = await start_http_server(self._handle, host, port, max_body=UPLOAD_LIMIT)
+        port = self._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._poster is not None:
+            self._poster.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # -------------------- АПДЕЙТЫ И ОТВЕТЫ --------------------
+    def message_update(self, user_id: int, text: str) -> dict:
+        user = {"id": user_id, "is_bot": False, "first_name": f"u{user_id}"}
+        return {"update_id": next(self._update_ids), "message": {
+            "message_id": next(self._message_ids), "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"}, "from": user, "text": text}}
+
+    def callback_update(self, user_id: int, data: str, message_id: int = 1) -> dict:
+        user = {"id": user_id, "is_bot": False, "first_name": f"u{user_id}"}
+        update_id = next(self._update_ids)
+        query_id = str(next(self._update_ids))
+        self._callback_at[query_id] = time.monotonic()
+        return {"update_id": update_id, "callback_query": {
+            "id": query_id, "from": user, "chat_instance": str(user_id), "data": data,
+            "message": {"message_id": message_id, "date": int(time.time()),
+                        "chat": {"id": user_id, "type": "private"}, "text": "menu"}}}
+
+    def inline_update(self, user_id: int, query: str) -> dict:
+        user = {"id": user_id, "is_bot": False, "first_name": f"u{user_id}"}
+        update_id = next(self._update_ids)
+        query_id = str(next(self._update_ids))
+        self._inline_users[query_id] = user_id
+        return {"update_id": update_id, "inline_query": {"id": query_id, "from": user, "query": query, "offset": ""}}
+
+    def add_file(self, data: bytes) -> str:
+        """Регистрирует содержимое файла; возвращает file_id для document_update()."""
+        file_id = f"file{len(self._files) + 1}"
+        self._files[file_id] = data
+        return file_id
+
+    def document_update(self, user_id: int, file_id: str, file_name: str, caption: str = "",
+                        mime_type: str = "text/csv") -> dict:
+        update = self.message_update(user_id, "")
+        message = update["message"]
+        del message["text"]
+        message["document"] = {"file_id": file_id, "file_unique_id": file_id, "file_name": file_name,
+                               "mime_type": mime_type, "file_size": len(self._files[file_id])}
+        if caption:
+            message["caption"] = caption
+        return update
+
+    def push_update(self, update: dict) -> None:
+        if self._poster is not None:
+            task = asyncio.ensure_future(self._deliver(json.dumps(update).encode("utf-8")))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._pending.append(update)
+            self._pending_event.set()
+
+    async def _deliver(self, body: bytes) -> None:
+        for _ in range(REDELIVERY_ATTEMPTS):
+            if self._poster is None:  # вебхук сняли — апдейт теряется, как и у Telegram при deleteWebhook
+                return
+            if await self._poster.post(body) == 200:
+                return
+            await asyncio.sleep(REDELIVERY_DELAY)
+
+    def set_webhook(self, url: str, secret: str = "") -> None:
+        self.webhook_url = url
+        if self._poster is not None:
+            self._poster.close()
+        self._poster = _Poster(url, secret) if url else None
+        if self._poster is not None:
+            pending, self._pending = self._pending, []
+            for update in pending:
+                self.push_update(update)
+
+    def replies(self, chat_id: int) -> asyncio.Queue:
+        q = self._replies.get(chat_id)
+        if q is None:
+            q = self._replies[chat_id] = asyncio.Queue()
+        return q
+
+    async def next_reply(self, chat_id: int, timeout: float) -> Optional[Reply]:
+        """Следующее сообщение/правка бота в чате или None по таймауту (answerCallbackQuery не считается)."""
+        try:
+            return await asyncio.wait_for(self.replies(chat_id).get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    # -------------------- HTTP --------------------
+    async def _handle(self, req: Request) -> Response:
+        # /bot<token>/<method>
+        if req.path.startswith("/file/"):
+            data = self._files.get(req.path.rsplit("/", 1)[-1])
+            return (200, data, "application/octet-stream") if data is not None else _error(404, "Not Found")
+        method = req.path.rsplit("/", 1)[-1]
+        self.calls[method] += 1
+        handler = getattr(self, f"_m_{method}", None)
+        if handler is None:
+            return _error(404, "Not Found")
+        params = _params(req)
+        if method in OUTGOING:
+            if self.latency or self.jitter:
+                await asyncio.sleep(max(0.0, self.latency + self._rnd.uniform(-self.jitter, self.jitter)))
+            if self.rate_limit and self._rnd.random() < self.rate_limit:
+                self.limited += 1
+                return _error(429, f"Too Many Requests: retry after {self.retry_after}",
+                              retry_after=self.retry_after)
+        return await handler(params)
+
+    async def _m_getMe(self, params) -> Response:
+        return _ok(BOT_USER)
+
+    async def _m_getUpdates(self, params) -> Response:
+        self.ready.set()
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        if offset:
+            # очередь упорядочена по update_id — подтверждённые лежат в начале
+            n = 0
+            while n < len(self._pending) and self._pending[n]["update_id"] < offset:
+                n += 1
+            del self._pending[:n]
+        if not self._pending and timeout > 0:
+            self._pending_event.clear()
+            try:
+                await asyncio.wait_for(self._pending_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return _ok(self._pending[:limit])
+
+    async def _m_setWebhook(self, params) -> Response:
+        self.set_webhook(str(params.get("url") or ""), str(params.get("secret_token") or ""))
+        self.ready.set()
+        return _ok(True)
+
+    async def _m_deleteWebhook(self, params) -> Response:
+        self.webhook_url = ""
+        if self._poster is not None:
+            self._poster.close()
+            self._poster = None
+        return _ok(True)
+
+    async def _m_getWebhookInfo(self, params) -> Response:
+        return _ok({"url": self.webhook_url, "has_custom_certificate": False,
+                    "pending_update_count": len(self._pending)})
+
+    def _message(self, chat_id: int, text: str, message_id: Optional[int] = None) -> dict:
+        return {"message_id": message_id or next(self._message_ids), "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"}, "from": BOT_USER, "text": text}
+
+    async def _m_sendMessage(self, params) -> Response:
+        chat_id, text = int(params["chat_id"]), str(params.get("text", ""))
+        self.replies(chat_id).put_nowait(Reply("sendMessage", chat_id, text, time.perf_counter()))
+        return _ok(self._message(chat_id, text))
+
+    async def _m_editMessageText(self, params) -> Response:
+        chat_id, text = int(params["chat_id"]), str(params.get("text", ""))
+        self.replies(chat_id).put_nowait(Reply("editMessageText", chat_id, text, time.perf_counter()))
+        return _ok(self._message(chat_id, text, int(params.get("message_id") or 0)))
+
+    async def _m_answerCallbackQuery(self, params) -> Response:
+        pressed = self._callback_at.pop(str(params.get("callback_query_id")), None)
+        if pressed is None or time.monotonic() - pressed > CALLBACK_QUERY_TTL:
+            return _error(400, "Bad Request: query is too old and response timeout expired or query ID is invalid")
+        return _ok(True)
+
+    async def _m_answerInlineQuery(self, params) -> Response:
+        """Ответ на инлайн-запрос приходит в очередь пользователя; text — JSON со списком результатов."""
+        user_id = self._inline_users.pop(str(params.get("inline_query_id")), None)
+        if user_id is None:
+            return _error(400, "Bad Request: query is too old and response timeout expired or query ID is invalid")
+        self.replies(user_id).put_nowait(Reply("answerInlineQuery", user_id, str(params.get("results", "[]")),
+                                               time.perf_counter()))
+        return _ok(True)
+
+    async def _m_getFile(self, params) -> Response:
+        file_id = str(params.get("file_id"))
+        if file_id not in self._files:
+            return _error(400, "Bad Request: invalid file_id")
+        return _ok({"file_id": file_id, "file_unique_id": file_id, "file_size": len(self._files[file_id]),
+                    "file_path": f"documents/{file_id}"})
+
+    async def _m_sendDocument(self, params) -> Response:
+        """Документ бота приходит в очередь чата: text — подпись, document — содержимое файла."""
+        chat_id, caption, data = int(params["chat_id"]), str(params.get("caption", "")), params.get("document")
+        data = data if isinstance(data, bytes) else b""
+        self.replies(chat_id).put_nowait(Reply("sendDocument", chat_id, caption, time.perf_counter(), data))
+        message = self._message(chat_id, "")
+        message["document"] = {"file_id": "sent", "file_unique_id": "sent", "file_size": len(data)}
+        return _ok(message)
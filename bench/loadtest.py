@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный прогон бота против локального Bot API (bench.fake_api).
+
+Бот запускается отдельным процессом (`python main.py`, т.е. build_app() с BOT_API_URL на фейк),
+в режиме long polling или вебхука. Симулированные пользователи параллельно проигрывают сессии:
+нажатие меню → несколько вводов → «⬅ Назад». Каждый шаг ждёт ответа бота (sendMessage или
+editMessageText в своём чате), время до ответа — задержка шага.
+
+Отчёт: пропускная способность, перцентили задержки (всего и по режимам), таймауты,
+число 429 и рост RSS процесса бота (с --workers — сумма по супервизору и воркерам). С порогами (--max-p99-ms, --max-rss-growth-mb,
+--max-timeouts) код выхода 1 при регрессии — для CI.
+
+    python -m bench.loadtest --users 100 --duration 20
+    python -m bench.loadtest --mode webhook --latency 0.02 --rate-limit 0.01 --json report.json
+    python -m bench.loadtest --workers 4 --kill-worker 5         # супервизор, 4 воркера, падение одного
+    python -m bench.loadtest --dump-sessions sessions.jsonl      # синтетический корпус в файл
+    python -m bench.loadtest --replay sessions.jsonl             # проиграть записанные сессии
+
+Формат сессий (JSONL): одна сессия на строку — список шагов {"tap": "<callback_data>"} или {"text": "..."}.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from .fake_api import FakeBotAPI
+from ._util import percentile, print_table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SYNTHETIC_INPUTS = {
+    "hr":           ["196, 72-83", "190, 70", "185, 60-70", "200, 85", "196, x"],
+    "time_by_pace": ["1000м, 4:00", "1mi, 6:00/mi", "3км, 3:45", "21.1km, 4:30"],
+    "splits":       ["4:00", "21.1км, 1:30:00", "4:00/км, круг=400, 5км", "3:30-4:00, шаг=10"],
+    "calc":         ["dist=10км, pace=3:45", "5000м, time=18:30", "pace=4:10, time=45:00"],
+    "riegel":       ["10км, 41:30 -> 21.1км", "3000м, 10:00 -> 5000м, exp=1.07"],
+    "riegel_fit":   ["5км 19:00, 10км 40:00, 21.1км 1:28:00 -> 42.195км"],
+    "tread":        ["speed=12.5kmh", "pace=4:48/км", "7.5mph", "pace=7:30/mi"],
+}
+
+
+def synthetic_sessions(n: int, seed: int = 1) -> List[List[dict]]:
+    rnd = random.Random(seed)
+    out = []
+    modes = list(SYNTHETIC_INPUTS)
+    for _ in range(n):
+        mode = rnd.choice(modes)
+        steps = [{"tap": f"menu_{mode}"}]
+        steps += [{"text": rnd.choice(SYNTHETIC_INPUTS[mode])} for _ in range(rnd.randint(1, 4))]
+        steps.append({"tap": "back_main"})
+        out.append(steps)
+    return out
+
+def load_sessions(path: str) -> List[List[dict]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """VmRSS процесса из /proc (Linux); None, если недоступно."""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+def child_pids(pid: int) -> List[int]:
+    """Прямые потомки процесса (Linux, /proc/<pid>/task/*/children)."""
+    out: List[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                out += [int(x) for x in f.read().split()]
+    except OSError:
+        pass
+    return out
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    """Суммарный RSS процесса и всех его потомков (супервизор + воркеры)."""
+    total = rss_bytes(pid)
+    if total is None:
+        return None
+    return total + sum(tree_rss_bytes(c) or 0 for c in child_pids(pid))
+
+
+class Stats:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.timeouts = 0
+        self.steps = 0
+
+    def add(self, label: str, seconds: float) -> None:
+        self.latencies[label].append(seconds)
+        self.steps += 1
+
+    def all(self) -> List[float]:
+        return sorted(x for xs in self.latencies.values() for x in xs)
+
+
+async def simulate_user(api: FakeBotAPI, user_id: int, sessions: List[List[dict]], deadline: float,
+                        stats: Stats, timeout: float, rnd: random.Random, think: float) -> None:
+    replies = api.replies(user_id)
+    mode = "menu"
+    while time.perf_counter() < deadline:
+        for step in rnd.choice(sessions):
+            while not replies.empty():  # хвосты прошлых шагов (например, ответ после таймаута)
+                replies.get_nowait()
+            sent = time.perf_counter()
+            if "tap" in step:
+                data = step["tap"]
+                mode = data[len("menu_"):] if data.startswith("menu_") else "menu"
+                api.push_update(api.callback_update(user_id, data))
+                label = "tap"
+            else:
+                api.push_update(api.message_update(user_id, step["text"]))
+                label = mode
+            reply = await api.next_reply(user_id, timeout)
+            if reply is None:
+                stats.timeouts += 1
+            else:
+                stats.add(label, reply.at - sent)
+            if think:
+                await asyncio.sleep(rnd.uniform(0, 2 * think))
+            if time.perf_counter() >= deadline:
+                return
+
+
+def start_bot(api_url: str, mode: str, extra_env: Dict[str, str], port: Optional[int] = None) -> subprocess.Popen:
+    env = dict(os.environ, BOT_TOKEN="123456:LOADTEST", BOT_API_URL=api_url, **extra_env)
+    env.pop("WEBHOOK_URL", None)
+    if mode == "webhook" or int(env.get("WORKERS", "1")) > 1:
+        port = port or _free_port()
+        env.update(WEBHOOK_URL=f"http://127.0.0.1:{port}/hook", WEBHOOK_SECRET="loadtest",
+                   WEBHOOK_LISTEN="127.0.0.1", PORT=str(port))
+    # лог бота — во временный файл: неразобранный PIPE переполнится и остановит бота
+    log = tempfile.TemporaryFile()
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, "main.py")], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=log)
+    proc.log = log
+    return proc
+
+def bot_log_tail(proc: subprocess.Popen, limit: int = 2000) -> str:
+    proc.log.seek(0)
+    return proc.log.read().decode(errors="replace")[-limit:]
+
+async def stop_bot(proc: subprocess.Popen, timeout: float = 15.0) -> None:
+    """SIGINT и ожидание выхода; event loop не блокируется — фейковый API нужен боту до конца остановки."""
+    if proc.poll() is None:
+        proc.send_signal(signal.SIGINT)
+        deadline = time.perf_counter() + timeout
+        while proc.poll() is None and time.perf_counter() < deadline:
+            await asyncio.sleep(0.05)
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+
+
+async def run(args) -> dict:
+    sessions = load_sessions(args.replay) if args.replay else synthetic_sessions(1000, args.seed)
+    api = FakeBotAPI(latency=args.latency, jitter=args.jitter, rate_limit=args.rate_limit,
+                     retry_after=args.retry_after, seed=args.seed)
+    url = await api.start()
+    extra = dict(kv.split("=", 1) for kv in args.env)
+    if args.workers > 1:
+        extra["WORKERS"] = str(args.workers)  # воркеры за супервизором — только режим вебхука
+        args.mode = "webhook"
+    proc = start_bot(url, args.mode, extra)
+    killed: List[int] = []
+    try:
+        try:
+            await asyncio.wait_for(api.ready.wait(), args.startup_timeout)
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"бот не начал получать апдейты за {args.startup_timeout} с\n{bot_log_tail(proc)}")
+        rnd = random.Random(args.seed)
+
+        async def phase(seconds: float, stats: Stats) -> float:
+            deadline = time.perf_counter() + seconds
+            t0 = time.perf_counter()
+            await asyncio.gather(*(
+                simulate_user(api, 10_000 + i, sessions, deadline, stats, args.reply_timeout,
+                              random.Random(rnd.random()), args.think)
+                for i in range(args.users)))
+            return time.perf_counter() - t0
+
+        async def kill_worker(delay: float) -> None:
+            # проверка перезапуска: SIGKILL одному воркеру посреди замера
+            await asyncio.sleep(delay)
+            pids = child_pids(proc.pid)
+            if pids:
+                os.kill(pids[0], signal.SIGKILL)
+                killed.append(pids[0])
+
+        rss_start = tree_rss_bytes(proc.pid)
+        await phase(args.warmup, Stats())
+        rss_warm = tree_rss_bytes(proc.pid)
+        stats = Stats()
+        killer = asyncio.create_task(kill_worker(args.kill_worker)) if args.kill_worker is not None else None
+        elapsed = await phase(args.duration, stats)
+        if killer is not None:
+            await killer
+        rss_end = tree_rss_bytes(proc.pid)
+        alive_workers = len(child_pids(proc.pid))
+    finally:
+        await stop_bot(proc)
+        await api.stop()
+
+    lat = stats.all()
+    report = {
+        "mode": args.mode, "workers": args.workers, "users": args.users, "duration_s": round(elapsed, 2),
+        "steps": stats.steps, "timeouts": stats.timeouts, "rate_limited": api.limited,
+        "throughput_rps": round(stats.steps / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(lat, 50) * 1e3, 2), "p90_ms": round(percentile(lat, 90) * 1e3, 2),
+        "p99_ms": round(percentile(lat, 99) * 1e3, 2), "max_ms": round(lat[-1] * 1e3, 2) if lat else None,
+        "per_label": {k: {"n": len(v), "p50_ms": round(percentile(sorted(v), 50) * 1e3, 2),
+                          "p99_ms": round(percentile(sorted(v), 99) * 1e3, 2)}
+                      for k, v in sorted(stats.latencies.items())},
+        "rss_start_mb": rss_start and round(rss_start / 2**20, 1),
+        "rss_after_warmup_mb": rss_warm and round(rss_warm / 2**20, 1),
+        "rss_end_mb": rss_end and round(rss_end / 2**20, 1),
+        "rss_growth_mb": round((rss_end - rss_warm) / 2**20, 1) if rss_end and rss_warm else None,
+        "api_calls": dict(api.calls),
+    }
+    if args.workers > 1:
+        report.update(killed_workers=killed, alive_workers_at_end=alive_workers)
+    return report
+
+
+def print_report(r: dict) -> None:
+    print(f"режим: {r['mode']}, воркеров: {r['workers']}, пользователей: {r['users']}, длительность: {r['duration_s']} с")
+    if "killed_workers" in r:
+        print(f"убито воркеров: {len(r['killed_workers'])}, живых к концу: {r['alive_workers_at_end']}")
+    print(f"шагов: {r['steps']} ({r['throughput_rps']}/с), таймаутов: {r['timeouts']}, 429: {r['rate_limited']}")
+    print(f"задержка, мс: p50 {r['p50_ms']}  p90 {r['p90_ms']}  p99 {r['p99_ms']}  max {r['max_ms']}")
+    print(f"RSS бота, МБ: старт {r['rss_start_mb']}, после прогрева {r['rss_after_warmup_mb']}, "
+          f"конец {r['rss_end_mb']} (рост {r['rss_growth_mb']})")
+    print_table(("step", "n", "p50 ms", "p99 ms"),
+                [(k, v["n"], f"{v['p50_ms']:.2f}", f"{v['p99_ms']:.2f}") for k, v in r["per_label"].items()])
+
+def check_thresholds(r: dict, args) -> List[str]:
+    failed = []
+    if args.max_p99_ms is not None and r["p99_ms"] > args.max_p99_ms:
+        failed.append(f"p99 {r['p99_ms']} мс > {args.max_p99_ms}")
+    if args.max_rss_growth_mb is not None and (r["rss_growth_mb"] or 0) > args.max_rss_growth_mb:
+        failed.append(f"рост RSS {r['rss_growth_mb']} МБ > {args.max_rss_growth_mb}")
+    if args.max_timeouts is not None and r["timeouts"] > args.max_timeouts:
+        failed.append(f"таймаутов {r['timeouts']} > {args.max_timeouts}")
+    return failed
+
+
+def make_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    p.add_argument("--workers", type=int, default=1, help="WORKERS=N: супервизор и N воркеров (режим вебхука)")
+    p.add_argument("--kill-worker", type=float, metavar="SECONDS",
+                   help="убить одного воркера через SECONDS от начала замера (проверка перезапуска)")
+    p.add_argument("--users", type=int, default=50)
+    p.add_argument("--duration", type=float, default=10.0, help="секунд замера")
+    p.add_argument("--warmup", type=float, default=2.0, help="секунд прогрева (не входит в отчёт)")
+    p.add_argument("--think", type=float, default=0.0, help="средняя пауза пользователя между шагами, с")
+    p.add_argument("--latency", type=float, default=0.0, help="задержка исходящих методов фейкового API, с")
+    p.add_argument("--jitter", type=float, default=0.0)
+    p.add_argument("--rate-limit", type=float, default=0.0, help="доля исходящих вызовов с ответом 429")
+    p.add_argument("--retry-after", type=int, default=1)
+    p.add_argument("--reply-timeout", type=float, default=5.0)
+    p.add_argument("--startup-timeout", type=float, default=30.0)
+    p.add_argument("--replay", help="JSONL с сессиями вместо синтетических")
+    p.add_argument("--dump-sessions", help="записать синтетические сессии в JSONL и выйти")
+    p.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="переменные окружения бота")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--json", help="сохранить отчёт в файл")
+    p.add_argument("--max-p99-ms", type=float)
+    p.add_argument("--max-rss-growth-mb", type=float)
+    p.add_argument("--max-timeouts", type=int)
+    return p
+
+def main(argv=None) -> int:
+    args = make_parser().parse_args(argv)
+
+    if args.dump_sessions:
+        with open(args.dump_sessions, "w", encoding="utf-8") as f:
+            for s in synthetic_sessions(1000, args.seed):
+                f.write(json.dumps(s, ensure_ascii=False) + "\n")
+        return 0
+
+    report = asyncio.run(run(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    failed = check_thresholds(report, args)
+    for msg in failed:
+        print("РЕГРЕССИЯ:", msg)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш готовых ответов обработчиков.
+Ключ — режим + канонизированные токены лексера (а не сырой текст), поэтому
+«10km» и «10 км» попадают в одну запись. Значение — итоговый текст ответа.
+
+Реализации:
+  LRUReplyCache    — в памяти процесса, ограничен по числу записей и по байтам (по умолчанию);
+  SqliteReplyCache — общий локальный файл SQLite, чтобы кэш делили несколько воркеров;
+                     диск читается и пишется вне event loop, записи привязаны к версии кода ответов.
+Выбор — make_reply_cache("memory" | "sqlite:/путь/к/файлу.db" | "off").
+"""
+import asyncio
+import hashlib
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from calc.lexer import Token
+
+_MAX_PENDING_WRITES = 10_000
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+# формат ключа и договор «одинаковый ключ — одинаковый ответ»; увеличить, если они меняются,
+# чтобы записи общего кэша от прежних версий не отдавались (2 — ответы не читают Token.text)
+KEY_FORMAT = 2
+
+
+def cache_key(mode: str, tokens: Sequence[Token]) -> str:
+    """Канонический ключ: режим и (вид, значение, единица, ключ) каждого токена без исходного текста.
+    Поэтому ответы (answers.py) читают только эти поля: токены с одним ключом обязаны давать один ответ."""
+    parts = [mode]
+    for t in tokens:
+        parts.append(f"{t.kind}:{t.value!r}:{t.unit}:{t.key}")
+    return "|".join(parts)
+
+
+def reply_code_version() -> str:
+    """Короткий хеш формата ключа и исходников ключа и ответов (cache.py, answers.py, calc/*.py) —
+    версия записей общего кэша."""
+    calc_dir = os.path.join(_ROOT, "calc")
+    files = [os.path.join(_ROOT, "cache.py"), os.path.join(_ROOT, "answers.py")]
+    files += sorted(os.path.join(calc_dir, f) for f in os.listdir(calc_dir) if f.endswith(".py"))
+    h = hashlib.sha1(f"key{KEY_FORMAT}".encode())
+    for path in files:
+        with open(path, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+class ReplyCache:
+    """Интерфейс кэша ответов. Базовая реализация ничего не хранит (режим "off")."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: str) -> None:
+        pass
+
+    async def prefetch(self, keys: Sequence[str]) -> None:
+        """Подгружает ключи из общего хранилища в память до вызовов get(); у кэшей в памяти — ничего."""
+
+    def __len__(self) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": len(self)}
+
+
+def _entry_size(key: str, value: str) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class LRUReplyCache(ReplyCache):
+    """LRU в памяти процесса с лимитом записей и суммарного размера строк (байты)."""
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: int = 8 << 20) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._data: "OrderedDict[str, str]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= _entry_size(key, old)
+        size = _entry_size(key, value)
+        if size > self.max_bytes:
+            return
+        self._data[key] = value
+        self.bytes += size
+        while len(self._data) > self.max_entries or self.bytes > self.max_bytes:
+            k, v = self._data.popitem(last=False)
+            self.bytes -= _entry_size(k, v)
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._data
+
+    def stats(self) -> Dict[str, int]:
+        out = super().stats()
+        out["bytes"] = self.bytes
+        return out
+
+
+class SqliteReplyCache(ReplyCache):
+    """Общий для процессов кэш в файле SQLite (WAL) с LRU в памяти процесса перед ним.
+
+    get/put работают только с памятью: новые ответы уходят в файл пачками из фонового потока,
+    а читает файл prefetch() — в потоке, до расчёта, — поэтому event loop не ждёт диск.
+    Ключи в файле начинаются с версии кода ответов (reply_code_version()): после деплоя,
+    поменявшего формат или формулу, старые записи не читаются. Записи старше max_age секунд
+    не читаются и удаляются при подрезке. Счётчики — локальные для процесса.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100_000, max_age: float = 7 * 24 * 3600,
+                 version: Optional[str] = None, memory_entries: int = 10_000) -> None:
+        super().__init__()
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.version = reply_code_version() if version is None else version
+        self._memory = LRUReplyCache(memory_entries)
+        self._lock = threading.Lock()      # читающее соединение используется из потоков to_thread
+        self._reader = self._connect()
+        self._reader.execute(
+            "CREATE TABLE IF NOT EXISTS reply_cache (k TEXT PRIMARY KEY, v TEXT NOT NULL, ctime REAL NOT NULL)"
+        )
+        self._reader.execute("CREATE INDEX IF NOT EXISTS reply_cache_ctime ON reply_cache (ctime)")
+        self._writes: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._write_loop, name="reply-cache-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, timeout=5.0, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=OFF")
+        return db
+
+    def get(self, key: str) -> Optional[str]:
+        value = self._memory.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def put(self, key: str, value: str) -> None:
+        self._memory.put(key, value)
+        if self._writes.qsize() < _MAX_PENDING_WRITES:    # запись не успевает — это всего лишь кэш
+            self._writes.put((f"{self.version}|{key}", value, time.time()))
+
+    async def prefetch(self, keys: Sequence[str]) -> None:
+        missing = [k for k in dict.fromkeys(keys) if k not in self._memory]
+        if missing:
+            for key, value in await asyncio.to_thread(self._read, missing):
+                self._memory.put(key, value)
+
+    def _read(self, keys: List[str]) -> List[Tuple[str, str]]:
+        prefix = f"{self.version}|"
+        out = []
+        with self._lock:
+            try:
+                for i in range(0, len(keys), 500):    # лимит параметров запроса SQLite
+                    part = [prefix + k for k in keys[i:i + 500]]
+                    rows = self._reader.execute(
+                        f"SELECT k, v FROM reply_cache WHERE k IN ({','.join('?' * len(part))}) AND ctime >= ?",
+                        (*part, time.time() - self.max_age),
+                    ).fetchall()
+                    out.extend((k[len(prefix):], v) for k, v in rows)
+            except sqlite3.OperationalError:  # файл занят другим воркером — считаем промахом
+                pass
+        return out
+
+    def _write_loop(self) -> None:
+        db = self._connect()
+        puts = 0
+        running = True
+        while running:
+            batch = [self._writes.get()]
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:   # сигнал close()
+                running = False
+                batch = [row for row in batch if row is not None]
+            if not batch:
+                continue
+            try:
+                db.execute("BEGIN")
+                db.executemany("INSERT OR REPLACE INTO reply_cache (k, v, ctime) VALUES (?, ?, ?)", batch)
+                db.execute("COMMIT")
+                puts += len(batch)
+                # подрезаем не на каждой записи, а раз в 1% лимита
+                if puts >= max(1, self.max_entries // 100):
+                    puts = 0
+                    self._trim(db)
+            except sqlite3.Error:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+        db.close()
+
+    def _trim(self, db: sqlite3.Connection) -> None:
+        old = db.execute("DELETE FROM reply_cache WHERE ctime < ?", (time.time() - self.max_age,)).rowcount
+        (count,) = db.execute("SELECT COUNT(*) FROM reply_cache").fetchone()
+        extra = max(0, count - self.max_entries)
+        if extra:
+            db.execute(
+                "DELETE FROM reply_cache WHERE k IN (SELECT k FROM reply_cache ORDER BY ctime LIMIT ?)", (extra,)
+            )
+        self.evictions += old + extra
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    def close(self) -> None:
+        """Дописывает очередь записи в файл и закрывает соединения; повторный вызов ничего не делает."""
+        if self._writer.is_alive():
+            self._writes.put(None)
+            self._writer.join()
+            with self._lock:
+                self._reader.close()
+
+
+def make_reply_cache(spec: Optional[str] = None, max_age: float = 7 * 24 * 3600) -> ReplyCache:
+    """Создаёт кэш по строке настройки: "memory" (по умолчанию), "sqlite:<путь>" или "off".
+    max_age — срок записей в файле SQLite, секунды."""
+    spec = (spec or "memory").strip()
+    if spec == "off":
+        return ReplyCache()
+    if spec.startswith("sqlite:"):
+        return SqliteReplyCache(spec[len("sqlite:"):], max_age=max_age)
+    if spec == "memory":
+        return LRUReplyCache()
+    raise ValueError(f"Неизвестный тип кэша: {spec!r}")
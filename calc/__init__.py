@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""
+Расчётное ядро бота: чистые функции без зависимости от telegram.
+Скалярные функции — для одного значения, *_batch — для массивов (NumPy, если установлен).
+"""
+from .errors import InputError
+from .units import (
+    MILES_PER_KM, KM_PER_MILE, METERS_PER_KM, METERS_PER_MILE,
+    km_to_miles, miles_to_km, meters_to_km, km_to_m,
+    pace_to_sec_per_km, sec_per_km_to_sec_per_mile,
+)
+from .parsing import (
+    parse_float, parse_time_to_seconds, format_seconds_to_hhmmss,
+    parse_distance, parse_pace,
+)
+from .core import (
+    DEFAULT_RIEGEL_EXP, convert_speed_to_pace, convert_pace_to_speed,
+    time_by_pace, distance_by_time, pace_by_time, hr_at_percent, riegel,
+)
+from .lexer import Token, tokenize
+from .batch import (
+    HAVE_NUMPY, load_numpy, riegel_batch, speed_to_pace_batch, pace_to_speed_batch,
+    time_by_pace_batch, distance_by_time_batch, pace_by_time_batch, hr_at_percent_batch,
+)
+from .splits import (
+    STANDARD_DISTANCES, split_grid, pace_range, lap_splits, standard_grid, standard_splits, range_splits,
+)
+from .zones import (
+    HRMAX, KARVONEN, LTHR, ZONES, compute_bounds, zone_bounds, zone_cells, zone_lines, zone_table, zone_tables,
+)
+from .fit import EXP_MAX, EXP_MIN, RiegelFit, fit_riegel, fit_riegel_batch, predict_riegel_batch
+from .table import DEFAULT_TARGETS, parse_targets, process_rows, process_csv, process_csv_file
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетные варианты формул из calc.core: принимают массивы (или скаляры, которые
+растягиваются до длины массивов) и считают всё за один вызов.
+Если установлен NumPy — вычисления векторные и результат numpy.ndarray,
+иначе — чистый Python и результат list. Ошибки те же, что у скалярных версий.
+"""
+import importlib.util
+import threading
+from typing import Any, Callable, List, Sequence
+
+from .core import (
+    DEFAULT_RIEGEL_EXP, convert_pace_to_speed, convert_speed_to_pace,
+    distance_by_time, hr_at_percent, pace_by_time, riegel, time_by_pace,
+)
+from .errors import InputError
+from .units import PACE_UNIT_METERS, SPEED_UNIT_MPS, KM_PER_MILE
+
+
+np = None    # модуль numpy после load_numpy()
+HAVE_NUMPY = importlib.util.find_spec("numpy") is not None
+_numpy_lock = threading.Lock()
+
+def load_numpy():
+    """Импортирует NumPy и возвращает модуль; None, если он не установлен.
+
+    NumPy импортируется ~100 мс, поэтому не при импорте calc: бот загружает его заданием
+    прогрева на старте, а без прогрева — первый пакетный расчёт.
+    """
+    global np
+    if np is None and HAVE_NUMPY:
+        with _numpy_lock:
+            if np is None:
+                import numpy
+                np = numpy
+    return np
+
+
+def _is_seq(x: Any) -> bool:
+    return hasattr(x, "__len__") and not isinstance(x, (str, bytes))
+
+def _columns(*args: Any) -> List[Sequence[float]]:
+    """Растягивает скаляры до общей длины последовательностей (fallback без NumPy)."""
+    n = None
+    for a in args:
+        if _is_seq(a):
+            if n is not None and len(a) != n:
+                raise ValueError("Массивы должны быть одной длины.")
+            n = len(a)
+    n = 1 if n is None else n
+    return [a if _is_seq(a) else [a] * n for a in args]
+
+def _map(fn: Callable[..., float], *args: Any) -> List[float]:
+    return [fn(*row) for row in zip(*_columns(*args))]
+
+def _arrays(*args: Any):
+    return np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in args))
+
+def _require_positive(arr, message: str) -> None:
+    if (arr <= 0).any():
+        raise InputError(message)
+
+
+def riegel_batch(t1_sec, d1_km, d2_km, exp=DEFAULT_RIEGEL_EXP):
+    """T2 = T1 × (D2/D1)^exp поэлементно; exp тоже может быть массивом."""
+    if load_numpy() is None:
+        return _map(riegel, t1_sec, d1_km, d2_km, exp)
+    t1, d1, d2, e = _arrays(t1_sec, d1_km, d2_km, exp)
+    _require_positive(d1, "Дистанции должны быть > 0.")
+    _require_positive(d2, "Дистанции должны быть > 0.")
+    return t1 * (d2 / d1) ** e
+
+def speed_to_pace_batch(speeds, unit: str = "kmh", pace_unit: str = "/km"):
+    """Скорости (kmh|mph|mps) → темпы в сек на '/km'|'/mi'."""
+    if load_numpy() is None:
+        return _map(lambda v: convert_speed_to_pace(v, unit, pace_unit), speeds)
+    if unit not in SPEED_UNIT_MPS:
+        raise ValueError("Неподдерживаемая единица скорости.")
+    (v,) = _arrays(speeds)
+    _require_positive(v, "Скорость должна быть > 0.")
+    return PACE_UNIT_METERS.get(pace_unit, PACE_UNIT_METERS["/mi"]) / (v * SPEED_UNIT_MPS[unit])
+
+def pace_to_speed_batch(paces, pace_unit: str = "/km", out_unit: str = "kmh"):
+    """Темпы (сек на '/km'|'/mi') → скорости в kmh|mph|mps."""
+    if load_numpy() is None:
+        return _map(lambda p: convert_pace_to_speed(p, pace_unit, out_unit), paces)
+    if out_unit not in SPEED_UNIT_MPS:
+        raise ValueError("Неподдерживаемая единица скорости.")
+    (p,) = _arrays(paces)
+    _require_positive(p, "Темп должен быть > 0.")
+    return PACE_UNIT_METERS.get(pace_unit, PACE_UNIT_METERS["/mi"]) / p / SPEED_UNIT_MPS[out_unit]
+
+def time_by_pace_batch(dist_km, pace_seconds, pace_unit: str = "/km"):
+    """Время (сек) по дистанциям (км) и темпам."""
+    if load_numpy() is None:
+        return _map(lambda d, p: time_by_pace(d, p, pace_unit), dist_km, pace_seconds)
+    d, p = _arrays(dist_km, pace_seconds)
+    return d * (p if pace_unit == "/km" else p / KM_PER_MILE)
+
+def distance_by_time_batch(time_sec, pace_seconds, pace_unit: str = "/km"):
+    """Дистанции (км) по времени и темпам."""
+    if load_numpy() is None:
+        return _map(lambda t, p: distance_by_time(t, p, pace_unit), time_sec, pace_seconds)
+    t, p = _arrays(time_sec, pace_seconds)
+    _require_positive(p, "Темп должен быть > 0.")
+    return t / (p if pace_unit == "/km" else p / KM_PER_MILE)
+
+def pace_by_time_batch(time_sec, dist_km):
+    """Темпы (сек/км) по времени и дистанциям."""
+    if load_numpy() is None:
+        return _map(pace_by_time, time_sec, dist_km)
+    t, d = _arrays(time_sec, dist_km)
+    _require_positive(d, "Дистанция должна быть > 0.")
+    return t / d
+
+def hr_at_percent_batch(hrmax, percent):
+    """Пульс при процентах от HRmax поэлементно."""
+    if load_numpy() is None:
+        return _map(hr_at_percent, hrmax, percent)
+    h, p = _arrays(hrmax, percent)
+    return h * p / 100.0
@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""Скалярные формулы: скорость ↔ темп, время/темп/дистанция, Ригель."""
+from .errors import InputError
+from .units import PACE_UNIT_METERS, SPEED_UNIT_MPS, pace_to_sec_per_km
+
+DEFAULT_RIEGEL_EXP = 1.06
+
+
+def convert_speed_to_pace(speed_value: float, unit: str = "kmh", pace_unit: str = "/km") -> float:
+    """Возвращает секунд/км или секунд/ми по заданной скорости (kmh|mph|mps)."""
+    if speed_value <= 0:
+        raise InputError("Скорость должна быть > 0.")
+    if unit not in SPEED_UNIT_MPS:
+        raise ValueError("Неподдерживаемая единица скорости.")
+    mps = speed_value * SPEED_UNIT_MPS[unit]
+    return PACE_UNIT_METERS.get(pace_unit, PACE_UNIT_METERS["/mi"]) / mps
+
+def convert_pace_to_speed(pace_seconds: float, pace_unit: str = "/km", out_unit: str = "kmh") -> float:
+    """Возвращает скорость (kmh|mph|mps) по темпу (сек/км или сек/ми)."""
+    if pace_seconds <= 0:
+        raise InputError("Темп должен быть > 0.")
+    mps = PACE_UNIT_METERS.get(pace_unit, PACE_UNIT_METERS["/mi"]) / pace_seconds
+    if out_unit not in SPEED_UNIT_MPS:
+        raise ValueError("Неподдерживаемая единица скорости.")
+    return mps / SPEED_UNIT_MPS[out_unit]
+
+def time_by_pace(dist_km: float, pace_seconds: float, pace_unit: str = "/km") -> float:
+    """Время (сек) на дистанции при заданном темпе."""
+    return pace_to_sec_per_km(pace_seconds, pace_unit) * dist_km
+
+def distance_by_time(time_sec: float, pace_seconds: float, pace_unit: str = "/km") -> float:
+    """Дистанция (км), пройденная за время при заданном темпе."""
+    sec_per_km = pace_to_sec_per_km(pace_seconds, pace_unit)
+    if sec_per_km <= 0:
+        raise InputError("Темп должен быть > 0.")
+    return time_sec / sec_per_km
+
+def pace_by_time(time_sec: float, dist_km: float) -> float:
+    """Темп (сек/км) по времени и дистанции."""
+    if dist_km <= 0:
+        raise InputError("Дистанция должна быть > 0.")
+    return time_sec / dist_km
+
+def hr_at_percent(hrmax: float, percent: float) -> float:
+    """Пульс (уд/мин) при заданном проценте от HRmax."""
+    return hrmax * percent / 100.0
+
+def riegel(t1_sec: float, d1_km: float, d2_km: float, exp: float = DEFAULT_RIEGEL_EXP) -> float:
+    """T2 = T1 × (D2/D1)^exp"""
+    if d1_km <= 0 or d2_km <= 0:
+        raise InputError("Дистанции должны быть > 0.")
+    return t1_sec * ((d2_km / d1_km) ** exp)
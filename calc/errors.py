@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Исключения расчётного ядра."""
+
+
+class InputError(ValueError):
+    """Значения разобрались, но посчитать по ним нельзя (темп ≤ 0, слишком много строк, …).
+    Текст — для пользователя; бот отвечает им и пишет в лог без трассировки."""
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Личный показатель Ригеля по нескольким результатам.
+Модель T = coef × D^exp подбирается методом наименьших квадратов в логарифмах:
+ln T = ln coef + exp × ln D. Качество — R² в логарифмах и среднеквадратичная
+относительная ошибка (%).
+
+fit_riegel — один спортсмен; fit_riegel_batch — много спортсменов сразу (строка —
+спортсмен, строки могут быть разной длины). С NumPy расчёт векторный.
+"""
+import math
+from typing import NamedTuple, Sequence
+
+from .batch import _map, load_numpy
+from .errors import InputError
+
+
+# правдоподобный диапазон показателя: вне его — ошибка в результатах, а не бегун
+# (и при exp в сотни прогноз на длинную дистанцию не помещается во float)
+EXP_MIN, EXP_MAX = 0.5, 2.0
+
+
+class RiegelFit(NamedTuple):
+    exp: float          # показатель степени
+    coef: float         # время (сек) на 1 км по модели
+    r2: float           # R² в логарифмах; при двух результатах всегда 1
+    rmse_pct: float     # среднеквадратичная относительная ошибка, %
+    n: int              # число результатов
+
+
+def fit_riegel(dists_km: Sequence[float], times_sec: Sequence[float]) -> RiegelFit:
+    """Подбор T = coef × D^exp по парам (дистанция, время)."""
+    if len(dists_km) != len(times_sec):
+        raise ValueError("Массивы должны быть одной длины.")
+    if any(d <= 0 for d in dists_km) or any(t <= 0 for t in times_sec):
+        raise InputError("Дистанции и время должны быть > 0.")
+    n = len(dists_km)
+    xs = [math.log(d) for d in dists_km]
+    ys = [math.log(t) for t in times_sec]
+    mx, my = sum(xs) / n if n else 0.0, sum(ys) / n if n else 0.0
+    sxx = sum((x - mx) ** 2 for x in xs)
+    if n < 2 or sxx == 0:
+        raise InputError("Нужны результаты хотя бы на двух разных дистанциях.")
+    b = sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sxx
+    a = my - b * mx
+    ss_res = sum((y - a - b * x) ** 2 for x, y in zip(xs, ys))
+    ss_tot = sum((y - my) ** 2 for y in ys)
+    r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else 1.0
+    return RiegelFit(b, math.exp(a), r2, (math.exp(math.sqrt(ss_res / n)) - 1) * 100, n)
+
+def fit_riegel_batch(dists_km, times_sec):
+    """Подбор для многих спортсменов: dists_km[i], times_sec[i] — результаты i-го.
+
+    Возвращает (exp, coef, r2, rmse_pct) — по значению на спортсмена; массивы NumPy или, без NumPy, списки.
+    NaN — там, где fit_riegel отказал бы: результат ≤ 0, длины строк не совпадают, меньше двух разных дистанций.
+    """
+    np = load_numpy()
+    if np is None:
+        cols = ([], [], [], [])
+        for d, t in zip(dists_km, times_sec):
+            try:
+                fit = fit_riegel(d, t)
+            except ValueError:
+                fit = (math.nan,) * 4
+            for col, v in zip(cols, fit):
+                col.append(v)
+        return cols
+    width = max((len(row) for row in dists_km), default=0)
+    d = np.full((len(dists_km), width), np.nan)
+    t = np.full((len(times_sec), width), np.nan)
+    uneven = np.zeros(len(dists_km), dtype=bool)
+    for i, (dr, tr) in enumerate(zip(dists_km, times_sec)):
+        d[i, :len(dr)] = dr
+        t[i, :len(tr)] = tr
+        uneven[i] = len(dr) != len(tr)
+    present = np.arange(width)[None, :] < np.array([len(dr) for dr in dists_km], dtype=int)[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mask = (d > 0) & (t > 0)
+        # как у fit_riegel: хотя бы один результат ≤ 0 — подбора для спортсмена нет, а не подбор по остальным
+        invalid = (present & ~mask).any(axis=1) | uneven
+        x = np.where(mask, np.log(np.where(mask, d, 1.0)), 0.0)
+        y = np.where(mask, np.log(np.where(mask, t, 1.0)), 0.0)
+        n = mask.sum(axis=1)
+        mx = x.sum(axis=1) / n
+        my = y.sum(axis=1) / n
+        dx = np.where(mask, x - mx[:, None], 0.0)
+        dy = np.where(mask, y - my[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        b = (dx * dy).sum(axis=1) / np.where(sxx > 0, sxx, np.nan)
+        a = my - b * mx
+        ss_res = (np.where(mask, y - a[:, None] - b[:, None] * x, 0.0) ** 2).sum(axis=1)
+        ss_tot = (dy * dy).sum(axis=1)
+        r2 = np.where(ss_tot > 0, 1.0 - ss_res / ss_tot, 1.0)
+        rmse = (np.exp(np.sqrt(ss_res / n)) - 1) * 100
+    bad = (n < 2) | ~np.isfinite(b) | invalid
+    return tuple(np.where(bad, np.nan, v) for v in (b, np.exp(a), r2, rmse))
+
+def predict_riegel_batch(coef, exp, dist_km):
+    """Время (сек) по модели coef × D^exp поэлементно.
+    С NumPy для сетки «спортсмены × дистанции» передайте coef[:, None], exp[:, None], dist[None, :]."""
+    np = load_numpy()
+    if np is None:
+        return _map(lambda c, e, d: c * d ** e, coef, exp, dist_km)
+    c, e, d = (np.asarray(v, dtype=float) for v in (coef, exp, dist_km))
+    return c * d ** e
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+"""
+Лексер пользовательского ввода: один проход по строке, класс токена выбирается по первому символу.
+Сообщение превращается в список типизированных токенов:
+
+  DIST   value=км (float),          unit='km'|'m'|'mi'      — «10км», «1000m», «1mi»
+  PACE   value=сек на ед. (int),    unit='/km'|'/mi'        — «4:10/км», «6:30/mi»
+  SPEED  value=float,               unit='kmh'|'mph'|'mps'  — «12.5kmh», «7.5mph»
+  TIME   value=сек (int)                                    — «41:30», «1:05:00»
+  NUM    value=float,               unit=''|'%'             — «196», «70%»
+  RANGE  value=(float, float),      unit=''|'%'             — «72-83», «70%–80%»
+         value=(сек, сек) (int),    unit='/km'|'/mi'        — «3:30-5:00», «6:00–7:00/mi» (темпы)
+  ARROW                                                     — «->», «→»
+  SEP                                                       — «,», «;»
+  WORD   value=текст                                        — всё нераспознанное
+
+Префикс «ключ=» (dist=, темп=, time=, speed=, exp=, покой=, пано=, …) не даёт отдельного токена:
+каноническое имя ключа записывается в поле key следующего значения.
+Десятичная запятая допускается, если сразу за числом идёт единица («21,1км»)
+или если это значение ключа в конце фрагмента («exp=1,07»); иначе запятая — разделитель
+(«196,72-83» → 196 | 72-83).
+"""
+import re
+from typing import Any, List, NamedTuple, Optional, Sequence
+
+from .units import meters_to_km, miles_to_km
+
+DIST, PACE, SPEED, TIME, NUM, RANGE, ARROW, SEP, WORD = (
+    "DIST", "PACE", "SPEED", "TIME", "NUM", "RANGE", "ARROW", "SEP", "WORD",
+)
+
+KEY_ALIASES = {
+    "dist": "dist", "distance": "dist", "дист": "dist", "дистанция": "dist",
+    "pace": "pace", "темп": "pace",
+    "time": "time", "t": "time", "время": "time",
+    "speed": "speed", "скорость": "speed",
+    "exp": "exp",
+    "lap": "lap", "круг": "lap",
+    "step": "step", "шаг": "step",
+    "hrmax": "hrmax", "max": "hrmax", "макс": "hrmax",
+    "rest": "rest", "hrrest": "rest", "покой": "rest",
+    "lthr": "lthr", "lt": "lthr", "пано": "lthr",
+}
+
+# единица после числа → (вид токена, каноническая единица)
+_NUMBER_UNITS = {
+    "km": (DIST, "km"), "км": (DIST, "km"), "m": (DIST, "m"), "м": (DIST, "m"),
+    "mi": (DIST, "mi"), "mile": (DIST, "mi"), "miles": (DIST, "mi"), "ми": (DIST, "mi"),
+    "kmh": (SPEED, "kmh"), "км/ч": (SPEED, "kmh"), "mph": (SPEED, "mph"),
+    "mps": (SPEED, "mps"), "м/с": (SPEED, "mps"),
+}
+_PACE_UNITS = {"km": "/km", "км": "/km", "mi": "/mi", "mile": "/mi", "miles": "/mi", "ми": "/mi"}
+
+
+class Token(NamedTuple):
+    kind: str
+    value: Any = None
+    unit: str = ""
+    key: str = ""
+    text: str = ""
+
+
+# Токен определяется по первому символу, и дальше работает только регулярка своего класса:
+# цифра — время/темп или число с хвостом, буква — «ключ=» или слово. Одна большая альтернатива
+# на всю грамматику медленнее: каждое совпадение перебирает ветки и заводит ~20 групп.
+_UNITS = r"miles|mile|mi|ми|kmh|km|км/ч|км|mph|mps|m|м/с|м"   # длинные раньше префиксов
+_PACE_U = r"miles|mile|mi|ми|km|км"
+_END = r"(?![a-zа-яё])"
+
+_CLOCK = re.compile(rf"""
+  (?P<t>\d+(?::\d{{1,2}}){{1,2}})(?:\s*[-–—]\s*(?P<b>\d+(?::\d{{1,2}}){{1,2}}))?(?:\s*/\s*(?P<u>{_PACE_U}){_END})?
+""", re.VERBOSE)
+_NUMBER = re.compile(rf"""
+  (?P<v>\d+(?:\.\d+|,\d+(?=\s*(?:{_UNITS}){_END}))?)\s*(?:
+      (?P<nu>{_UNITS}){_END}
+    | /\s*(?P<pu>{_PACE_U}){_END}
+    | (?P<p>%)?(?:\s*[-–—]\s*(?P<rb>\d+(?:\.\d+)?)\s*(?P<rp>%)?)?
+  )""", re.VERBOSE)
+# значение ключа в конце фрагмента: здесь запятая десятичная («exp=1,07», «speed=12,5»)
+_KEY = re.compile(r"([a-zа-яё]+)\s*=\s*(?:(\d+,\d+)\s*(?=;|$))?")
+# слово — всё до пробела, разделителя или «=»; так строка проходится без пропусков
+_WORD = re.compile(r"[^\s,;=]+=?|=")
+_SPACE = re.compile(r"\s+")
+
+
+_new_token = tuple.__new__     # _new_token(Token, (...)) вдвое быстрее Token(...) — __new__ namedtuple на Python
+
+
+_SEP_TOKEN = Token(SEP, None, "", "", ",")
+_ARROW_TOKEN = Token(ARROW, None, "", "", "->")
+
+
+def _f(s: str) -> float:
+    return float(s.replace(",", "."))
+
+def _time_seconds(s: str) -> int:
+    total = 0
+    for part in s.split(":"):
+        total = total * 60 + int(part)
+    return total
+
+def _dist_km(value: float, unit: str) -> float:
+    if unit == "m":
+        return meters_to_km(value)
+    if unit == "mi":
+        return miles_to_km(value)
+    return value
+
+
+def _clock(m: "re.Match", key: str) -> Token:
+    t, b, u = m.groups()
+    if b is not None:
+        return _new_token(Token, (RANGE, (_time_seconds(t), _time_seconds(b)), _PACE_UNITS[u] if u else "/km",
+                                  key, m.group()))
+    if u is None:
+        return _new_token(Token, (TIME, _time_seconds(t), "", key, t))
+    return _new_token(Token, (PACE, _time_seconds(t), _PACE_UNITS[u], key, m.group()))
+
+def _number(m: "re.Match", key: str) -> Token:
+    v, nu, pu, pct, rb, pct2 = m.groups()
+    raw = m.group().rstrip()
+    if nu is not None:
+        kind, unit = _NUMBER_UNITS[nu]
+        value = _f(v)
+        return _new_token(Token, (kind, _dist_km(value, unit) if kind == DIST else value, unit, key, raw))
+    if pu is not None:
+        if v.isdigit():
+            return _new_token(Token, (PACE, int(v), _PACE_UNITS[pu], key, raw))
+        return _new_token(Token, (WORD, raw, "", key, raw))
+    if rb is not None:
+        return _new_token(Token, (RANGE, (float(v), float(rb)), "%" if (pct or pct2) else "", key, raw))
+    return _new_token(Token, (NUM, float(v), "%" if pct else "", key, raw))
+
+
+def tokenize(text: str) -> List[Token]:
+    """Разбирает строку за один проход. Нераспознанные фрагменты отдаются как WORD."""
+    text = text.lower()
+    out: List[Token] = []
+    append = out.append
+    key = ""
+    pos, end = 0, len(text)
+    while pos < end:
+        ch = text[pos]
+        if ch == "," or ch == ";":
+            append(_SEP_TOKEN)
+            key = ""
+            pos += 1
+            continue
+        if ch.isspace():
+            pos = _SPACE.match(text, pos).end()
+            continue
+        if ch.isdecimal():
+            # время и темп («4:10») отличаются от числа двоеточием сразу за цифрами
+            i = pos + 1
+            while i < end and text[i].isdecimal():
+                i += 1
+            m = _CLOCK.match(text, pos) if i < end and text[i] == ":" else None
+            if m is not None:
+                append(_clock(m, key))
+            else:
+                m = _NUMBER.match(text, pos)
+                append(_number(m, key))
+            key = ""
+            pos = m.end()
+            continue
+        elif ch == "→" or (ch == "-" and text.startswith("->", pos)):
+            append(_ARROW_TOKEN)
+            key = ""
+            pos += 1 if ch == "→" else 2
+            continue
+        elif ch.isalpha():
+            m = _KEY.match(text, pos)
+            if m is not None:
+                name, dec = m.groups()
+                name = KEY_ALIASES.get(name, name)
+                if dec is None:
+                    key = name
+                else:
+                    append(_new_token(Token, (NUM, _f(dec), "", name, dec)))
+                    key = ""
+                pos = m.end()
+                continue
+        m = _WORD.match(text, pos)
+        raw = m.group()
+        append(_new_token(Token, (WORD, raw, "", key, raw)))
+        key = ""
+        pos = m.end()
+    return out
+
+
+# -------------------- ПОМОЩНИКИ ДЛЯ ОБРАБОТЧИКОВ --------------------
+def split_tokens(tokens: Sequence[Token], kind: str = SEP) -> List[List[Token]]:
+    """Делит поток токенов на группы по разделителю (SEP или ARROW)."""
+    groups: List[List[Token]] = [[]]
+    for t in tokens:
+        if t.kind == kind:
+            groups.append([])
+        else:
+            groups[-1].append(t)
+    return groups
+
+def find_keyed(tokens: Sequence[Token], key: str) -> Optional[Token]:
+    for t in tokens:
+        if t.key == key:
+            return t
+    return None
+
+def as_distance_km(tok: Optional[Token]) -> Optional[float]:
+    """DIST или число без единиц (трактуется как км)."""
+    if tok is None:
+        return None
+    if tok.kind == DIST or (tok.kind == NUM and not tok.unit):
+        return tok.value
+    return None
+
+def as_seconds(tok: Optional[Token]) -> Optional[int]:
+    """TIME или целое число секунд."""
+    if tok is None:
+        return None
+    if tok.kind == TIME:
+        return tok.value
+    if tok.kind == NUM and not tok.unit and float(tok.value).is_integer():
+        return int(tok.value)
+    return None
+
+def as_pace(tok: Optional[Token]):
+    """(сек на ед., '/km'|'/mi') из PACE, TIME или целого числа; без единиц — '/km'."""
+    if tok is None:
+        return None
+    if tok.kind == PACE:
+        return tok.value, tok.unit
+    secs = as_seconds(tok)
+    return (secs, "/km") if secs is not None else None
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+"""Разбор и форматирование пользовательского ввода: числа, время, дистанции, темп."""
+from typing import Optional, Tuple
+
+from .units import meters_to_km, miles_to_km
+
+
+def _norm_num(s: str) -> str:
+    return s.strip().replace(",", ".")
+
+def parse_float(s: str) -> Optional[float]:
+    try:
+        return float(_norm_num(s))
+    except Exception:
+        return None
+
+def parse_time_to_seconds(s: str) -> Optional[int]:
+    """Принимает 'm:ss', 'h:mm:ss' или целые секунды. Возвращает секунды."""
+    s = s.strip()
+    if not s:
+        return None
+    if s.isdigit():
+        return int(s)
+    parts = s.split(":")
+    if not all(p.isdigit() for p in parts):
+        return None
+    if len(parts) == 2:
+        m, sec = map(int, parts)
+        return m * 60 + sec
+    if len(parts) == 3:
+        h, m, sec = map(int, parts)
+        return h * 3600 + m * 60 + sec
+    return None
+
+def format_seconds_to_hhmmss(total_seconds: float) -> str:
+    total_seconds = int(round(total_seconds))
+    h = total_seconds // 3600
+    m = (total_seconds % 3600) // 60
+    s = total_seconds % 60
+    if h > 0:
+        return f"{h}:{m:02d}:{s:02d}"
+    return f"{m}:{s:02d}"
+
+def parse_distance(token: str) -> Optional[Tuple[float, str]]:
+    """Возвращает (дистанция_в_км, исходная_единица: 'm'|'km'|'mi') или None."""
+    if not token:
+        return None
+    t = token.strip().lower().replace(" ", "")
+    if t.endswith(("км", "km")):
+        val = parse_float(t[:-2]);   return (float(val), "km") if val is not None else None
+    if t.endswith(("м", "m")):
+        val = parse_float(t[:-1]);   return (meters_to_km(float(val)), "m") if val is not None else None
+    if t.endswith(("mi", "mile", "miles")):
+        if "mile" in t:
+            val = parse_float(t.split("m")[0])
+        else:
+            val = parse_float(t[:-2])
+        return (miles_to_km(float(val)), "mi") if val is not None else None
+    # без суффикса — трактуем как км
+    val = parse_float(t)
+    return (float(val), "km") if val is not None else None
+
+def parse_pace(token: str) -> Optional[Tuple[int, str]]:
+    """Возвращает (секунд_на_единицу, '/km'|'/mi'). Если единицы не указаны — считаем '/km'."""
+    if not token:
+        return None
+    t = token.strip().lower()
+    unit = "/km"
+    if "/mi" in t or "/mile" in t:
+        unit = "/mi"; t = t.split("/")[0].strip()
+    elif "/км" in t or "/km" in t:
+        unit = "/km"; t = t.split("/")[0].strip()
+    secs = parse_time_to_seconds(t)
+    if secs is None:
+        return None
+    return secs, unit
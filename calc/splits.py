@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Таблицы раскладок: время на стандартных дистанциях при заданном темпе.
+Сетка (темпы × дистанции) считается одним векторным умножением (NumPy, если установлен).
+Частый случай — целое число секунд на км — берётся из сетки, посчитанной один раз
+(standard_grid) вместе с уже отформатированными строками; прочие темпы кэшируются по мере запросов.
+"""
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+
+from .batch import load_numpy
+from .errors import InputError
+from .parsing import format_seconds_to_hhmmss
+from .units import KM_PER_MILE, METERS_PER_KM
+
+# (подпись, км)
+STANDARD_DISTANCES: Tuple[Tuple[str, float], ...] = (
+    ("200м", 200 / METERS_PER_KM),
+    ("400м", 400 / METERS_PER_KM),
+    ("1 км", 1.0),
+    ("1 mi", KM_PER_MILE),
+    ("5 км", 5.0),
+    ("10 км", 10.0),
+    ("ПМ", 21.0975),
+    ("М", 42.195),
+)
+# диапазон темпов (сек/км), для которых сетка считается заранее
+GRID_MIN_PACE = 90
+GRID_MAX_PACE = 900
+MAX_ROWS = 500          # предел строк в одной таблице (темпов в диапазоне или кругов)
+
+
+def split_grid(paces_sec_per_km: Sequence[float], distances_km: Sequence[float]):
+    """Время (сек) для каждой пары темп × дистанция: строка — темп, столбец — дистанция."""
+    np = load_numpy()
+    if np is None:
+        return [[p * d for d in distances_km] for p in paces_sec_per_km]
+    return np.outer(np.asarray(paces_sec_per_km, dtype=float), np.asarray(distances_km, dtype=float))
+
+def pace_range(start: float, stop: float, step: float) -> List[float]:
+    """Темпы от start до stop включительно с шагом step (порядок как у start → stop)."""
+    if step <= 0:
+        raise InputError("Шаг должен быть > 0.")
+    n = int(abs(stop - start) // step) + 1
+    if n > MAX_ROWS:
+        raise InputError(f"Слишком много строк ({n}), максимум {MAX_ROWS}. Увеличьте шаг.")
+    sign = 1 if stop >= start else -1
+    return [start + sign * i * step for i in range(n)]
+
+def lap_splits(sec_per_km: float, lap_km: float, total_km: float):
+    """Накопленное время на конце каждого круга; последний круг может быть неполным."""
+    if lap_km <= 0 or total_km <= 0:
+        raise InputError("Дистанция должна быть > 0.")
+    full = int(total_km / lap_km + 1e-9)
+    marks = [lap_km * i for i in range(1, full + 1)]
+    if total_km - lap_km * full > 1e-9:
+        marks.append(total_km)
+    if len(marks) > MAX_ROWS:
+        raise InputError(f"Слишком много кругов ({len(marks)}), максимум {MAX_ROWS}.")
+    return marks, split_grid([sec_per_km], marks)[0]
+
+
+def _format_rows(grid) -> Tuple[Tuple[str, ...], ...]:
+    return tuple(tuple(format_seconds_to_hhmmss(float(t)) for t in row) for row in grid)
+
+@lru_cache(maxsize=1)
+def standard_grid() -> Tuple[Tuple[str, ...], ...]:
+    """Отформатированные раскладки для всех целых темпов GRID_MIN_PACE..GRID_MAX_PACE сек/км."""
+    paces = range(GRID_MIN_PACE, GRID_MAX_PACE + 1)
+    return _format_rows(split_grid(paces, [d for _, d in STANDARD_DISTANCES]))
+
+@lru_cache(maxsize=4096)
+def _splits_row(sec_per_km: float) -> Tuple[str, ...]:
+    return tuple(format_seconds_to_hhmmss(sec_per_km * d) for _, d in STANDARD_DISTANCES)
+
+def standard_splits(sec_per_km: float) -> Tuple[str, ...]:
+    """Раскладка по STANDARD_DISTANCES в виде строк h:mm:ss."""
+    if float(sec_per_km).is_integer() and GRID_MIN_PACE <= sec_per_km <= GRID_MAX_PACE:
+        return standard_grid()[int(sec_per_km) - GRID_MIN_PACE]
+    return _splits_row(float(sec_per_km))
+
+def range_splits(paces_sec_per_km: Sequence[float]) -> Tuple[Tuple[str, ...], ...]:
+    """Раскладки для ряда темпов; целые темпы из сетки, остальные — одним векторным расчётом."""
+    rows = [None] * len(paces_sec_per_km)
+    rest = []
+    for i, p in enumerate(paces_sec_per_km):
+        if float(p).is_integer() and GRID_MIN_PACE <= p <= GRID_MAX_PACE:
+            rows[i] = standard_grid()[int(p) - GRID_MIN_PACE]
+        else:
+            rest.append(i)
+    if rest:
+        computed = _format_rows(split_grid([paces_sec_per_km[i] for i in rest], [d for _, d in STANDARD_DISTANCES]))
+        for i, row in zip(rest, computed):
+            rows[i] = row
+    return tuple(rows)
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Пакетная обработка таблиц (CSV): результаты забегов, протоколы дорожки.
+Строки идут конвейером генераторов — чтение → расчёт → запись, — поэтому в памяти
+всегда одна строка, а не весь файл (500 тыс. строк обрабатываются с постоянной памятью).
+
+Столбцы ищутся по заголовку (регистр и пробелы не важны):
+  дистанция — dist, distance, дистанция, дист;   время — time, время, result, результат;
+  темп — pace, темп;                              скорость — speed, скорость;
+  пульс — hrmax, чсс макс; покой — rest, покой;    ПАНО — lthr, пано.
+К исходным столбцам добавляются расчётные:
+  дистанция + время → темп /км и /mi и прогноз по Ригелю на каждую целевую дистанцию;
+  темп → скорость (и время, если есть дистанция);  скорость → темп;
+  HRmax (и покой) → зоны hr_z1…hr_z5 (по Карвонену, если покой указан);  ПАНО → зоны lt_z1…lt_z5c.
+Зоны берутся из таблиц calc.zones — пульсовой лист команды считается без расчёта на строку.
+Строка, которую не удалось посчитать, не прерывает файл — причина пишется в столбец error.
+"""
+import csv
+import itertools
+import math
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple
+
+from .core import DEFAULT_RIEGEL_EXP, convert_pace_to_speed, convert_speed_to_pace, riegel
+from .lexer import DIST, tokenize
+from .parsing import format_seconds_to_hhmmss, parse_distance, parse_float, parse_pace, parse_time_to_seconds
+from .units import pace_to_sec_per_km, sec_per_km_to_sec_per_mile
+from .zones import HRMAX, KARVONEN, LTHR, LTHR_ZONES, PERCENT_ZONES, zone_cells
+
+# (подпись, км) — цели прогноза по умолчанию
+DEFAULT_TARGETS: Tuple[Tuple[str, float], ...] = (("5км", 5.0), ("10км", 10.0), ("21.1км", 21.0975), ("42.2км", 42.195))
+
+COLUMN_ALIASES = {
+    "dist": ("dist", "distance", "дистанция", "дист"),
+    "time": ("time", "время", "result", "результат"),
+    "pace": ("pace", "темп"),
+    "speed": ("speed", "скорость"),
+    "hrmax": ("hrmax", "hr max", "max hr", "чсс макс", "пульс макс", "макс пульс", "максимальный пульс"),
+    "rest": ("rest", "hrrest", "rest hr", "покой", "пульс покоя", "чсс покоя"),
+    "lthr": ("lthr", "пано", "пульс пано"),
+}
+_SPEED_RE = re.compile(r"^\s*([0-9]+(?:[.,][0-9]+)?)\s*(kmh|км/ч|mph|mps|м/с)?\s*$")
+_SPEED_UNITS = {None: "kmh", "kmh": "kmh", "км/ч": "kmh", "mph": "mph", "mps": "mps", "м/с": "mps"}
+
+
+def detect_columns(header: Sequence[str]) -> Dict[str, int]:
+    """Индексы известных столбцов в заголовке: {'dist': 0, 'time': 2, ...}."""
+    found: Dict[str, int] = {}
+    for i, name in enumerate(header):
+        name = name.strip().lower()
+        for col, aliases in COLUMN_ALIASES.items():
+            if col not in found and name in aliases:
+                found[col] = i
+    return found
+
+def parse_targets(text: str) -> Tuple[Tuple[Tuple[str, float], ...], float]:
+    """Цели и показатель из подписи к файлу: «21.1км, 42.195км, exp=1.07». Пусто — DEFAULT_TARGETS."""
+    targets, exp = [], DEFAULT_RIEGEL_EXP
+    for tok in tokenize(text or ""):
+        if tok.key == "exp" and isinstance(tok.value, float) and 0.9 <= tok.value <= 1.2:
+            exp = tok.value
+        elif tok.kind == DIST and tok.value > 0:
+            targets.append((tok.text, tok.value))
+    return tuple(targets) or DEFAULT_TARGETS, exp
+
+def parse_speed(cell: str) -> Optional[Tuple[float, str]]:
+    """'12.5', '12,5 км/ч', '7.5mph' → (значение, 'kmh'|'mph'|'mps'); без единиц — км/ч."""
+    m = _SPEED_RE.match(cell.lower())
+    if m is None:
+        return None
+    value = parse_float(m.group(1))
+    return (value, _SPEED_UNITS[m.group(2)]) if value is not None else None
+
+
+def output_header(header: Sequence[str], cols: Dict[str, int],
+                  targets: Sequence[Tuple[str, float]]) -> List[str]:
+    out = list(header)
+    if "dist" in cols and "time" in cols:
+        out += ["pace_km", "pace_mi"] + [f"riegel_{label}" for label, _ in targets]
+    elif "pace" in cols:
+        out += (["time"] if "dist" in cols else []) + ["speed_kmh", "speed_mph"]
+    elif "speed" in cols:
+        out += ["pace_km", "pace_mi"]
+    if "hrmax" in cols:
+        out += [f"hr_{label.lower()}" for label, *_ in PERCENT_ZONES]
+    if "lthr" in cols:
+        out += [f"lt_{label.lower()}" for label, *_ in LTHR_ZONES]
+    out.append("error")
+    return out
+
+def _cell(row: Sequence[str], cols: Dict[str, int], col: str) -> str:
+    i = cols.get(col)
+    return row[i] if i is not None and i < len(row) else ""
+
+def _finite(value: float) -> bool:
+    """Конечное число, которое помещается во float: «nan», «inf» и время из сотен цифр — нет."""
+    try:
+        return math.isfinite(value)
+    except OverflowError:
+        return False
+
+def _heart_rate(cell: str) -> Optional[float]:
+    """Пульс из ячейки; пустая — 0, нераспознанная — None."""
+    if not cell.strip():
+        return 0.0
+    value = parse_float(cell)
+    return value if value is not None and _finite(value) and value > 0 else None
+
+def zone_row(row: Sequence[str], cols: Dict[str, int]) -> Tuple[List[str], str]:
+    """Ячейки зон строки (в порядке output_header) и текст ошибки; пустая ячейка пульса — пустые зоны."""
+    out: List[str] = []
+    errors = []
+    if "hrmax" in cols:
+        hrmax, rest = _heart_rate(_cell(row, cols, "hrmax")), _heart_rate(_cell(row, cols, "rest"))
+        if hrmax is None or rest is None:
+            errors.append("HRmax или пульс покоя не распознаны")
+        elif hrmax and rest >= hrmax:
+            errors.append("пульс покоя должен быть меньше HRmax")
+        if hrmax and rest is not None and rest < hrmax:
+            out += zone_cells(KARVONEN, hrmax, rest) if rest else zone_cells(HRMAX, hrmax)
+        else:
+            out += [""] * len(PERCENT_ZONES)
+    if "lthr" in cols:
+        lthr = _heart_rate(_cell(row, cols, "lthr"))
+        if not lthr:
+            out += [""] * len(LTHR_ZONES)
+            if lthr is None:
+                errors.append("ПАНО не распознан")
+        else:
+            out += zone_cells(LTHR, lthr)
+    return out, "; ".join(errors)
+
+def compute_row(row: Sequence[str], cols: Dict[str, int], targets: Sequence[Tuple[str, float]],
+                exp: float = DEFAULT_RIEGEL_EXP) -> List[str]:
+    """Расчётные ячейки одной строки (в порядке output_header, включая error)."""
+    if "hrmax" not in cols and "lthr" not in cols:
+        return _run_cells(row, cols, targets, exp)
+    has_run = ("dist" in cols and "time" in cols) or "pace" in cols or "speed" in cols
+    run = _run_cells(row, cols, targets, exp) if has_run else [""]
+    zones, error = zone_row(row, cols)
+    return run[:-1] + zones + ["; ".join(e for e in (run[-1], error) if e)]
+
+def _run_cells(row: Sequence[str], cols: Dict[str, int], targets: Sequence[Tuple[str, float]],
+               exp: float) -> List[str]:
+    fmt = format_seconds_to_hhmmss
+    if "dist" in cols and "time" in cols:
+        n = 2 + len(targets)
+        dist = parse_distance(_cell(row, cols, "dist"))
+        time_sec = parse_time_to_seconds(_cell(row, cols, "time"))
+        if dist is None or time_sec is None or not _finite(dist[0]) or not _finite(time_sec):
+            return [""] * n + ["дистанция или время не распознаны"]
+        d_km = dist[0]
+        if d_km <= 0 or time_sec <= 0:
+            return [""] * n + ["дистанция и время должны быть > 0"]
+        pace = time_sec / d_km
+        return ([fmt(pace), fmt(sec_per_km_to_sec_per_mile(pace))]
+                + [fmt(riegel(time_sec, d_km, d2, exp)) for _, d2 in targets] + [""])
+    if "pace" in cols:
+        n = 3 if "dist" in cols else 2
+        pace = parse_pace(_cell(row, cols, "pace"))
+        if pace is None or not _finite(pace[0]) or pace[0] <= 0:
+            return [""] * n + ["темп не распознан"]
+        out = []
+        if "dist" in cols:
+            dist = parse_distance(_cell(row, cols, "dist"))
+            ok = dist is not None and _finite(dist[0])
+            out.append(fmt(pace_to_sec_per_km(*pace) * dist[0]) if ok else "")
+        out += [f"{convert_pace_to_speed(pace[0], pace[1], u):.2f}" for u in ("kmh", "mph")]
+        return out + [""]
+    if "speed" in cols:
+        speed = parse_speed(_cell(row, cols, "speed"))
+        if speed is None or not _finite(speed[0]) or speed[0] <= 0:
+            return ["", "", "скорость не распознана"]
+        return [fmt(convert_speed_to_pace(speed[0], speed[1], u)) for u in ("/km", "/mi")] + [""]
+    return ["нет столбцов дистанция+время, темп, скорость или пульс (hrmax, пано)"]
+
+def process_rows(rows: Iterable[List[str]], targets: Sequence[Tuple[str, float]] = DEFAULT_TARGETS,
+                 exp: float = DEFAULT_RIEGEL_EXP) -> Iterator[List[str]]:
+    """Генератор: первая строка — заголовок, дальше исходные строки с расчётными ячейками."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        return
+    cols = detect_columns(header)
+    out_header = output_header(header, cols, targets)
+    yield out_header
+    blank = [""] * (len(out_header) - len(header) - 1)
+    for row in rows:
+        if not any(cell.strip() for cell in row):
+            continue
+        # строка, на которой расчёт упал (переполнение, крайние значения), не прерывает файл
+        try:
+            cells = compute_row(row, cols, targets, exp)
+        except ArithmeticError:
+            cells = blank + ["значения вне допустимого диапазона"]
+        except ValueError as e:
+            cells = blank + [f"не удалось посчитать: {e}"]
+        yield row + cells
+
+
+def sniff_dialect(sample: str):
+    """Разделитель по началу файла: «,», «;» (Excel с русской локалью) или табуляция."""
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        return csv.excel
+
+def process_csv(src: TextIO, dst: TextIO, targets: Sequence[Tuple[str, float]] = DEFAULT_TARGETS,
+                exp: float = DEFAULT_RIEGEL_EXP) -> Tuple[int, int]:
+    """Потоково читает CSV из src и пишет результат в dst тем же разделителем. Возвращает (строк, ошибок)."""
+    first = src.readline()
+    dialect = sniff_dialect(first)
+    writer = csv.writer(dst, dialect)
+    n = errors = 0
+    # файл читается по строке: первая уже прочитана для определения разделителя
+    for i, row in enumerate(process_rows(csv.reader(itertools.chain([first], src), dialect), targets, exp)):
+        writer.writerow(row)
+        if i:
+            n += 1
+            errors += bool(row[-1])
+    return n, errors
+
+def process_csv_file(src_path: str, dst_path: str, targets: Sequence[Tuple[str, float]] = DEFAULT_TARGETS,
+                     exp: float = DEFAULT_RIEGEL_EXP) -> Tuple[int, int]:
+    """process_csv для файлов; кодировка — UTF-8 (с BOM или без), иначе cp1251."""
+    with open(src_path, "rb") as f:
+        head = f.read(64 * 1024)
+    try:
+        head.decode("utf-8")
+        encoding = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        # обрезанный на границе блока многобайтный символ — не повод менять кодировку
+        encoding = "utf-8-sig" if e.start >= len(head) - 3 else "cp1251"
+    with open(src_path, encoding=encoding, errors="replace", newline="") as src, \
+            open(dst_path, "w", encoding="utf-8-sig", newline="") as dst:
+        return process_csv(src, dst, targets, exp)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Единицы измерения: константы и перевод дистанций/темпов."""
+
+MILES_PER_KM = 0.621371192
+KM_PER_MILE = 1.609344
+METERS_PER_KM = 1000.0
+METERS_PER_MILE = 1609.344
+SECONDS_PER_HOUR = 3600.0
+
+# (метров в единице дистанции темпа) для '/km' и '/mi'
+PACE_UNIT_METERS = {"/km": METERS_PER_KM, "/mi": METERS_PER_MILE}
+# (метров в секунду при значении 1) для единиц скорости
+SPEED_UNIT_MPS = {"kmh": METERS_PER_KM / SECONDS_PER_HOUR, "mph": METERS_PER_MILE / SECONDS_PER_HOUR, "mps": 1.0}
+
+
+def km_to_miles(km: float) -> float:
+    return km * MILES_PER_KM
+
+def miles_to_km(mi: float) -> float:
+    return mi / MILES_PER_KM
+
+def meters_to_km(m: float) -> float:
+    return m / METERS_PER_KM
+
+def km_to_m(km: float) -> float:
+    return km * METERS_PER_KM
+
+def pace_to_sec_per_km(pace_seconds: float, pace_unit: str = "/km") -> float:
+    """Темп в сек/км из темпа в сек на единицу ('/km'|'/mi')."""
+    return pace_seconds if pace_unit == "/km" else pace_seconds / KM_PER_MILE
+
+def sec_per_km_to_sec_per_mile(sec_per_km: float) -> float:
+    return sec_per_km * KM_PER_MILE
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Пульсовые зоны по трём моделям:
+  hrmax    — % от HRmax, 5 зон;
+  karvonen — % резерва ЧСС: покой + (HRmax − покой) × %, 5 зон;
+  lthr     — % от пульса на ПАНО (лактатный порог), зоны Фрила для бега, 7 зон.
+
+Границы для всех целых значений из реальных диапазонов (HRmax 100–230, покой 30–110, ПАНО 100–220)
+считаются один раз одним векторным расчётом (NumPy, если установлен) и хранятся плоским array('B'):
+по байту на границу, строка на значение (для Карвонена — на пару HRmax × покой), ~110 КБ на все модели.
+Ответ для таких значений — срез таблицы и одна подстановка в готовый шаблон; дробные значения
+и значения вне диапазона считаются той же формулой.
+"""
+from array import array
+from functools import lru_cache
+from typing import Dict, Optional, Sequence, Tuple
+
+from .batch import load_numpy
+
+HRMAX, KARVONEN, LTHR = "hrmax", "karvonen", "lthr"
+
+# (подпись, название, нижний %, верхний %); None — открытая граница («<85%», «>106%»)
+PERCENT_ZONES = (
+    ("Z1", "восстановление", 50, 60),
+    ("Z2", "аэробная", 60, 70),
+    ("Z3", "темповая", 70, 80),
+    ("Z4", "пороговая", 80, 90),
+    ("Z5", "максимальная", 90, 100),
+)
+LTHR_ZONES = (
+    ("Z1", "восстановление", None, 85),
+    ("Z2", "аэробная", 85, 89),
+    ("Z3", "темповая", 90, 94),
+    ("Z4", "подпороговая", 95, 99),
+    ("Z5a", "надпороговая", 100, 102),
+    ("Z5b", "МПК", 103, 106),
+    ("Z5c", "анаэробная", 106, None),
+)
+ZONES = {HRMAX: PERCENT_ZONES, KARVONEN: PERCENT_ZONES, LTHR: LTHR_ZONES}
+
+# диапазоны целых значений, для которых границы берутся из таблицы
+HRMAX_MIN, HRMAX_MAX = 100, 230
+REST_MIN, REST_MAX = 30, 110
+LTHR_MIN, LTHR_MAX = 100, 220
+_REST_N = REST_MAX - REST_MIN + 1
+
+
+def _percents(model: str) -> Tuple[Optional[int], ...]:
+    return tuple(p for _, _, lo, hi in ZONES[model] for p in (lo, hi))
+
+def compute_bounds(model: str, value: float, rest: Optional[float] = None) -> Tuple[int, ...]:
+    """Границы зон подряд (низ Z1, верх Z1, низ Z2, …) в уд/мин; 0 — открытая граница."""
+    out = []
+    for p in _percents(model):
+        if p is None:
+            out.append(0)
+        elif model == KARVONEN:
+            out.append(int(round(rest + (value - rest) * p / 100.0)))
+        else:
+            out.append(int(round(value * p / 100.0)))
+    return tuple(out)
+
+def _grid(model: str, values: Sequence[int], rests: Optional[Sequence[int]]) -> bytes:
+    """Границы для ряда значений одним расчётом — той же формулой и с тем же округлением (к чётному)."""
+    np = load_numpy()
+    if np is None:
+        rows = zip(values, rests) if rests is not None else ((v, None) for v in values)
+        return bytes(b for v, r in rows for b in compute_bounds(model, v, r))
+    pcts = _percents(model)
+    p = np.array([0 if x is None else x for x in pcts], dtype=float)[None, :]
+    h = np.asarray(values, dtype=float)[:, None]
+    if model == KARVONEN:
+        r = np.asarray(rests, dtype=float)[:, None]
+        grid = r + (h - r) * p / 100.0
+    else:
+        grid = h * p / 100.0
+    grid = np.rint(grid)
+    grid[:, [i for i, x in enumerate(pcts) if x is None]] = 0
+    return grid.astype(np.uint8).tobytes()
+
+@lru_cache(maxsize=None)
+def zone_table(model: str) -> array:
+    """Границы зон для всех целых значений диапазона модели, строка за строкой (см. table_row)."""
+    if model == KARVONEN:
+        values = [h for h in range(HRMAX_MIN, HRMAX_MAX + 1) for _ in range(_REST_N)]
+        rests = list(range(REST_MIN, REST_MAX + 1)) * (HRMAX_MAX - HRMAX_MIN + 1)
+        return array("B", _grid(model, values, rests))
+    lo, hi = (LTHR_MIN, LTHR_MAX) if model == LTHR else (HRMAX_MIN, HRMAX_MAX)
+    return array("B", _grid(model, range(lo, hi + 1), None))
+
+def zone_tables() -> Dict[str, array]:
+    """Таблицы всех моделей (считаются при первом обращении; бот прогревает их при старте)."""
+    return {model: zone_table(model) for model in ZONES}
+
+def table_row(model: str, value: float, rest: Optional[float] = None) -> Optional[int]:
+    """Номер строки таблицы для значения или None, если его в таблице нет (дробное, вне диапазона)."""
+    if not float(value).is_integer():
+        return None
+    v = int(value)
+    if model == KARVONEN:
+        if rest is None or not float(rest).is_integer() or not REST_MIN <= rest <= REST_MAX:
+            return None
+        return (v - HRMAX_MIN) * _REST_N + int(rest) - REST_MIN if HRMAX_MIN <= v <= HRMAX_MAX else None
+    lo, hi = (LTHR_MIN, LTHR_MAX) if model == LTHR else (HRMAX_MIN, HRMAX_MAX)
+    return v - lo if lo <= v <= hi else None
+
+def zone_bounds(model: str, value: float, rest: Optional[float] = None) -> Tuple[int, ...]:
+    """compute_bounds(), для целых значений из диапазона — из таблицы."""
+    row = table_row(model, value, rest)
+    if row is None:
+        return compute_bounds(model, value, rest)
+    width = 2 * len(ZONES[model])
+    return tuple(zone_table(model)[row * width:(row + 1) * width])
+
+
+# шаблоны на модель: одна подстановка границ на весь ответ; открытая граница съедает свой 0 через %.0s
+def _template(model: str, line: str, open_lo: str, open_hi: str, sep: str) -> str:
+    parts = []
+    for label, name, lo, hi in ZONES[model]:
+        if lo is None:
+            parts.append(open_lo.format(label=label, name=name, hi=hi))
+        elif hi is None:
+            parts.append(open_hi.format(label=label, name=name, lo=lo))
+        else:
+            parts.append(line.format(label=label, name=name, lo=lo, hi=hi))
+    return sep.join(parts)
+
+_TEXT = {m: _template(m, "{label} {lo}–{hi}%%: %d–%d ({name})", "{label} <{hi}%%: %.0s<%d ({name})",
+                      "{label} >{lo}%%: >%d%.0s ({name})", "\n") for m in ZONES}
+_CELLS = {m: _template(m, "%d-%d", "%.0s<%d", ">%d%.0s", "\t") for m in ZONES}
+
+@lru_cache(maxsize=4096)
+def zone_lines(model: str, value: float, rest: Optional[float] = None) -> str:
+    """Строки зон для ответа: «Z2 60–70%: 118–137 (аэробная)»."""
+    return _TEXT[model] % zone_bounds(model, value, rest)
+
+@lru_cache(maxsize=4096)
+def zone_cells(model: str, value: float, rest: Optional[float] = None) -> Tuple[str, ...]:
+    """Ячейки зон для таблицы: «118-137», «<146», «>180»."""
+    return tuple((_CELLS[model] % zone_bounds(model, value, rest)).split("\t"))
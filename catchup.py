@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Догон очереди после перезапуска (режим long polling).
+
+Пока бот лежал, Telegram копит апдейты. Вместо того чтобы разбирать их обычным темпом по одному,
+при старте бот выбирает всю очередь подряд пачками getUpdates (по 100 — предел Bot API)
+и сворачивает устаревшее, пока выбирает:
+- текст: на пользователя в чате остаётся последний текст в каждом режиме
+  (режим — последняя нажатая кнопка меню до этого текста);
+- нажатия меню и «⬅ Назад» подряд: остаётся последнее — оно и задаёт режим;
+- /start и /help: только если после них в чате ничего не было;
+- инлайн-запросы: последний на пользователя;
+- остальное (файлы, прочие команды) — без изменений.
+Оставшиеся апдейты в исходном порядке кладутся в очередь Application до старта polling и
+обрабатываются параллельно между чатами (PerChatUpdateProcessor), затем бот работает как обычно.
+
+Апдейты разбираются в telegram.Update только после свёртки: de_json стоит ~170 мкс на апдейт.
+"""
+import logging
+import time
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+from telegram import Update
+from telegram.error import Conflict
+from telegram.ext import Application
+from telegram.warnings import PTBUserWarning
+
+from metrics import CATCHUP_UPDATES
+
+logger = logging.getLogger("athletics-bot.catchup")
+
+BATCH = 100                       # больше getUpdates не отдаёт
+NAV_COMMANDS = ("/start", "/help")
+MENU_PREFIX = "menu_"
+BACK_DATA = "back_main"
+
+TEXT, TAP, DISPLAY, INLINE, OTHER = "text", "tap", "display", "inline", "other"
+
+# getUpdates нужен сырым JSON (без de_json), а do_api_request предупреждает о наличии Bot.getUpdates
+warnings.filterwarnings("ignore", message=r"Please use 'Bot\.getUpdates'", category=PTBUserWarning)
+
+
+def classify(update: dict) -> Tuple[Optional[tuple], str, Optional[str]]:
+    """(ключ «чат, пользователь», вид апдейта, режим нажатой кнопки)."""
+    msg = update.get("message")
+    if msg is not None:
+        key = (msg["chat"]["id"], (msg.get("from") or {}).get("id"))
+        text = msg.get("text")
+        if text is None:
+            return key, OTHER, None
+        if text.startswith("/"):
+            return key, DISPLAY if text.split()[0].split("@")[0] in NAV_COMMANDS else OTHER, None
+        return key, TEXT, None
+    cq = update.get("callback_query")
+    if cq is not None and "message" in cq:
+        key = (cq["message"]["chat"]["id"], cq["from"]["id"])
+        data = cq.get("data") or ""
+        if data == BACK_DATA:
+            return key, TAP, None
+        if data.startswith(MENU_PREFIX):
+            return key, TAP, data[len(MENU_PREFIX):]
+        return key, OTHER, None
+    iq = update.get("inline_query")
+    if iq is not None:
+        return ("inline", iq["from"]["id"]), INLINE, None
+    return None, OTHER, None
+
+
+class _Chat:
+    __slots__ = ("events", "mode", "text_at")
+
+    def __init__(self) -> None:
+        self.events: List[Optional[Tuple[str, dict]]] = []  # None — вытесненный текст
+        self.mode: Optional[str] = ""                       # "" — режим, сохранённый до перезапуска
+        self.text_at: Dict[Optional[str], int] = {}
+
+
+class Backlog:
+    """Очередь апдейтов, сворачиваемая по мере поступления: в памяти только то, что ещё может пригодиться."""
+
+    def __init__(self) -> None:
+        self.fetched = 0
+        self._chats: Dict[tuple, _Chat] = {}
+        self._inline: Dict[int, dict] = {}
+        self._other: List[dict] = []
+
+    def add(self, update: dict) -> None:
+        self.fetched += 1
+        key, kind, mode = classify(update)
+        if kind == INLINE:
+            self._inline[key[1]] = update
+            return
+        if key is None:
+            self._other.append(update)
+            return
+        chat = self._chats.get(key)
+        if chat is None:
+            chat = self._chats[key] = _Chat()
+        events = chat.events
+        if kind == TEXT:
+            old = chat.text_at.get(chat.mode)
+            if old is not None:
+                events[old] = None
+            chat.text_at[chat.mode] = len(events)
+        elif kind == TAP:
+            chat.mode = mode
+            if events and events[-1] is not None and events[-1][0] == TAP:
+                events[-1] = (TAP, update)
+                return
+        events.append((kind, update))
+
+    def collapse(self) -> List[dict]:
+        """Оставшиеся апдейты в порядке update_id."""
+        out = list(self._inline.values()) + self._other
+        for chat in self._chats.values():
+            kept: List[Tuple[str, dict]] = []
+            for event in chat.events:
+                if event is None:
+                    continue
+                # после вытеснения текстов соседями могли стать нажатия — важно последнее;
+                # /start и /help теряют смысл, если за ними в чате что-то было
+                while kept and (kept[-1][0] == DISPLAY or (event[0] == TAP and kept[-1][0] == TAP)):
+                    kept.pop()
+                kept.append(event)
+            out += [u for _, u in kept]
+        out.sort(key=lambda u: u["update_id"])
+        return out
+
+
+async def fetch_backlog(app: Application, max_updates: int) -> Backlog:
+    """Выбирает очередь до пустой пачки (или max_updates) и подтверждает выбранное через offset."""
+    backlog = Backlog()
+    offset = 0
+    while backlog.fetched < max_updates:
+        batch = await app.bot.do_api_request("getUpdates", api_kwargs={"offset": offset, "limit": BATCH, "timeout": 0})
+        if not batch:
+            return backlog
+        for update in batch:
+            backlog.add(update)
+        offset = batch[-1]["update_id"] + 1
+    # предел: подтверждаем выбранное, остальное заберёт обычный polling
+    await app.bot.do_api_request("getUpdates", api_kwargs={"offset": offset, "limit": 1, "timeout": 0})
+    return backlog
+
+async def catch_up(app: Application, max_updates: int = 100_000) -> int:
+    """Выбирает и сворачивает очередь, кладёт оставшееся в app.update_queue. Возвращает число апдейтов к обработке."""
+    started = time.perf_counter()
+    try:
+        backlog = await fetch_backlog(app, max_updates)
+    except Conflict:
+        # установлен вебхук — очередь отдаст Telegram сам, после deleteWebhook в polling
+        logger.info("Догон пропущен: у бота установлен вебхук")
+        return 0
+    kept = backlog.collapse()
+    for raw in kept:
+        app.update_queue.put_nowait(Update.de_json(raw, app.bot))
+    CATCHUP_UPDATES.labels("kept").inc(len(kept))
+    CATCHUP_UPDATES.labels("dropped").inc(backlog.fetched - len(kept))
+    if backlog.fetched:
+        logger.info("Догон очереди: получено %d, к обработке %d, %.0f мс",
+                    backlog.fetched, len(kept), (time.perf_counter() - started) * 1e3)
+    return len(kept)
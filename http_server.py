@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Минимальный HTTP/1.1 сервер на asyncio (только stdlib).
+Используется для вебхука Telegram и служебных эндпоинтов (/healthz).
+Поддерживает keep-alive и тела запросов с Content-Length; chunked не поддерживается.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, NamedTuple, Tuple
+
+logger = logging.getLogger("athletics-bot.http")
+
+MAX_BODY_BYTES = 1 << 20
+MAX_HEADER_LINES = 100
+
+_REASONS = {
+    200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 429: "Too Many Requests",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    query: str
+    headers: Dict[str, str]  # имена заголовков в нижнем регистре
+    body: bytes
+
+
+# (код ответа, тело, content-type)
+Response = Tuple[int, bytes, str]
+Handler = Callable[[Request], Awaitable[Response]]
+
+
+def text_response(status: int, text: str = "") -> Response:
+    return status, (text or _REASONS.get(status, "")).encode("utf-8"), "text/plain; charset=utf-8"
+
+
+async def _read_request(reader: asyncio.StreamReader, max_body: int = MAX_BODY_BYTES) -> Request:
+    line = await reader.readline()
+    if not line:
+        raise EOFError
+    try:
+        method, target, _version = line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError("bad request line")
+    headers: Dict[str, str] = {}
+    for _ in range(MAX_HEADER_LINES):
+        h = await reader.readline()
+        if h in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = h.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    else:
+        raise ValueError("too many headers")
+    length = int(headers.get("content-length") or 0)
+    if length < 0 or length > max_body:
+        raise OverflowError
+    body = await reader.readexactly(length) if length else b""
+    path, _, query = target.partition("?")
+    return Request(method.upper(), path, query, headers, body)
+
+
+def _encode_response(resp: Response, keep_alive: bool) -> bytes:
+    status, body, ctype = resp
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+        f"Content-Type: {ctype}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _serve_connection(handler: Handler, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter, max_body: int = MAX_BODY_BYTES) -> None:
+    try:
+        while True:
+            try:
+                req = await _read_request(reader, max_body)
+            except (EOFError, asyncio.IncompleteReadError, ConnectionError):
+                return
+            except OverflowError:
+                writer.write(_encode_response(text_response(413), keep_alive=False))
+                return
+            except ValueError:
+                writer.write(_encode_response(text_response(400), keep_alive=False))
+                return
+            try:
+                resp = await handler(req)
+            except Exception:
+                logger.exception("Ошибка HTTP-обработчика %s %s", req.method, req.path)
+                resp = text_response(500)
+            keep_alive = req.headers.get("connection", "").lower() != "close"
+            writer.write(_encode_response(resp, keep_alive))
+            await writer.drain()
+            if not keep_alive:
+                return
+    except (ConnectionError, asyncio.CancelledError):
+        # отмена при остановке сервера — штатное завершение соединения
+        pass
+    finally:
+        writer.close()
+
+
+async def start_http_server(handler: Handler, host: str, port: int,
+                            max_body: int = MAX_BODY_BYTES) -> asyncio.AbstractServer:
+    """Запускает сервер; возвращает asyncio.Server (закрывать через close()/wait_closed())."""
+    return await asyncio.start_server(
+        lambda r, w: _serve_connection(handler, r, w, max_body), host=host, port=port
+    )
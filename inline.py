@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Инлайн-режим: «@bot 10км 41:30 -> 21.1км» в любом чате, без меню.
+Режим расчёта определяется по токенам запроса (answers.detect_modes).
+
+Telegram присылает запрос на каждое нажатие клавиши, поэтому:
+- готовые результаты хранятся в кэше с коротким TTL по каноническому ключу токенов —
+  «10km 4:00» и «10 км  4:00» считаются одним запросом и отвечаются сразу;
+- промах ждёт debounce секунд в отдельной задаче; новый запрос того же пользователя
+  отменяет ожидающий, так что считается только последний набранный вариант;
+- результаты не зависят от пользователя — Telegram может кэшировать их cache_time секунд.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from telegram import InlineQuery, InlineQueryResultArticle, InlineQueryResultsButton, InputTextMessageContent, Update
+from telegram.error import BadRequest
+from telegram.ext import ContextTypes
+
+from answers import detect_modes, parse_lines, render_lines
+from cache import cache_key
+from calc.lexer import tokenize
+from metrics import INLINE_QUERIES
+
+logger = logging.getLogger("athletics-bot.inline")
+
+MODE_TITLES = {
+    "hr": "Пульс",
+    "time_by_pace": "Время по темпу",
+    "calc": "Калькулятор",
+    "riegel": "Прогноз (Ригель)",
+    "riegel_fit": "Личный показатель Ригеля",
+    "tread": "Дорожка ↔ Темп",
+}
+HELP_BUTTON = InlineQueryResultsButton("Форматы ввода — открыть бота", start_parameter="inline")
+
+Results = List[Tuple[str, str]]  # (режим, текст ответа)
+
+
+class TTLCache:
+    """LRU с ограничением по числу записей; запись живёт ttl секунд."""
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Results]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Results]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return item[1]
+
+    def put(self, key: str, value: Results) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def inline_results(text: str) -> Results:
+    """Ответы на запрос по всем подходящим режимам; режимы, где строка не разобралась, пропускаются."""
+    tokens = tokenize(text)
+    out = []
+    for mode in detect_modes(tokens):
+        parsed = parse_lines(mode, [tokens])
+        if not isinstance(parsed[0], str):
+            out.append((mode, render_lines(mode, parsed)[0]))
+    return out
+
+
+class InlineAnswerer:
+    def __init__(self, debounce: float = 0.15, ttl: float = 60.0, max_entries: int = 10_000,
+                 cache_time: int = 300) -> None:
+        self.debounce = debounce
+        self.cache_time = cache_time
+        self.cache = TTLCache(ttl, max_entries)
+        self._pending: Dict[int, asyncio.Task] = {}
+
+    async def handle(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        query = update.inline_query
+        text = query.query.strip()
+        key = cache_key("inline", tokenize(text))
+        results = self.cache.get(key)
+        if results is not None:
+            INLINE_QUERIES.labels("cached").inc()
+            await self._answer(query, text, results)
+            return
+        # промах: считаем в отдельной задаче после паузы, чтобы не держать слот обработки апдейтов
+        user_id = query.from_user.id
+        old = self._pending.get(user_id)
+        if old is not None and not old.done():
+            old.cancel()
+            INLINE_QUERIES.labels("stale").inc()
+        self._pending[user_id] = context.application.create_task(
+            self._debounced(query, text, key, user_id), update=update)
+
+    async def _debounced(self, query: InlineQuery, text: str, key: str, user_id: int) -> None:
+        try:
+            await asyncio.sleep(self.debounce)
+            results = self.cache.get(key)
+            if results is None:
+                results = inline_results(text)
+                self.cache.put(key, results)
+            INLINE_QUERIES.labels("computed").inc()
+            await self._answer(query, text, results)
+        finally:
+            if self._pending.get(user_id) is asyncio.current_task():
+                del self._pending[user_id]
+
+    async def _answer(self, query: InlineQuery, text: str, results: Results) -> None:
+        articles = [
+            InlineQueryResultArticle(
+                id=mode, title=MODE_TITLES.get(mode, mode), description=reply.replace("\n", " "),
+                input_message_content=InputTextMessageContent(f"{text}\n{reply}"),
+            )
+            for mode, reply in results
+        ]
+        try:
+            await query.answer(articles, cache_time=self.cache_time, is_personal=False,
+                               button=None if articles else HELP_BUTTON)
+        except BadRequest as e:
+            # запрос успел устареть (пользователь набрал дальше) — Telegram его уже не покажет
+            logger.debug("Инлайн-ответ не принят: %s", e)
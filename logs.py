@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+Логирование без записи из event loop: записи уходят в очередь, пишет их фоновый поток.
+
+- в вызывающем потоке — только фильтры и постановка в очередь: форматирование сообщения,
+  трассировки и JSON, запись в stderr выполняет QueueListener в своём потоке;
+  переполненная очередь (вывод не успевает) отбрасывает записи, а не блокирует бота;
+- Sampler пропускает не больше burst записей с одним ключом за interval секунд,
+  число отброшенных приходит полем suppressed в следующей пропущенной записи с тем же ключом;
+- JsonFormatter — одна JSON-строка на запись: ts, level, logger, msg и поля
+  chat_id, mode, latency_ms (передаются через extra= или функцией context), exc — трассировка.
+
+Формат сообщения (msg % args) вычисляется в потоке записи, поэтому в args передаются
+неизменяемые значения.
+"""
+import atexit
+import json
+import logging
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable, Dict, List, Optional, TextIO
+
+from metrics import LOG_RECORDS
+
+TEXT_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
+FIELDS = ("chat_id", "mode", "latency_ms", "suppressed")
+MAX_KEYS = 10_000
+
+
+class JsonFormatter(logging.Formatter):
+    def __init__(self, static: Optional[Dict[str, object]] = None) -> None:
+        super().__init__()
+        self.static = dict(static or {})
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update(self.static)
+        for name in FIELDS:
+            value = record.__dict__.get(name)
+            if value is not None:
+                out[name] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            out["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class Sampler(logging.Filter):
+    """Ограничение частоты по ключу: sample_key из extra= или (логгер, шаблон сообщения)."""
+
+    def __init__(self, burst: int = 20, interval: float = 60.0) -> None:
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows: Dict[object, List] = {}   # ключ -> [начало окна, пропущено, отброшено]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = record.__dict__.get("sample_key") or (record.name, record.msg)
+        now = time.monotonic()
+        with self._lock:
+            w = self._windows.get(key)
+            if w is None or now - w[0] >= self.interval:
+                if w is None and len(self._windows) >= MAX_KEYS:
+                    self._windows.clear()
+                if w is not None and w[2]:
+                    record.suppressed = w[2]
+                self._windows[key] = [now, 1, 0]
+                return True
+            if w[1] < self.burst:
+                w[1] += 1
+                return True
+            w[2] += 1
+            LOG_RECORDS.labels("sampled").inc()
+            return False
+
+
+class ContextFilter(logging.Filter):
+    """Добавляет к записи поля текущего апдейта; вызывается в потоке, где пишут в лог."""
+
+    def __init__(self, context: Callable[[], Dict[str, object]]) -> None:
+        super().__init__()
+        self.context = context
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, value in self.context().items():
+            if value is not None and name not in record.__dict__:
+                setattr(record, name, value)
+        return True
+
+
+class _Enqueue(QueueHandler):
+    def __init__(self, q: "queue.SimpleQueue", max_queue: int) -> None:
+        super().__init__(q)
+        self.max_queue = max_queue
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler форматирует запись до постановки в очередь — здесь это делает поток записи
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_queue:
+            LOG_RECORDS.labels("overflow").inc()
+            return
+        self.queue.put_nowait(record)
+
+
+class _Listener(QueueListener):
+    """QueueListener, который можно останавливать повторно: явный stop_logging, затем atexit."""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._stop_lock = threading.Lock()
+        self._stopped = False
+
+    def stop(self) -> None:
+        with self._stop_lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        super().stop()
+
+
+def setup_logging(fmt: str = "json", level: str = "INFO", stream: Optional[TextIO] = None,
+                  burst: int = 20, interval: float = 60.0, max_queue: int = 10_000,
+                  context: Optional[Callable[[], Dict[str, object]]] = None,
+                  static: Optional[Dict[str, object]] = None) -> QueueListener:
+    """Заменяет обработчики корневого логгера очередью; возвращает запущенный QueueListener
+    (останавливается при выходе из процесса, дописав очередь). burst=0 — без выборки."""
+    out = logging.StreamHandler(stream if stream is not None else sys.stderr)
+    out.setFormatter(JsonFormatter(static) if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    q: "queue.SimpleQueue" = queue.SimpleQueue()
+    handler = _Enqueue(q, max_queue)
+    if burst > 0:
+        handler.addFilter(Sampler(burst, interval))
+    if context is not None:
+        handler.addFilter(ContextFilter(context))
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+        h.close()
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    # httpx пишет INFO на каждый запрос к Bot API (с токеном в URL)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    listener = _Listener(q, out, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging, listener)
+    return listener
+
+def stop_logging(listener: QueueListener) -> None:
+    """Дописывает очередь и останавливает поток записи; повторный вызов ничего не делает."""
+    listener.stop()
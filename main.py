@@ -4,169 +4,103 @@
 """
 Athletics Calculator Bot — production-ready.
 Функции:
-1) % пульса — расчёт диапазона ЧСС по HRmax и процентам.
+1) % пульса — диапазон ЧСС по HRmax и процентам; пульсовые зоны (% HRmax, Карвонен, ПАНО).
 2) Время по темпу — время по дистанции и темпу.
-3) Калькулятор — вычисляет недостающий параметр (дистанция/темп/время).
-4) Прогноз (Ригель) — перевод результатов между дистанциями.
-5) Дорожка ↔ Темп — конвертер скорости (км/ч, mph, м/с) и темпа (мин/км, мин/ми).
+3) Раскладка — сплиты на стандартных дистанциях, по кругам или для диапазона темпов.
+4) Калькулятор — вычисляет недостающий параметр (дистанция/темп/время).
+5) Прогноз (Ригель) — перевод результатов между дистанциями;
+   личный показатель Ригеля по нескольким результатам.
+6) Дорожка ↔ Темп — конвертер скорости (км/ч, mph, м/с) и темпа (мин/км, мин/ми).
 
 Во всех сценариях есть кнопка «⬅ Назад».
 """
 import os
+import asyncio
 import logging
-from typing import Optional, Tuple
+import tempfile
+import time
+import zipfile
+from typing import Dict, List, Optional
 
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TelegramError
 from telegram.ext import (
-    Application, CommandHandler, CallbackQueryHandler,
+    Application, CommandHandler, CallbackQueryHandler, InlineQueryHandler,
     MessageHandler, ContextTypes, filters
 )
 
-# -------------------- ЛОГИРОВАНИЕ --------------------
-logging.basicConfig(
-    format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
-    level=logging.INFO
+from answers import ANSWERS, parse_lines, render_lines, split_message
+from calc.batch import load_numpy
+from calc.errors import InputError
+from calc.lexer import tokenize
+from calc.splits import standard_grid
+from calc.zones import zone_tables
+from calc.table import parse_targets, process_csv_file
+from cache import cache_key, make_reply_cache
+from catchup import catch_up
+from http_server import start_http_server
+from inline import InlineAnswerer
+from logs import setup_logging
+from persistence import SqliteSessionBackend
+from metrics import (
+    ERRORS, LINES, REGISTRY, REPLY_SECONDS, STAGE_SECONDS, CallbackCounter, Gauge, make_metrics_handler,
 )
-logger = logging.getLogger("athletics-bot")
+from processing import PerChatUpdateProcessor, update_chat, update_started
+from sending import BULK, SendLimiter, make_request
+from sessions import SessionStore
 
-# -------------------- УТИЛИТЫ --------------------
-def _norm_num(s: str) -> str:
-    return s.strip().replace(",", ".")
+# -------------------- ЛОГИРОВАНИЕ --------------------
+# настраивается в main(): очередь с фоновым потоком записи, JSON, выборка частых записей (logs.py)
+logger = logging.getLogger("athletics-bot")
 
-def parse_float(s: str) -> Optional[float]:
-    try:
-        return float(_norm_num(s))
-    except Exception:
-        return None
-
-def parse_time_to_seconds(s: str) -> Optional[int]:
-    """Принимает 'm:ss', 'h:mm:ss' или целые секунды. Возвращает секунды."""
-    s = s.strip()
-    if not s:
-        return None
-    if s.isdigit():
-        return int(s)
-    parts = s.split(":")
-    if not all(p.isdigit() for p in parts):
-        return None
-    if len(parts) == 2:
-        m, sec = map(int, parts)
-        return m * 60 + sec
-    if len(parts) == 3:
-        h, m, sec = map(int, parts)
-        return h * 3600 + m * 60 + sec
-    return None
-
-def format_seconds_to_hhmmss(total_seconds: float) -> str:
-    total_seconds = int(round(total_seconds))
-    h = total_seconds // 3600
-    m = (total_seconds % 3600) // 60
-    s = total_seconds % 60
-    if h > 0:
-        return f"{h}:{m:02d}:{s:02d}"
-    return f"{m}:{s:02d}"
-
-def km_to_miles(km: float) -> float:
-    return km * 0.621371192
-
-def miles_to_km(mi: float) -> float:
-    return mi / 0.621371192
-
-def meters_to_km(m: float) -> float:
-    return m / 1000.0
-
-def km_to_m(km: float) -> float:
-    return km * 1000.0
-
-def parse_distance(token: str) -> Optional[Tuple[float, str]]:
-    """Возвращает (дистанция_в_км, исходная_единица: 'm'|'km'|'mi') или None."""
-    if not token:
-        return None
-    t = token.strip().lower().replace(" ", "")
-    if t.endswith(("км", "km")):
-        val = parse_float(t[:-2]);   return (float(val), "km") if val is not None else None
-    if t.endswith(("м", "m")):
-        val = parse_float(t[:-1]);   return (meters_to_km(float(val)), "m") if val is not None else None
-    if t.endswith(("mi", "mile", "miles")):
-        if "mile" in t:
-            val = parse_float(t.split("m")[0])
-        else:
-            val = parse_float(t[:-2])
-        return (miles_to_km(float(val)), "mi") if val is not None else None
-    # без суффикса — трактуем как км
-    val = parse_float(t)
-    return (float(val), "km") if val is not None else None
-
-def parse_pace(token: str):
-    """Возвращает (секунд_на_единицу, '/km'|'/mi'). Если единицы не указаны — считаем '/km'."""
-    if not token:
-        return None
-    t = token.strip().lower()
-    unit = "/km"
-    if "/mi" in t or "/mile" in t:
-        unit = "/mi"; t = t.split("/")[0].strip()
-    elif "/км" in t or "/km" in t:
-        unit = "/km"; t = t.split("/")[0].strip()
-    secs = parse_time_to_seconds(t)
-    if secs is None:
-        return None
-    return secs, unit
-
-def convert_speed_to_pace(speed_value: float, unit: str = "kmh", pace_unit: str = "/km") -> float:
-    """Возвращает секунд/км или секунд/ми по заданной скорости (kmh|mph|mps)."""
-    if speed_value <= 0:
-        raise ValueError("Скорость должна быть > 0.")
-    if unit == "kmh":
-        mps = speed_value * 1000.0 / 3600.0
-    elif unit == "mph":
-        mps = speed_value * 1609.344 / 3600.0
-    elif unit == "mps":
-        mps = speed_value
-    else:
-        raise ValueError("Неподдерживаемая единица скорости.")
-    if pace_unit == "/km":
-        return 1000.0 / mps
-    return 1609.344 / mps
-
-def convert_pace_to_speed(pace_seconds: int, pace_unit: str = "/km", out_unit: str = "kmh") -> float:
-    """Возвращает скорость (kmh|mph|mps) по темпу (сек/км или сек/ми)."""
-    if pace_seconds <= 0:
-        raise ValueError("Темп должен быть > 0.")
-    if pace_unit == "/km":
-        mps = 1000.0 / pace_seconds
-    else:
-        mps = 1609.344 / pace_seconds
-    if out_unit == "kmh":
-        return mps * 3.6
-    if out_unit == "mph":
-        return mps * 3600.0 / 1609.344
-    if out_unit == "mps":
-        return mps
-    raise ValueError("Неподдерживаемая единица скорости.")
-
-def riegel(t1_sec: int, d1_km: float, d2_km: float, exp: float = 1.06) -> float:
-    """T2 = T1 × (D2/D1)^exp"""
-    if d1_km <= 0 or d2_km <= 0:
-        raise ValueError("Дистанции должны быть > 0.")
-    return t1_sec * ((d2_km / d1_km) ** exp)
+# ожидаемые исключения пишутся без трассировки: ввод, который разобрался, но не посчитался (InputError
+# из calc), и отказы Telegram, не зависящие от кода: бот заблокирован, сеть или таймаут, лимит запросов.
+# BadRequest (наследник NetworkError) — неверный запрос бота, он идёт с трассировкой, как и всё остальное
+EXPECTED_ERRORS = (InputError, Forbidden, NetworkError, RetryAfter)
+
+def is_expected(e: BaseException) -> bool:
+    return isinstance(e, EXPECTED_ERRORS) and not isinstance(e, BadRequest)
+
+def log_error(msg: str, e: BaseException, **fields) -> str:
+    """Пишет исключение обработчика; возвращает вид для bot_errors_total: expected или exception.
+    Выборка — по сообщению и типу исключения, так что частая ошибка не заслоняет редкую."""
+    extra = dict(fields, sample_key=(msg, type(e).__name__))
+    if is_expected(e):
+        logger.warning("%s: %s: %s", msg, type(e).__name__, e, extra=extra)
+        return "expected"
+    logger.error(msg, exc_info=e, extra=extra)
+    return "exception"
+
+def _log_context() -> dict:
+    """Поля текущего апдейта для каждой записи лога: чат и мс с начала обработки."""
+    started = update_started()
+    if started is None:
+        return {}
+    return {"chat_id": update_chat(), "latency_ms": round((time.perf_counter() - started) * 1e3, 1)}
 
 # -------------------- КЛАВИАТУРЫ --------------------
 MAIN_MENU = InlineKeyboardMarkup([
-    [InlineKeyboardButton("% пульса", callback_data="menu_hr")],
+    [InlineKeyboardButton("% пульса и зоны", callback_data="menu_hr")],
     [InlineKeyboardButton("Время по темпу", callback_data="menu_time_by_pace")],
+    [InlineKeyboardButton("Раскладка (сплиты)", callback_data="menu_splits")],
     [InlineKeyboardButton("Калькулятор (дист/темп/время)", callback_data="menu_calc")],
     [InlineKeyboardButton("Прогноз (Ригель)", callback_data="menu_riegel")],
+    [InlineKeyboardButton("Личный показатель Ригеля", callback_data="menu_riegel_fit")],
     [InlineKeyboardButton("Дорожка ↔ Темп", callback_data="menu_tread")],
+    [InlineKeyboardButton("Таблица (CSV)", callback_data="menu_csv")],
 ])
 BACK_BTN = InlineKeyboardMarkup([[InlineKeyboardButton("⬅ Назад", callback_data="back_main")]])
 
 WELCOME_TEXT = (
     "Выберите инструмент:\n\n"
-    "• % пульса — диапазон ЧСС по HRmax и %\n"
+    "• % пульса и зоны — диапазон ЧСС по HRmax и %, зоны по HRmax, Карвонену или ПАНО\n"
     "• Время по темпу — время по дистанции и темпу\n"
+    "• Раскладка — сплиты по темпу или целевому времени\n"
     "• Калькулятор — вычислить недостающий параметр\n"
     "• Прогноз (Ригель) — оценка на другую дистанцию\n"
-    "• Дорожка ↔ Темп — км/ч⇄мин/км и mph⇄мин/ми"
+    "• Личный показатель Ригеля — по нескольким вашим результатам\n"
+    "• Дорожка ↔ Темп — км/ч⇄мин/км и mph⇄мин/ми\n"
+    "• Таблица (CSV) — пришлите файл, посчитаю каждую строку"
 )
 
 # -------------------- КОМАНДЫ --------------------
@@ -179,31 +113,53 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 async def help_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     text = (
         "Форматы:\n"
+        "• Пульс: '196, 72-83' | зоны: '196' | '196, покой=55' (Карвонен) | 'пано=172'\n"
         "• Время: m:ss или h:mm:ss\n"
         "• Дистанция: 1000м | 3км | 10km | 1mi\n"
         "• Темп: 4:10/км | 6:30/mi (если без единиц — считаем /км)\n"
+        "• Раскладка: '4:00' | '21.1км, 1:30:00' | '4:00/км, круг=400, 5км' | '5км, 18:00, круг=400' | '3:30-5:00, шаг=5'\n"
         "• Ригель: '10км, 41:30 -> 21.1км' | '3000м, 10:00 -> 5000м, exp=1.07'\n"
-        "• Дорожка: speed=12.5kmh | 7.5mph | 3.5mps  или  pace=4:48/км | 7:30/mi"
+        "• Личный Ригель: '5км 19:00, 10км 40:00, 21.1км 1:28:00 -> 42.195км, 30км'\n"
+        "• Дорожка: speed=12.5kmh | 7.5mph | 3.5mps  или  pace=4:48/км | 7:30/mi\n"
+        "• В любом чате: @имя_бота 10км 41:30 -> 21.1км | 4:10/км | 10км, 4:00 | 196, 72-83"
     )
     await update.message.reply_text(text, reply_markup=MAIN_MENU)
 
+async def answer_callback(update: Update) -> None:
+    """Гасит «часики» у кнопки. Устаревший запрос (бот догоняет очередь после перезапуска)
+    Telegram отклоняет — это не повод не выполнять само нажатие."""
+    try:
+        await update.callback_query.answer()
+    except BadRequest as e:
+        logger.debug("answerCallbackQuery: %s", e)
+
+def _session_id(update: Update) -> int:
+    user = update.effective_user
+    return user.id if user is not None else update.effective_chat.id
+
 async def back_to_main(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data.clear()
+    await answer_callback(update)
+    sessions.clear(_session_id(update))
     await start(update, context)
 
 # -------------------- МЕНЮ-СЦЕНАРИИ --------------------
 async def menu_hr(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data.clear(); context.user_data["mode"] = "hr"
+    await answer_callback(update)  # сразу гасим «часики» у клиента
+    sessions.set(_session_id(update), "hr")
     txt = (
-        "Введите HRmax и проценты. Примеры:\n"
+        "Введите HRmax и проценты — или только HRmax, чтобы получить зоны. Примеры:\n"
         "• 196, 72-83\n"
         "• 190, 70\n"
-        "Формат: HRmax, проценты"
+        "• 196 — зоны по % от HRmax\n"
+        "• 196, покой=55 — зоны по Карвонену (резерв ЧСС)\n"
+        "• пано=172 — зоны по пульсу на ПАНО\n"
+        "Несколько спортсменов — по строке на каждого: 'Иванов: 196, покой=55'"
     )
     await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
 
 async def menu_time_by_pace(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data.clear(); context.user_data["mode"] = "time_by_pace"
+    await answer_callback(update)
+    sessions.set(_session_id(update), "time_by_pace")
     txt = (
         "Введите дистанцию и темп. Примеры:\n"
         "• 1000м, 4:00\n"
@@ -213,8 +169,22 @@ async def menu_time_by_pace(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
     await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
 
+async def menu_splits(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await answer_callback(update)
+    sessions.set(_session_id(update), "splits")
+    txt = (
+        "Раскладка по темпу или целевому времени. Примеры:\n"
+        "• 4:00 — сплиты 200м…марафон\n"
+        "• 21.1км, 1:30:00 — темп и сплиты для цели\n"
+        "• 4:00/км, круг=400, 5км — время на каждом круге (круг без единиц — в метрах)\n"
+        "• 5км, 18:00, круг=400 — то же для целевого времени\n"
+        "• 3:30-5:00, шаг=5 — таблица для диапазона темпов"
+    )
+    await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
+
 async def menu_calc(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data.clear(); context.user_data["mode"] = "calc"
+    await answer_callback(update)
+    sessions.set(_session_id(update), "calc")
     txt = (
         "Калькулятор: укажите ДВА параметра, третий посчитаю.\n"
         "Примеры:\n"
@@ -225,277 +195,360 @@ async def menu_calc(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
 
 async def menu_riegel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data.clear(); context.user_data["mode"] = "riegel"
+    await answer_callback(update)
+    sessions.set(_session_id(update), "riegel")
     txt = (
         "Ригель: '10км, 41:30 -> 21.1км' или '3000м, 10:00 -> 5000м, exp=1.07'"
     )
     await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
 
+async def menu_riegel_fit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await answer_callback(update)
+    sessions.set(_session_id(update), "riegel_fit")
+    txt = (
+        "Личный показатель Ригеля: перечислите свои результаты (не меньше двух дистанций)\n"
+        "и, после '->', дистанции для прогноза. Примеры:\n"
+        "• 5км 19:00, 10км 40:00, 21.1км 1:28:00 -> 42.195км, 30км\n"
+        "• 5км 20:00, 10км 41:30 — прогноз на 1 км…марафон"
+    )
+    await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
+
 async def menu_tread(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    context.user_data.clear(); context.user_data["mode"] = "tread"
+    await answer_callback(update)
+    sessions.set(_session_id(update), "tread")
     txt = (
         "Пересчёт: speed=12.5kmh | 7.5mph | 3.5mps  ИЛИ  pace=4:48/км | 7:30/mi"
     )
     await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
 
+async def menu_csv(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    await answer_callback(update)
+    sessions.clear(_session_id(update))
+    txt = (
+        "Пришлите CSV-файл с заголовком — посчитаю каждую строку и верну таблицу:\n"
+        "• дистанция + время → темп и прогноз по Ригелю\n"
+        "• темп → скорость, скорость → темп\n"
+        "• HRmax (и покой) или ПАНО → пульсовые зоны — например, на всю команду\n"
+        "Столбцы: dist/дистанция, time/время, pace/темп, speed/скорость, hrmax, rest/покой, lthr/пано; "
+        "разделитель «,» или «;».\n"
+        "В подписи к файлу можно указать цели прогноза: '21.1км, 42.195км, exp=1.07'"
+    )
+    await update.callback_query.message.edit_text(txt, reply_markup=BACK_BTN)
+
+# -------------------- ТАБЛИЦЫ (CSV) --------------------
+CSV_MAX_BYTES = 20 * 1024 * 1024    # больше Bot API не даёт скачать
+CSV_ZIP_BYTES = 5 * 1024 * 1024     # результат крупнее отправляется в zip (PTB держит загружаемый файл в памяти)
+
+async def csv_document(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    doc = update.message.document
+    if doc.file_size and doc.file_size > CSV_MAX_BYTES:
+        await update.message.reply_text("Файл больше 20 МБ — разделите его на части.", reply_markup=BACK_BTN)
+        return
+    targets, exp = parse_targets(update.message.caption or "")
+    await update.message.reply_text("Считаю таблицу…")
+    name = _result_name(doc.file_name)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # имена файлов на диске фиксированы: имя от пользователя идёт только в filename= ответа
+            src, dst = os.path.join(tmp, "in.csv"), os.path.join(tmp, "out.csv")
+            await (await doc.get_file()).download_to_drive(src)
+            # расчёт — в потоке, чтобы не держать event loop; одновременно не больше CSV_WORKERS файлов
+            async with csv_jobs:
+                rows, errors = await asyncio.to_thread(process_csv_file, src, dst, targets, exp)
+            if os.path.getsize(dst) > CSV_ZIP_BYTES:
+                dst = await asyncio.to_thread(_zip_file, dst, name)
+                name += ".zip"
+            with open(dst, "rb") as f:
+                await context.bot.send_document(
+                    update.effective_chat.id, f, filename=name,
+                    caption=f"Строк: {rows}, с ошибками: {errors}", reply_markup=BACK_BTN, rate_limit_args=BULK)
+    except Exception as e:
+        ERRORS.labels("csv", log_error("Ошибка обработки таблицы", e, mode="csv")).inc()
+        if not isinstance(e, TelegramError):
+            await update.message.reply_text(f"Ошибка: {e}", reply_markup=BACK_BTN)
+
+def _result_name(file_name: Optional[str]) -> str:
+    """Имя результата для пользователя: «<имя загруженного файла>_result.csv» без каталогов и управляющих символов."""
+    base = os.path.basename((file_name or "").replace("\\", "/"))
+    stem = "".join(ch for ch in os.path.splitext(base)[0] if ch.isprintable()).strip(" .")
+    return f"{stem[:100] or 'table'}_result.csv"
+
+def _zip_file(path: str, arcname: str) -> str:
+    out = path + ".zip"
+    with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as z:
+        z.write(path, arcname)
+    return out
+
 # -------------------- РОУТЕР --------------------
 async def text_router(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    mode = context.user_data.get("mode")
+    received = time.perf_counter()
+    mode = await sessions.get_async(_session_id(update))
     if not mode:
         await start(update, context)
         return
-    text = update.message.text.strip()
+    if mode not in ANSWERS:
+        await update.message.reply_text("Не понял. Нажмите кнопку в меню.", reply_markup=MAIN_MENU)
+        return
+    lines = [line.strip() for line in update.message.text.splitlines() if line.strip()]
     try:
-        if mode == "hr":
-            await handle_hr(text, update)
-        elif mode == "time_by_pace":
-            await handle_time_by_pace(text, update)
-        elif mode == "calc":
-            await handle_calc(text, update)
-        elif mode == "riegel":
-            await handle_riegel(text, update)
-        elif mode == "tread":
-            await handle_tread(text, update)
+        replies = await compute_replies_async(mode, lines or [""])
+        if len(replies) == 1:
+            chunks = split_message(replies)
         else:
-            await update.message.reply_text("Не понял. Нажмите кнопку в меню.", reply_markup=MAIN_MENU)
+            # несколько строк — ответ на каждую, одним или несколькими сообщениями до 4096 символов
+            blocks = [f"{i}) {line}\n{reply}" for i, (line, reply) in enumerate(zip(lines, replies), 1)]
+            chunks = split_message(blocks)
+        send_started = time.perf_counter()
+        for n, chunk in enumerate(chunks, 1):
+            markup = BACK_BTN if n == len(chunks) else None
+            if n == 1:
+                await update.message.reply_text(chunk, reply_markup=markup)
+            else:
+                # продолжение длинного ответа уступает ответам другим чатам (приоритет задаётся только через бота)
+                await context.bot.send_message(update.effective_chat.id, chunk, reply_markup=markup,
+                                               rate_limit_args=BULK)
+        now = time.perf_counter()
+        _, _, send_h, reply_h, _ = _mode_metrics(mode)
+        send_h.observe(now - send_started)
+        reply_h.observe(now - (update_started() or received))
     except Exception as e:
-        logger.exception("Ошибка обработки")
-        await update.message.reply_text(f"Ошибка: {e}", reply_markup=BACK_BTN)
-
-# -------------------- ИМПЛЕМЕНТАЦИИ --------------------
-async def handle_hr(text: str, update: Update) -> None:
-    line = text.replace("%", "").replace(" ", "")
-    if "," in line:
-        left, right = line.split(",", 1)
-    elif ";" in line:
-        left, right = line.split(";", 1)
-    else:
-        await update.message.reply_text("Формат: HRmax, проценты (напр. 196, 72-83)", reply_markup=BACK_BTN)
-        return
+        ERRORS.labels(mode, log_error("Ошибка обработки", e, mode=mode)).inc()
+        # отказ Telegram пересылать пользователю бесполезно (и отправка, скорее всего, не пройдёт)
+        if not isinstance(e, TelegramError):
+            await update.message.reply_text(f"Ошибка: {e}", reply_markup=BACK_BTN)
 
-    hrmax = parse_float(left)
-    if hrmax is None or hrmax <= 0:
-        await update.message.reply_text("Не удалось распознать HRmax (>0).", reply_markup=BACK_BTN)
-        return
+async def on_error(update: object, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Исключения, не пойманные обработчиками (меню, команды, инлайн), — с той же классификацией.
+    Без него PTB пишет каждое с полной трассировкой."""
+    log_error("Ошибка в обработчике", context.error)
 
-    if "-" in right:
-        p1s, p2s = right.split("-", 1)
-        p1 = parse_float(p1s); p2 = parse_float(p2s)
-        if p1 is None or p2 is None:
-            await update.message.reply_text("Проблема с процентами. Пример: 72-83.", reply_markup=BACK_BTN)
-            return
-        low = int(round(hrmax * min(p1, p2) / 100.0))
-        high = int(round(hrmax * max(p1, p2) / 100.0))
-        await update.message.reply_text(
-            f"Диапазон: {low}–{high} уд/мин (из {p1:.0f}–{p2:.0f}% от {hrmax:.0f}).",
-            reply_markup=BACK_BTN
-        )
-    else:
-        p1 = parse_float(right)
-        if p1 is None:
-            await update.message.reply_text("Процент не распознан.", reply_markup=BACK_BTN)
-            return
-        val = int(round(hrmax * p1 / 100.0))
-        await update.message.reply_text(f"{p1:.0f}% от {hrmax:.0f} = {val} уд/мин.", reply_markup=BACK_BTN)
-
-async def handle_time_by_pace(text: str, update: Update) -> None:
-    if "," in text:
-        ds, pace_s = text.split(",", 1)
-    elif ";" in text:
-        ds, pace_s = text.split(";", 1)
-    else:
-        await update.message.reply_text("Формат: дистанция, темп (например 1000м, 4:00)", reply_markup=BACK_BTN)
-        return
-
-    dist = parse_distance(ds)
-    if dist is None:
-        await update.message.reply_text("Дистанция не распознана.", reply_markup=BACK_BTN)
-        return
-    dist_km, _ = dist
-
-    pace = parse_pace(pace_s)
-    if pace is None:
-        await update.message.reply_text("Темп не распознан (ожидал m:ss[/км|/mi]).", reply_markup=BACK_BTN)
-        return
-    pace_sec, pace_unit = pace
-
-    sec_per_km = pace_sec if pace_unit == "/km" else pace_sec * (1 / 0.621371192)
-    time_sec = sec_per_km * dist_km
-    await update.message.reply_text(f"Время: {format_seconds_to_hhmmss(time_sec)}", reply_markup=BACK_BTN)
-
-def extract_named(parts, keys):
-    for p in parts:
-        pl = p.lower().strip()
-        for k in keys:
-            if pl.startswith(k):
-                return p.split("=", 1)[1].strip()
-    return None
-
-async def handle_calc(text: str, update: Update) -> None:
-    raw = [t for chunk in text.replace(";", ",").split(",") for t in chunk.strip().split() if t.strip()]
-
-    dist_tok = extract_named(raw, ("dist=", "дист=", "distance="))
-    pace_tok = extract_named(raw, ("pace=", "темп="))
-    time_tok = extract_named(raw, ("time=", "время=", "t="))
-
-    if dist_tok is None:
-        for p in raw:
-            if p.lower().endswith(("км", "km", "м", "m", "mi", "mile", "miles")) or p.replace(",", ".").replace(".", "", 1).isdigit():
-                dist_tok = p; break
-    if pace_tok is None:
-        for p in raw:
-            if ":" in p and ("/" in p or "pace" in p.lower() or "темп" in p.lower()):
-                pace_tok = p; break
-    if time_tok is None:
-        for p in raw:
-            if ":" in p and (("pace" not in p.lower()) and ("/" not in p)):
-                time_tok = p; break
-
-    dist_km = parse_distance(dist_tok)[0] if dist_tok and parse_distance(dist_tok) else None
-    pace_parsed = parse_pace(pace_tok) if pace_tok else None
-    pace_sec = pace_parsed[0] if pace_parsed else None
-    pace_unit = pace_parsed[1] if pace_parsed else "/km"
-    time_sec = parse_time_to_seconds(time_tok) if time_tok else None
-
-    known = sum(x is not None for x in (dist_km, pace_sec, time_sec))
-    if known < 2:
-        await update.message.reply_text("Нужно указать любые ДВА параметра из: дистанция, темп, время.", reply_markup=BACK_BTN)
-        return
-
-    if dist_km is None:
-        sec_per_km = pace_sec if pace_unit == "/km" else pace_sec * (1 / 0.621371192)
-        dist_km = time_sec / sec_per_km
-        await update.message.reply_text(
-            f"Дистанция: {dist_km:.3f} км ({int(round(km_to_m(dist_km)))} м, {km_to_miles(dist_km):.3f} mi)",
-            reply_markup=BACK_BTN
-        )
-        return
-
-    if pace_sec is None:
-        sec_per_km = time_sec / dist_km
-        await update.message.reply_text(
-            f"Темп: {format_seconds_to_hhmmss(sec_per_km)}/км  |  {format_seconds_to_hhmmss(sec_per_km / (1/0.621371192))}/mi",
-            reply_markup=BACK_BTN
-        )
-        return
-
-    if time_sec is None:
-        sec_per_km = pace_sec if pace_unit == "/km" else pace_sec * (1 / 0.621371192)
-        time_sec = sec_per_km * dist_km
-        await update.message.reply_text(
-            f"Время: {format_seconds_to_hhmmss(time_sec)}",
-            reply_markup=BACK_BTN
-        )
-        return
-
-async def handle_riegel(text: str, update: Update) -> None:
-    t = text.replace("→", "->")
-    parts = [p.strip() for p in t.split("->")]
-    if len(parts) < 2:
-        await update.message.reply_text("Ожидал формат: dist1, time1 -> dist2[, exp=x.xx]", reply_markup=BACK_BTN)
-        return
-
-    left, right = parts[0], parts[1]
-    if "," not in left and ";" not in left:
-        await update.message.reply_text("Слева укажите 'дистанция, время' (например '10км, 41:30').", reply_markup=BACK_BTN)
-        return
-    ldist_tok, ltime_tok = [x.strip() for x in left.replace(";", ",").split(",", 1)]
-    dist1 = parse_distance(ldist_tok)
-    if dist1 is None:
-        await update.message.reply_text("Первая дистанция не распознана.", reply_markup=BACK_BTN); return
-    d1_km, _ = dist1
-    t1 = parse_time_to_seconds(ltime_tok)
-    if t1 is None:
-        await update.message.reply_text("Время слева не распознано.", reply_markup=BACK_BTN); return
-
-    rparts = [p.strip() for p in right.split(",")]
-    dist2_tok = rparts[0]
-    dist2 = parse_distance(dist2_tok)
-    if dist2 is None:
-        await update.message.reply_text("Целевая дистанция не распознана.", reply_markup=BACK_BTN); return
-    d2_km, _ = dist2
-
-    exp = 1.06
-    for rp in rparts[1:]:
-        if rp.lower().startswith("exp="):
-            maybe = parse_float(rp.split("=", 1)[1])
-            if maybe and 0.9 <= maybe <= 1.2:
-                exp = maybe
-
-    t2 = riegel(t1, d1_km, d2_km, exp)
-    pace2_per_km = t2 / d2_km
-    pace2_per_mi = pace2_per_km / (1/0.621371192)
-    await update.message.reply_text(
-        "Прогноз:\n"
-        f"• Время: {format_seconds_to_hhmmss(t2)}\n"
-        f"• Темп: {format_seconds_to_hhmmss(pace2_per_km)}/км  |  {format_seconds_to_hhmmss(pace2_per_mi)}/mi\n"
-        f"(exp={exp:.2f})",
-        reply_markup=BACK_BTN
-    )
-
-async def handle_tread(text: str, update: Update) -> None:
-    q = text.strip().lower().replace(" ", "")
-    if q.startswith("speed="):
-        val = q.split("=", 1)[1]
-        unit = "kmh"
-        if val.endswith("kmh"):
-            v = parse_float(val[:-3]); unit = "kmh"
-        elif val.endswith("mph"):
-            v = parse_float(val[:-3]); unit = "mph"
-        elif val.endswith("mps"):
-            v = parse_float(val[:-3]); unit = "mps"
-        else:
-            v = parse_float(val); unit = "kmh"
-        if v is None or v <= 0:
-            await update.message.reply_text("Скорость не распознана (>0).", reply_markup=BACK_BTN); return
-        pace_km = convert_speed_to_pace(v, unit, "/km")
-        pace_mi = convert_speed_to_pace(v, unit, "/mi")
-        await update.message.reply_text(
-            f"Темп: {format_seconds_to_hhmmss(pace_km)}/км  |  {format_seconds_to_hhmmss(pace_mi)}/mi",
-            reply_markup=BACK_BTN
-        )
-        return
-
-    if q.startswith("pace=") or ":" in q:
-        val = q.split("=", 1)[1] if q.startswith("pace=") else q
-        pace = parse_pace(val)
-        if pace is None:
-            await update.message.reply_text("Темп не распознан.", reply_markup=BACK_BTN); return
-        p_sec, p_unit = pace
-        s_kmh = convert_pace_to_speed(p_sec, p_unit, "kmh")
-        s_mph = convert_pace_to_speed(p_sec, p_unit, "mph")
-        s_mps = convert_pace_to_speed(p_sec, p_unit, "mps")
-        await update.message.reply_text(
-            f"Скорость: {s_kmh:.2f} км/ч  |  {s_mph:.2f} mph  |  {s_mps:.2f} м/с",
-            reply_markup=BACK_BTN
+# -------------------- ИМПЛЕМЕНТАЦИИ --------------------
+# кэш ответов; тип выбирается в build_app() переменной REPLY_CACHE
+reply_cache = make_reply_cache()
+# режимы пользователей; лимиты задаются в build_app() (SESSION_MAX, SESSION_TTL)
+sessions = SessionStore()
+# инлайн-запросы «@bot ...»; параметры задаются в build_app() (INLINE_*)
+inline = InlineAnswerer()
+# одновременно обрабатываемые CSV-файлы (CSV_WORKERS)
+csv_jobs = asyncio.Semaphore(2)
+
+_MODE_METRICS: Dict[str, tuple] = {}
+
+def _mode_metrics(mode: str) -> tuple:
+    """Серии метрик режима (parse, compute, send, reply, lines) — чтобы не искать их по меткам на каждом ответе."""
+    found = _MODE_METRICS.get(mode)
+    if found is None:
+        found = _MODE_METRICS[mode] = (
+            STAGE_SECONDS.labels(mode, "parse"), STAGE_SECONDS.labels(mode, "compute"),
+            STAGE_SECONDS.labels(mode, "send"), REPLY_SECONDS.labels(mode), LINES.labels(mode),
         )
-        return
-
-    await update.message.reply_text(
-        "Укажите либо speed=12.5kmh|7.5mph|3.5mps, либо pace=4:48/км|7:30/mi.",
-        reply_markup=BACK_BTN
-    )
+    return found
+
+def _reply_keys(mode: str, lines: List[str]) -> tuple:
+    started = time.perf_counter()
+    token_lines = [tokenize(line) for line in lines]
+    return started, token_lines, [cache_key(mode, tokens) for tokens in token_lines]
+
+def compute_replies(mode: str, lines: List[str], prepared: Optional[tuple] = None) -> List[str]:
+    """Ответы на строки сообщения; найденные в кэше не пересчитываются, остальные считаются пачкой."""
+    started, token_lines, keys = prepared or _reply_keys(mode, lines)
+    replies = [reply_cache.get(key) for key in keys]
+    misses = [i for i, r in enumerate(replies) if r is None]
+    parsed = parse_lines(mode, [token_lines[i] for i in misses]) if misses else []
+    parsed_at = time.perf_counter()
+    if misses:
+        failed = sum(isinstance(p, str) for p in parsed)
+        if failed:
+            ERRORS.labels(mode, "parse").inc(failed)
+        for i, reply in zip(misses, render_lines(mode, parsed)):
+            replies[i] = reply
+            reply_cache.put(keys[i], reply)
+    done = time.perf_counter()
+    parse_h, compute_h, _, _, lines_c = _mode_metrics(mode)
+    parse_h.observe(parsed_at - started)
+    compute_h.observe(done - parsed_at)
+    lines_c.inc(len(lines))
+    return replies
+
+async def compute_replies_async(mode: str, lines: List[str]) -> List[str]:
+    """compute_replies для обработчиков: общий кэш (SQLite) читается в потоке до расчёта."""
+    prepared = _reply_keys(mode, lines)
+    await reply_cache.prefetch(prepared[2])
+    return compute_replies(mode, lines, prepared)
+
+def compute_reply(mode: str, text: str) -> str:
+    """Текст ответа для режима; одинаковые по смыслу запросы берутся из кэша."""
+    return compute_replies(mode, [text])[0]
 
 # -------------------- ИНИЦИАЛИЗАЦИЯ --------------------
+# сервер /metrics; поднимается в post_init, если задан METRICS_PORT
+metrics_server = None
+# прогрев расчётов; запускается в post_init, дожидается post_shutdown
+warmup_task: Optional[asyncio.Task] = None
+
+def register_metrics(app: Application) -> None:
+    """Метрики, которые читают текущее состояние при каждом снятии: кэш, сессии, очередь."""
+    CallbackCounter("bot_reply_cache_hits_total", "Попадания в кэш ответов", fn=lambda: reply_cache.hits)
+    CallbackCounter("bot_reply_cache_misses_total", "Промахи кэша ответов", fn=lambda: reply_cache.misses)
+    CallbackCounter("bot_reply_cache_evictions_total", "Вытеснения из кэша ответов", fn=lambda: reply_cache.evictions)
+    Gauge("bot_sessions", "Сессий в памяти", fn=lambda: len(sessions))
+    Gauge("bot_update_queue_size", "Апдейтов в очереди Application", fn=app.update_queue.qsize)
+    Gauge("bot_updates_processing", "Апдейтов в обработке", fn=lambda: app.update_processor.in_flight)
+    limiter = app.bot.rate_limiter
+    if limiter is not None:
+        Gauge("bot_send_waiting", "Исходящих запросов, ждущих общего лимита", fn=lambda: limiter.waiting)
+
+def warm_up() -> None:
+    """Импорт NumPy, сетка раскладок и таблицы пульсовых зон — по очереди в одном потоке."""
+    load_numpy()
+    standard_grid()
+    zone_tables()
+
+async def run_warm_up() -> None:
+    started = time.perf_counter()
+    try:
+        await asyncio.to_thread(warm_up)
+    except Exception:
+        logger.exception("Прогрев не удался; расчёты догрузятся при первом обращении")
+    else:
+        logger.info("Прогрев: %.0f мс", (time.perf_counter() - started) * 1e3)
+
+async def post_init(app: Application) -> None:
+    global metrics_server, warmup_task
+    # прогрев идёт в потоке, пока идут первые запросы к Bot API, — старт его не ждёт
+    warmup_task = asyncio.create_task(run_warm_up())
+    if sessions.backend is not None:
+        await sessions.backend.start(purge_age=sessions.ttl)
+    # после перезапуска: накопленная очередь выбирается пачками и сворачивается до старта polling
+    if not os.environ.get("WEBHOOK_URL") and os.environ.get("CATCHUP", "1") != "0":
+        await catch_up(app, max_updates=int(os.environ.get("CATCHUP_MAX", "100000")))
+    port = os.environ.get("METRICS_PORT")
+    if port:
+        listen = os.environ.get("METRICS_LISTEN", "127.0.0.1")
+        metrics_server = await start_http_server(make_metrics_handler(REGISTRY), listen, int(port))
+        logger.info("Метрики: http://%s:%s/metrics", listen, port)
+
+async def post_shutdown(app: Application) -> None:
+    global metrics_server, warmup_task
+    if warmup_task is not None:
+        await warmup_task
+        warmup_task = None
+    if metrics_server is not None:
+        metrics_server.close()
+        await metrics_server.wait_closed()
+        metrics_server = None
+    if sessions.backend is not None:
+        await sessions.backend.stop()
+    await asyncio.to_thread(reply_cache.close)
+
 def build_app() -> Application:
+    global reply_cache, sessions, inline, csv_jobs
     token = os.environ.get("BOT_TOKEN")
     if not token:
         raise RuntimeError("Переменная окружения BOT_TOKEN не задана.")
-    app = Application.builder().token(token).build()
+    reply_cache = make_reply_cache(os.environ.get("REPLY_CACHE"),
+                                   max_age=float(os.environ.get("REPLY_CACHE_MAX_AGE", str(7 * 24 * 3600))))
+    session_db = os.environ.get("SESSION_DB")
+    backend = SqliteSessionBackend(
+        session_db,
+        flush_interval=float(os.environ.get("SESSION_FLUSH_INTERVAL", "5")),
+        flush_every=int(os.environ.get("SESSION_FLUSH_EVERY", "500")),
+    ) if session_db else None
+    sessions = SessionStore(max_entries=int(os.environ.get("SESSION_MAX", "1000000")),
+                            ttl=float(os.environ.get("SESSION_TTL", str(30 * 24 * 3600))),
+                            backend=backend)
+    inline = InlineAnswerer(debounce=float(os.environ.get("INLINE_DEBOUNCE", "0.15")),
+                            ttl=float(os.environ.get("INLINE_TTL", "60")),
+                            cache_time=int(os.environ.get("INLINE_CACHE_TIME", "300")))
+    csv_jobs = asyncio.Semaphore(int(os.environ.get("CSV_WORKERS", "2")))
+    concurrency = int(os.environ.get("CONCURRENT_UPDATES", "64"))
+    builder = Application.builder().token(token).concurrent_updates(PerChatUpdateProcessor(concurrency))
+    # HTTP-клиент Bot API: пул, keep-alive и таймауты (секунды)
+    http = dict(keepalive=float(os.environ.get("TG_KEEPALIVE", "30")),
+                connect_timeout=float(os.environ.get("TG_CONNECT_TIMEOUT", "5")),
+                read_timeout=float(os.environ.get("TG_READ_TIMEOUT", "5")),
+                write_timeout=float(os.environ.get("TG_WRITE_TIMEOUT", "5")),
+                pool_timeout=float(os.environ.get("TG_POOL_TIMEOUT", "1")))
+    builder = builder.request(make_request(int(os.environ.get("TG_POOL_SIZE", "16")), **http))
+    builder = builder.get_updates_request(make_request(1, **http))
+    send_rate = float(os.environ.get("SEND_RATE", "30"))  # 0 — без лимитов отправки
+    if send_rate > 0:
+        builder = builder.rate_limiter(SendLimiter(
+            rate=send_rate,
+            chat_rate=float(os.environ.get("SEND_CHAT_RATE", "1")),
+            chat_burst=float(os.environ.get("SEND_CHAT_BURST", "5")),
+            max_retries=int(os.environ.get("SEND_MAX_RETRIES", "3")),
+        ))
+    api_url = os.environ.get("BOT_API_URL")  # напр. локальный фейковый Bot API для тестов
+    if api_url:
+        builder = builder.base_url(f"{api_url.rstrip('/')}/bot").base_file_url(f"{api_url.rstrip('/')}/file/bot")
+    if os.environ.get("WEBHOOK_URL"):
+        # в режиме вебхука апдейты кладёт встроенный HTTP-сервер, Updater не нужен
+        builder = builder.updater(None)
+    app = builder.post_init(post_init).post_shutdown(post_shutdown).build()
+    register_metrics(app)
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(CommandHandler("help", help_cmd))
     app.add_handler(CallbackQueryHandler(back_to_main, pattern="^back_main$"))
     app.add_handler(CallbackQueryHandler(menu_hr, pattern="^menu_hr$"))
     app.add_handler(CallbackQueryHandler(menu_time_by_pace, pattern="^menu_time_by_pace$"))
+    app.add_handler(CallbackQueryHandler(menu_splits, pattern="^menu_splits$"))
     app.add_handler(CallbackQueryHandler(menu_calc, pattern="^menu_calc$"))
     app.add_handler(CallbackQueryHandler(menu_riegel, pattern="^menu_riegel$"))
+    app.add_handler(CallbackQueryHandler(menu_riegel_fit, pattern="^menu_riegel_fit$"))
     app.add_handler(CallbackQueryHandler(menu_tread, pattern="^menu_tread$"))
+    app.add_handler(CallbackQueryHandler(menu_csv, pattern="^menu_csv$"))
+    app.add_handler(InlineQueryHandler(inline.handle))
+    app.add_handler(MessageHandler(
+        filters.Document.FileExtension("csv") | filters.Document.MimeType("text/csv"), csv_document))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_router))
+    app.add_error_handler(on_error)
     return app
 
+def run_supervisor(workers: int, webhook_url: str) -> None:
+    """WORKERS=N: N процессов-ботов за общим приёмником вебхука, шардирование по чату (supervisor.py)."""
+    import secrets
+    from telegram import Bot
+    from supervisor import Supervisor
+    port = int(os.environ.get("PORT", "8080"))
+    base_port = os.environ.get("WORKER_BASE_PORT")
+    sup = Supervisor(workers, webhook_url, os.environ.get("WEBHOOK_SECRET") or secrets.token_urlsafe(32),
+                     listen=os.environ.get("WEBHOOK_LISTEN", "0.0.0.0"), port=port,
+                     base_port=int(base_port) if base_port else None)
+    token = os.environ.get("BOT_TOKEN")
+    if not token:
+        raise RuntimeError("Переменная окружения BOT_TOKEN не задана.")
+    api_url = os.environ.get("BOT_API_URL")
+    bot = Bot(token, base_url=f"{api_url.rstrip('/')}/bot") if api_url else Bot(token)
+    logger.info("Supervisor started: %d workers.", workers)
+    asyncio.run(sup.run(bot))
+
 def main():
+    worker = os.environ.get("WORKER_INDEX")
+    setup_logging(fmt=os.environ.get("LOG_FORMAT", "json"), level=os.environ.get("LOG_LEVEL", "INFO"),
+                  burst=int(os.environ.get("LOG_SAMPLE_BURST", "20")),
+                  interval=float(os.environ.get("LOG_SAMPLE_INTERVAL", "60")),
+                  context=_log_context, static={"worker": int(worker)} if worker else None)
+    webhook_url = os.environ.get("WEBHOOK_URL")
+    workers = int(os.environ.get("WORKERS", "1"))
+    if workers > 1 and "WORKER_INDEX" not in os.environ:
+        if not webhook_url:
+            raise SystemExit("WORKERS > 1 работает только в режиме вебхука: задайте WEBHOOK_URL")
+        run_supervisor(workers, webhook_url)
+        return
     app = build_app()
+    if webhook_url:
+        import secrets
+        from webhook import run_webhook
+        secret = os.environ.get("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+        port = int(os.environ.get("PORT", "8080"))
+        logger.info("Bot started (webhook%s).",
+                    f", worker {os.environ['WORKER_INDEX']}" if "WORKER_INDEX" in os.environ else "")
+        asyncio.run(run_webhook(app, webhook_url, secret,
+                                listen=os.environ.get("WEBHOOK_LISTEN", "0.0.0.0"), port=port,
+                                register="WORKER_INDEX" not in os.environ))
+        return
     logger.info("Bot started.")
     app.run_polling(allowed_updates=None)
 
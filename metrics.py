@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Метрики в текстовом формате Prometheus (только stdlib, без prometheus_client).
+Счётчики и гистограммы дешёвые — одна операция со списком на наблюдение, —
+поэтому включены всегда; HTTP-эндпоинт /metrics поднимается, если задан METRICS_PORT.
+
+Вызывается из event loop, блокировок нет.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from http_server import Request, Response, text_response
+
+# секунды: от 0.5 мс до 10 с
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEPTH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _num(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) and not v.is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values: str):
+        """Дочерняя серия для значений меток; создаётся один раз и дальше берётся из словаря."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name}: ожидались метки {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child) -> List[str]:
+        return [f"{self.name}{_labels_text(self.labelnames, values)} {_num(child.value)}"]
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    """Монотонный счётчик. Без меток — inc() прямо на метрике."""
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Counter):
+    """Текущее значение: set()/inc() или fn — функция, вызываемая при каждом снятии метрик."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], float]] = None, registry: Optional["Registry"] = None) -> None:
+        super().__init__(name, help, labelnames, registry)
+        self.fn = fn
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def render(self) -> List[str]:
+        if self.fn is not None:
+            self.labels().set(self.fn())
+        return super().render()
+
+
+class CallbackCounter(Gauge):
+    """Счётчик, значение которого читается при снятии метрик (например, ReplyCache.hits)."""
+    kind = "counter"
+
+
+class _Buckets:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # последний — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    """Гистограмма с фиксированными границами корзин (le — включительно, как в Prometheus)."""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None) -> None:
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, values, child) -> List[str]:
+        lines = []
+        total = 0
+        for bound, n in zip(self.buckets + (float("inf"),), child.counts):
+            total += n
+            labels = _labels_text(self.labelnames, values, f'le="{_num(bound)}"')
+            lines.append(f"{self.name}_bucket{labels} {total}")
+        labels = _labels_text(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {child.sum!r}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        # повторная регистрация с тем же именем заменяет метрику (build_app можно вызвать снова)
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def make_metrics_handler(registry: Registry = REGISTRY):
+    """HTTP-обработчик для http_server: GET /metrics."""
+    async def handle(req: Request) -> Response:
+        if req.path != "/metrics":
+            return text_response(404)
+        if req.method != "GET":
+            return text_response(405)
+        return 200, registry.render().encode("utf-8"), CONTENT_TYPE
+    return handle
+
+
+# -------------------- МЕТРИКИ БОТА --------------------
+UPDATE_SECONDS = Histogram(
+    "bot_update_seconds", "Время апдейта от слота обработки до конца обработчиков", ["kind"])
+UPDATES_IN_FLIGHT = Histogram(
+    "bot_updates_in_flight", "Апдейтов в обработке (включая ждущих очередь чата) при приходе нового",
+    buckets=DEPTH_BUCKETS)
+REPLY_SECONDS = Histogram(
+    "bot_reply_seconds", "Время от слота обработки апдейта до отправленного ответа на текст", ["mode"])
+STAGE_SECONDS = Histogram(
+    "bot_stage_seconds", "Этапы ответа на текст: parse (лексер, кэш, разбор), compute (расчёт и текст), send",
+    ["mode", "stage"])
+LINES = Counter("bot_lines_total", "Обработано строк ввода", ["mode"])
+ERRORS = Counter("bot_errors_total", "Ошибки: parse — ввод не распознан, expected — ожидаемое исключение "
+                 "(ввод, отказ Telegram), exception — прочие исключения в обработчике", ["mode", "kind"])
+SEND_WAIT_SECONDS = Histogram(
+    "bot_send_wait_seconds", "Ожидание лимита отправки (чат и общий) перед запросом к Bot API", ["priority"])
+SEND_RETRY_AFTER = Counter("bot_send_retry_after_total", "Ответы 429 (RetryAfter) на исходящие запросы")
+INLINE_QUERIES = Counter(
+    "bot_inline_queries_total", "Инлайн-запросы: cached — из кэша, computed — посчитаны, stale — вытеснены более новым",
+    ["outcome"])
+CATCHUP_UPDATES = Counter(
+    "bot_catchup_updates_total", "Догон очереди после перезапуска: kept — обработаны, dropped — свёрнуты как устаревшие",
+    ["outcome"])
+LOG_RECORDS = Counter(
+    "bot_log_records_total", "Неписанные записи лога: sampled — отброшены выборкой, overflow — очередь записи переполнена",
+    ["outcome"])
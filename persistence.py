@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Долговременное хранение режимов пользователей в SQLite (только stdlib), чтобы редеплой
+не сбрасывал сценарии.
+
+  • запись пачками: изменения копятся в памяти и пишутся одной транзакцией
+    раз в flush_interval секунд или сразу, как только накопилось flush_every изменений;
+  • ленивое чтение: при старте ничего не загружается, строка пользователя читается
+    при первом обращении (SessionStore.get_async — в отдельном потоке);
+  • при остановке Application (post_shutdown) оставшиеся изменения дописываются.
+
+В отличие от PicklePersistence файл не переписывается целиком — пишутся только изменённые строки.
+"""
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger("athletics-bot.persistence")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id    INTEGER PRIMARY KEY,
+    mode       INTEGER NOT NULL,
+    updated_at REAL    NOT NULL
+) WITHOUT ROWID
+"""
+
+
+class SqliteSessionBackend:
+    """Хранилище (user_id → код режима) с отложенной пакетной записью.
+
+    Код режима 0 означает удаление строки. Чтения идут через отдельное соединение,
+    запись — в фоновом потоке; в WAL-режиме они друг друга не блокируют.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 5.0, flush_every: int = 500) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_every = flush_every
+        self.flushes = 0
+        self.rows_written = 0
+        self._dirty: Dict[int, Tuple[int, float]] = {}
+        self._inflight: Dict[int, Tuple[int, float]] = {}
+        self._write_lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+        self._writer = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=NORMAL")
+        self._writer.execute(_SCHEMA)
+        # читают из потоков asyncio.to_thread (SessionStore.get_async) — соединение под замком
+        self._reader = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self._read_lock = threading.Lock()
+
+    # -------------------- ЧТЕНИЕ / ОТМЕТКА ИЗМЕНЕНИЙ --------------------
+    def load(self, user_id: int) -> Optional[Tuple[int, float]]:
+        """(код режима, время изменения по time.time()) или None. Учитывает ещё не записанное."""
+        pending = self._dirty.get(user_id) or self._inflight.get(user_id)
+        if pending is not None:
+            return pending if pending[0] else None
+        with self._read_lock:
+            row = self._reader.execute(
+                "SELECT mode, updated_at FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def mark(self, user_id: int, mode_code: int) -> None:
+        """Запоминает изменение; код 0 — удалить сессию."""
+        self._dirty[user_id] = (mode_code, time.time())
+        if len(self._dirty) >= self.flush_every and self._wake is not None:
+            self._wake.set()
+
+    def __len__(self) -> int:
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    # -------------------- ЗАПИСЬ --------------------
+    def _write(self, batch: Dict[int, Tuple[int, float]]) -> None:
+        upserts = [(uid, code, ts) for uid, (code, ts) in batch.items() if code]
+        deletes = [(uid,) for uid, (code, _) in batch.items() if not code]
+        with self._write_lock:
+            self._writer.execute("BEGIN")
+            try:
+                if upserts:
+                    self._writer.executemany(
+                        "INSERT INTO sessions (user_id, mode, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT(user_id) DO UPDATE SET mode = excluded.mode, updated_at = excluded.updated_at",
+                        upserts,
+                    )
+                if deletes:
+                    self._writer.executemany("DELETE FROM sessions WHERE user_id = ?", deletes)
+                self._writer.execute("COMMIT")
+            except BaseException:
+                self._writer.execute("ROLLBACK")
+                raise
+        self.flushes += 1
+        self.rows_written += len(batch)
+
+    def flush(self) -> int:
+        """Синхронно записывает накопленные изменения. Возвращает число строк."""
+        batch, self._dirty = self._dirty, {}
+        if batch:
+            self._write(batch)
+        return len(batch)
+
+    async def flush_async(self) -> int:
+        """То же, но запись — в отдельном потоке, не блокируя event loop."""
+        batch, self._dirty = self._dirty, {}
+        if not batch:
+            return 0
+        self._inflight = batch
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception:
+            # вернём несохранённое обратно, более свежие изменения важнее
+            for uid, val in batch.items():
+                self._dirty.setdefault(uid, val)
+            raise
+        finally:
+            self._inflight = {}
+        return len(batch)
+
+    def purge_older_than(self, max_age: float) -> int:
+        """Удаляет строки, не менявшиеся дольше max_age секунд."""
+        with self._write_lock:
+            cur = self._writer.execute("DELETE FROM sessions WHERE updated_at < ?", (time.time() - max_age,))
+        return cur.rowcount
+
+    # -------------------- ЖИЗНЕННЫЙ ЦИКЛ --------------------
+    async def _flush_loop(self, purge_age: Optional[float]) -> None:
+        if purge_age is not None:
+            try:
+                purged = await asyncio.to_thread(self.purge_older_than, purge_age)
+                logger.info("Удалено устаревших сессий: %d", purged)
+            except Exception:
+                logger.exception("Не удалось удалить устаревшие сессии")
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush_async()
+            except Exception:
+                logger.exception("Не удалось записать сессии")
+
+    async def start(self, purge_age: Optional[float] = None) -> None:
+        """Запускает фоновую запись; purge_age — заодно удалить в фоне строки старше стольких секунд."""
+        self._stopping = False
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop(purge_age))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            # не отменяем задачу: текущая запись должна закончиться раньше финальной
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        self._wake = None
+        written = self.flush()
+        logger.info("Сессии сохранены при остановке: %d изменений", written)
+
+    def close(self) -> None:
+        self.flush()
+        self._reader.close()
+        self._writer.close()
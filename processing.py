@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Конкурентная обработка апдейтов с сохранением порядка внутри одного чата.
+Апдейты разных чатов обрабатываются параллельно (не более max_concurrent_updates),
+апдейты одного чата — строго по очереди, поэтому «⬅ Назад» и следующий текст
+не гоняются за context.user_data["mode"].
+
+Заодно снимаются метрики: время апдейта, число апдейтов в обработке, а время начала
+обработки апдейта и его чат доступны обработчикам (и логу) через update_started() и update_chat().
+"""
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Awaitable, Deque, Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from metrics import UPDATE_SECONDS, UPDATES_IN_FLIGHT
+
+logger = logging.getLogger("athletics-bot.processing")
+
+_started: ContextVar[Optional[float]] = ContextVar("update_started", default=None)
+_chat: ContextVar[Optional[int]] = ContextVar("update_chat", default=None)
+
+
+def update_chat_id(update: object) -> Optional[int]:
+    if isinstance(update, Update) and update.effective_chat is not None:
+        return update.effective_chat.id
+    return None
+
+def update_kind(update: object) -> str:
+    if isinstance(update, Update):
+        if update.message is not None:
+            return "message"
+        if update.callback_query is not None:
+            return "callback_query"
+        if update.inline_query is not None:
+            return "inline_query"
+    return "other"
+
+def update_started() -> Optional[float]:
+    """time.perf_counter() момента, когда текущий апдейт получил слот обработки (внутри обработчика)."""
+    return _started.get()
+
+def update_chat() -> Optional[int]:
+    """id чата текущего апдейта (внутри обработчика)."""
+    return _chat.get()
+
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Параллельно между чатами, последовательно внутри чата.
+
+    Слот семафора (max_concurrent_updates) держит только апдейт, который выполняется:
+    первый апдейт чата становится его обработчиком и после себя выполняет очередь чата,
+    а апдейты, пришедшие, пока чат занят, встают в эту очередь и сразу отдают свой слот.
+    Так один чат с длинной очередью занимает один слот, а не все, и не задерживает другие чаты.
+    PTB вызывает do_process_update в порядке поступления апдейтов — порядок в чате сохраняется.
+    """
+
+    __slots__ = ("_chat_queues", "in_flight")
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        # чат -> апдейты, ждущие его обработчика: (апдейт, корутина, время прихода)
+        self._chat_queues: Dict[int, Deque[Tuple[object, Awaitable[Any], float]]] = {}
+        self.in_flight = 0
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        # process_update (@final в PTB) уже взял слот семафора — отсюда и начинается отсчёт
+        started = time.perf_counter()
+        self.in_flight += 1
+        UPDATES_IN_FLIGHT.observe(self.in_flight)
+        chat_id = update_chat_id(update)
+        if chat_id is None:
+            await self._run(update, coroutine, started)
+            return
+        waiting = self._chat_queues.get(chat_id)
+        if waiting is not None:
+            waiting.append((update, coroutine, started))
+            return
+        # очередь существует, пока работает обработчик чата — пустой чат ничего не хранит
+        waiting = self._chat_queues[chat_id] = deque()
+        try:
+            await self._run(update, coroutine, started)
+            while waiting:
+                await self._run(*waiting.popleft())
+        finally:
+            del self._chat_queues[chat_id]
+            for _, rest, _ in waiting:    # отмена при остановке: корутины уже не выполнятся
+                rest.close()
+                self.in_flight -= 1
+
+    async def _run(self, update: object, coroutine: Awaitable[Any], started: float) -> None:
+        _started.set(started)
+        _chat.set(update_chat_id(update))
+        try:
+            await coroutine
+        except Exception:
+            # Application.process_update сам передаёт ошибки обработчиков в error handler;
+            # сюда доходит только то, что он пропустил, — очередь чата не должна из-за этого встать
+            logger.exception("Ошибка обработки апдейта")
+        finally:
+            self.in_flight -= 1
+            UPDATE_SECONDS.labels(update_kind(update)).observe(time.perf_counter() - started)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Исходящие запросы к Bot API: лимиты отправки, приоритеты и повтор после 429.
+
+SendLimiter подключается к Application как rate_limiter, поэтому обработчики по-прежнему
+вызывают reply_text/edit_text напрямую — все запросы проходят через process_request():
+- общий лимит бота (по умолчанию 30 запросов/с) — токен-бакет; ждущие запросы будят
+  по приоритету: INTERACTIVE (ответ на действие пользователя) раньше BULK (длинные выгрузки);
+- лимит чата: личный чат — 1 сообщение/с со всплеском до 5, группа — 20 в минуту;
+- на RetryAfter (429) отправка ставится на паузу на retry_after секунд и запрос повторяется
+  (не больше max_retries раз).
+
+Приоритет передаётся в методы бота: reply_text(..., rate_limit_args=BULK).
+make_request() — HTTP-клиент с настраиваемым пулом соединений, keep-alive и таймаутами.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+import httpx
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from telegram.request import HTTPXRequest
+
+from metrics import SEND_RETRY_AFTER, SEND_WAIT_SECONDS
+
+logger = logging.getLogger("athletics-bot.send")
+
+INTERACTIVE = 0
+BULK = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# служебные методы и ответы на нажатия/инлайн-запросы (это не сообщения в чат) лимит не расходуют
+UNLIMITED = frozenset({"getUpdates", "getMe", "setWebhook", "deleteWebhook", "getWebhookInfo",
+                       "close", "logOut", "setMyCommands", "answerCallbackQuery", "answerInlineQuery"})
+
+Result = Union[bool, Dict[str, Any], List[Dict[str, Any]]]
+
+
+class _Bucket:
+    """Токен-бакет: rate токенов в секунду, не больше capacity."""
+    __slots__ = ("rate", "capacity", "tokens", "stamp")
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.stamp = now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def reserve(self, now: float) -> float:
+        """Забирает токен (можно в долг); возвращает, сколько секунд ждать до своей очереди."""
+        self.refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def idle(self, now: float) -> bool:
+        return self.tokens + (now - self.stamp) * self.rate >= self.capacity
+
+
+class SendLimiter(BaseRateLimiter[int]):
+    """Общий и початовый лимиты отправки, приоритеты, пауза по retry_after."""
+
+    def __init__(self, rate: float = 30.0, burst: Optional[float] = None,
+                 chat_rate: float = 1.0, chat_burst: float = 5.0,
+                 group_rate: float = 20 / 60, group_burst: float = 5.0,
+                 max_retries: int = 3) -> None:
+        now = time.monotonic()
+        self._global = _Bucket(rate, burst if burst is not None else rate, now)
+        self.chat_rate, self.chat_burst = chat_rate, chat_burst
+        self.group_rate, self.group_burst = group_rate, group_burst
+        self.max_retries = max_retries
+        self._chats: Dict[Union[int, str], _Bucket] = {}
+        self._prune_at = 1024
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self.retries = 0
+
+    @property
+    def waiting(self) -> int:
+        """Запросов, ждущих общего лимита."""
+        return len(self._waiters)
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, fut in self._waiters:
+            fut.cancel()
+        self._waiters.clear()
+
+    # -------------------- ЛИМИТ ЧАТА --------------------
+    def _chat_delay(self, chat_id: Union[int, str], now: float) -> float:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= self._prune_at:
+                self._prune(now)
+            group = isinstance(chat_id, str) or chat_id < 0  # @username бывает только у групп и каналов
+            bucket = self._chats[chat_id] = (
+                _Bucket(self.group_rate, self.group_burst, now) if group
+                else _Bucket(self.chat_rate, self.chat_burst, now))
+        return bucket.reserve(now)
+
+    def _prune(self, now: float) -> None:
+        # восполнившийся бакет ничем не отличается от нового — такие можно забыть
+        for chat_id in [c for c, b in self._chats.items() if b.idle(now)]:
+            del self._chats[chat_id]
+        self._prune_at = max(1024, 2 * len(self._chats))
+
+    # -------------------- ОБЩИЙ ЛИМИТ --------------------
+    async def _acquire(self, priority: int) -> None:
+        now = time.monotonic()
+        if not self._waiters and now >= self._paused_until:
+            self._global.refill(now)
+            if self._global.tokens >= 1:
+                self._global.tokens -= 1
+                return
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await fut
+
+    async def _dispatch(self) -> None:
+        """Выдаёт токены ждущим по приоритету, затем по порядку прихода."""
+        bucket = self._global
+        while self._waiters:
+            now = time.monotonic()
+            if now < self._paused_until:
+                await asyncio.sleep(self._paused_until - now)
+                continue
+            bucket.refill(now)
+            if bucket.tokens < 1:
+                await asyncio.sleep((1 - bucket.tokens) / bucket.rate)
+                continue
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():  # запрос могли отменить, пока он ждал
+                bucket.tokens -= 1
+                fut.set_result(None)
+
+    # -------------------- ЗАПРОС --------------------
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Result]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Result:
+        if endpoint in UNLIMITED:
+            return await callback(*args, **kwargs)
+        priority = INTERACTIVE if rate_limit_args is None else rate_limit_args
+        started = time.monotonic()
+        chat_id = data.get("chat_id")
+        if chat_id is not None:
+            delay = self._chat_delay(chat_id, started)
+            if delay:
+                await asyncio.sleep(delay)
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            if not attempt:
+                SEND_WAIT_SECONDS.labels(PRIORITY_NAMES.get(priority, str(priority))).observe(
+                    time.monotonic() - started)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                attempt += 1
+                self.retries += 1
+                SEND_RETRY_AFTER.inc()
+                delay = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else e.retry_after
+                # 429 относится ко всему боту: паузу соблюдают и остальные запросы
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                if attempt > self.max_retries:
+                    raise
+                logger.warning("%s: 429, повтор через %s с (попытка %d)", endpoint, delay, attempt)
+                await asyncio.sleep(delay)
+
+
+@lru_cache(maxsize=1)
+def ssl_context():
+    """Один SSL-контекст на процесс: загрузка корневых сертификатов стоит ~40 мс на каждый клиент."""
+    return httpx.create_ssl_context()
+
+def make_request(pool_size: int = 16, keepalive: float = 30.0, connect_timeout: float = 5.0,
+                 read_timeout: float = 5.0, write_timeout: float = 5.0, pool_timeout: float = 1.0) -> HTTPXRequest:
+    """HTTP-клиент Bot API: пул до pool_size соединений, простаивающие живут keepalive секунд.
+
+    Большой пул вреден: httpcore на каждый запрос перебирает все соединения пула
+    (с проверкой сокета), и при 256 соединениях это съедает бо́льшую часть CPU бота.
+    """
+    limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size,
+                          keepalive_expiry=keepalive)
+    return HTTPXRequest(connection_pool_size=pool_size, connect_timeout=connect_timeout,
+                        read_timeout=read_timeout, write_timeout=write_timeout, pool_timeout=pool_timeout,
+                        httpx_kwargs={"limits": limits, "verify": ssl_context()})
@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+"""
+Компактное хранилище сессий: текущий режим каждого пользователя.
+Вместо словаря context.user_data на пользователя — открытая хеш-таблица на массивах
+(array): id пользователя (8 байт), код режима (1 байт), время последней активности (4 байта).
+Записи вытесняются по простою (TTL) и по жёсткому лимиту числа записей.
+
+С backend (persistence.SqliteSessionBackend) изменения режима уходят в долговременное
+хранилище, а отсутствующие в памяти сессии подгружаются из него при первом обращении
+(get_async — чтение в потоке, не в event loop). «Режима нет» тоже запоминается (код 0),
+поэтому пользователь без сохранённого режима не читает диск на каждом сообщении.
+"""
+import asyncio
+import random
+import time
+from array import array
+from typing import Callable, Dict, Optional, Tuple
+
+# код режима = индекс в кортеже; 0 — «нет режима». Коды хранятся в SESSION_DB — новые режимы только в конец
+MODES = ("", "hr", "time_by_pace", "calc", "riegel", "tread", "splits", "riegel_fit")
+MODE_CODES: Dict[str, int] = {m: i for i, m in enumerate(MODES)}
+
+_EMPTY = 0                      # id 0 в Telegram не встречается — метка свободного слота
+_MIX = 0x9E3779B97F4A7C15       # множитель Фибоначчи: разбрасывает подряд идущие id
+_MASK64 = (1 << 64) - 1
+_MIN_BITS = 10
+_SWEEP_PER_WRITE = 64           # слотов, проверяемых на TTL при каждой записи
+_EVICT_SAMPLES = 16             # при переполнении вытесняем самую старую из N случайных записей
+
+
+class SessionStore:
+    """Режим пользователя с вытеснением по простою и по лимиту записей.
+
+    get/set/clear — O(1) в среднем (линейное пробирование). Вытеснение по лимиту
+    приближённое (как в Redis): из нескольких случайных записей удаляется самая давняя.
+    """
+
+    def __init__(self, max_entries: int = 1_000_000, ttl: float = 30 * 24 * 3600,
+                 clock: Callable[[], float] = time.monotonic, backend=None) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries должен быть > 0")
+        self.max_entries = max_entries
+        self.ttl = int(ttl)
+        self._clock = clock
+        self._epoch = clock()
+        self.backend = backend
+        self._count = 0
+        self._sweep_pos = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._alloc(_MIN_BITS)
+
+    # -------------------- ПУБЛИЧНЫЙ API --------------------
+    def get(self, user_id: int) -> Optional[str]:
+        """Режим пользователя или None (нет сессии или она истекла). Продлевает сессию.
+        Отсутствующая в памяти сессия читается из backend синхронно — в event loop используйте get_async."""
+        i = self._find(user_id)
+        if i < 0:
+            return self._loaded(user_id, self.backend.load(user_id)) if self.backend is not None else None
+        return self._touch(i, user_id)
+
+    async def get_async(self, user_id: int) -> Optional[str]:
+        """get(), но строка backend читается в отдельном потоке."""
+        if self.backend is None or self._find(user_id) >= 0:
+            return self.get(user_id)
+        row = await asyncio.to_thread(self.backend.load, user_id)
+        i = self._find(user_id)
+        if i >= 0:   # пока читали, режим успели задать — он свежее прочитанного
+            return self._touch(i, user_id)
+        return self._loaded(user_id, row)
+
+    def set(self, user_id: int, mode: Optional[str]) -> None:
+        code = MODE_CODES[mode or ""]
+        if code == 0:
+            self.clear(user_id)
+            return
+        self._put(user_id, code, self._now())
+        if self.backend is not None:
+            self.backend.mark(user_id, code)
+        self.sweep(_SWEEP_PER_WRITE)
+
+    def clear(self, user_id: int) -> None:
+        if self.backend is not None:
+            # запоминаем «режима нет», чтобы следующее сообщение не читало backend
+            self._put(user_id, 0, self._now())
+            self.backend.mark(user_id, 0)
+            return
+        i = self._find(user_id)
+        if i >= 0:
+            self._delete_slot(i)
+
+    def sweep(self, budget: Optional[int] = None) -> int:
+        """Удаляет истёкшие сессии, проверяя не больше budget слотов (None — всю таблицу).
+        Возвращает число удалённых."""
+        size = len(self._keys)
+        budget = size if budget is None else min(budget, size)
+        now, ttl = self._now(), self.ttl
+        keys, seen, backend = self._keys, self._seen, self.backend
+        removed = 0
+        pos = self._sweep_pos % size
+        while budget > 0:
+            if keys[pos] != _EMPTY and now - seen[pos] > ttl:
+                if backend is not None and self._modes[pos]:
+                    backend.mark(keys[pos], 0)
+                # после сдвига назад в pos может оказаться другая запись — проверим её снова
+                self._delete_slot(pos)
+                removed += 1
+                continue
+            pos = (pos + 1) & self._mask
+            budget -= 1
+        self._sweep_pos = pos
+        self.expirations += removed
+        return removed
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, user_id: int) -> bool:
+        return self._find(user_id) >= 0
+
+    def nbytes(self) -> int:
+        """Память под данные таблицы (байты массивов)."""
+        return sum(a.itemsize * len(a) for a in (self._keys, self._modes, self._seen))
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": self._count, "capacity": len(self._keys), "bytes": self.nbytes(),
+                "evictions": self.evictions, "expirations": self.expirations}
+
+    # -------------------- ВНУТРЕННЕЕ --------------------
+    def _now(self) -> int:
+        return int(self._clock() - self._epoch)
+
+    def _put(self, user_id: int, code: int, seen: int) -> None:
+        i = self._find(user_id)
+        if i < 0:
+            if self._count >= self.max_entries:
+                self._evict_one()
+            if (self._count + 1) * 2 > len(self._keys):
+                self._alloc(self._bits + 1)
+            i = self._probe_free(user_id)
+            self._keys[i] = user_id
+            self._count += 1
+        self._modes[i] = code
+        self._seen[i] = seen
+
+    def _touch(self, i: int, user_id: int) -> Optional[str]:
+        now = self._now()
+        if now - self._seen[i] > self.ttl:
+            code = self._modes[i]
+            self._delete_slot(i)
+            self.expirations += 1
+            if self.backend is not None and code:
+                self.backend.mark(user_id, 0)
+            return None
+        self._seen[i] = now
+        return MODES[self._modes[i]] or None
+
+    def _loaded(self, user_id: int, row: Optional[Tuple[int, float]]) -> Optional[str]:
+        """Запоминает строку из backend (None — режима нет); сессия с истёкшим TTL удаляется и там."""
+        if row is None:
+            self._put(user_id, 0, self._now())
+            return None
+        code, updated_at = row
+        age = max(0.0, time.time() - updated_at)
+        if age > self.ttl or not 0 < code < len(MODES):
+            self.backend.mark(user_id, 0)
+            self._put(user_id, 0, self._now())
+            return None
+        # вытеснение по лимиту в памяти не трогает backend — запись подгрузится снова
+        self._put(user_id, code, max(0, self._now() - int(age)))
+        return MODES[code]
+
+    def _home(self, user_id: int) -> int:
+        return ((user_id * _MIX) & _MASK64) >> self._shift
+
+    def _alloc(self, bits: int) -> None:
+        old = (self._keys, self._modes, self._seen) if self._count else None
+        size = 1 << bits
+        self._bits, self._mask, self._shift = bits, size - 1, 64 - bits
+        self._keys = array("q", bytes(8 * size))
+        self._modes = array("B", bytes(size))
+        self._seen = array("I", bytes(4 * size))
+        self._sweep_pos = 0
+        if old:
+            for k, m, s in zip(*old):
+                if k != _EMPTY:
+                    i = self._probe_free(k)
+                    self._keys[i], self._modes[i], self._seen[i] = k, m, s
+
+    def _find(self, user_id: int) -> int:
+        keys, mask = self._keys, self._mask
+        i = self._home(user_id)
+        while True:
+            k = keys[i]
+            if k == user_id:
+                return i
+            if k == _EMPTY:
+                return -1
+            i = (i + 1) & mask
+
+    def _probe_free(self, user_id: int) -> int:
+        keys, mask = self._keys, self._mask
+        i = self._home(user_id)
+        while keys[i] != _EMPTY:
+            i = (i + 1) & mask
+        return i
+
+    def _delete_slot(self, i: int) -> None:
+        """Удаление со сдвигом назад — без «надгробий», цепочки пробирования остаются целыми."""
+        keys, modes, seen, mask = self._keys, self._modes, self._seen, self._mask
+        j = i
+        while True:
+            j = (j + 1) & mask
+            k = keys[j]
+            if k == _EMPTY:
+                break
+            home = self._home(k)
+            # запись j можно перенести в дыру i, если её «домашний» слот не лежит в (i, j]
+            if (i <= j and (home <= i or home > j)) or (i > j and home <= i and home > j):
+                keys[i], modes[i], seen[i] = k, modes[j], seen[j]
+                i = j
+        keys[i], modes[i], seen[i] = _EMPTY, 0, 0
+        self._count -= 1
+
+    def _evict_one(self) -> None:
+        keys, seen, size = self._keys, self._seen, len(self._keys)
+        victim, oldest = -1, None
+        for _ in range(_EVICT_SAMPLES):
+            i = random.randrange(size)
+            while keys[i] == _EMPTY:
+                i = (i + 1) & self._mask
+            if oldest is None or seen[i] < oldest:
+                victim, oldest = i, seen[i]
+        self._delete_slot(victim)
+        self.evictions += 1
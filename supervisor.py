@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+Несколько процессов-воркеров за общим приёмником вебхука (WORKERS=N вместе с WEBHOOK_URL).
+
+Супервизор:
+- запускает N копий `python main.py` (WORKER_INDEX=i), каждая — обычный бот в режиме вебхука
+  на 127.0.0.1:WORKER_BASE_PORT+i, но без setWebhook;
+- сам принимает вебхук Telegram и пересылает тело апдейта воркеру shard_of(chat_id) —
+  апдейты одного чата всегда попадают в один процесс, поэтому порядок внутри чата и
+  сессии в памяти остаются локальными;
+- перезапускает упавшие воркеры (пауза растёт от 1 до 30 с, если воркер падает сразу после старта);
+  пока воркер недоступен, Telegram получает 503 и повторит доставку сам.
+
+Глобальный лимит отправки (SEND_RATE) делится между воркерами поровну. Сессии и кэш ответов
+можно оставить в памяти воркера (чат не переезжает), но для переживания перезапусков нужен
+SESSION_DB — один файл SQLite (WAL) на всех.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from telegram import Bot
+
+from http_server import Request, Response, start_http_server, text_response
+from webhook import SECRET_HEADER
+
+logger = logging.getLogger("athletics-bot.supervisor")
+
+MAIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+RESTART_MIN_DELAY = 1.0
+RESTART_MAX_DELAY = 30.0
+STABLE_AFTER = 60.0     # воркер, проживший столько секунд, снова перезапускается без паузы
+
+
+def update_shard_key(update: dict) -> int:
+    """Чат апдейта; для апдейтов без чата (инлайн-запросы) — пользователь, иначе update_id."""
+    for kind in ("message", "edited_message", "channel_post", "edited_channel_post"):
+        if kind in update:
+            return update[kind]["chat"]["id"]
+    cq = update.get("callback_query")
+    if cq is not None and "message" in cq:
+        return cq["message"]["chat"]["id"]
+    for value in update.values():
+        if isinstance(value, dict) and isinstance(value.get("from"), dict):
+            return value["from"]["id"]
+    return update.get("update_id", 0)
+
+def shard_of(update: dict, n: int) -> int:
+    """Номер воркера для апдейта; целые id в Python не хэшируются случайно, остаток стабилен между запусками."""
+    return update_shard_key(update) % n
+
+
+class Worker:
+    def __init__(self, index: int, port: int, env: Dict[str, str]) -> None:
+        self.index = index
+        self.port = port
+        self.env = env
+        self.proc: Optional[asyncio.subprocess.Process] = None
+        self.restarts = 0
+
+    async def run(self, stopping: asyncio.Event) -> None:
+        """Держит процесс воркера запущенным, пока не остановлен супервизор."""
+        delay = RESTART_MIN_DELAY
+        while not stopping.is_set():
+            started = time.monotonic()
+            self.proc = await asyncio.create_subprocess_exec(sys.executable, MAIN, env=self.env)
+            code = await self.proc.wait()
+            if stopping.is_set():
+                return
+            self.restarts += 1
+            delay = RESTART_MIN_DELAY if time.monotonic() - started > STABLE_AFTER else min(delay * 2, RESTART_MAX_DELAY)
+            logger.warning("Воркер %d завершился с кодом %s, перезапуск через %.0f с", self.index, code, delay)
+            try:
+                await asyncio.wait_for(stopping.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.returncode is None
+
+    def stop(self) -> None:
+        if self.alive():
+            self.proc.send_signal(signal.SIGTERM)
+
+
+class Supervisor:
+    def __init__(self, workers: int, url: str, secret: str, listen: str = "0.0.0.0", port: int = 8080,
+                 base_port: Optional[int] = None, env: Optional[Dict[str, str]] = None) -> None:
+        self.url = url
+        self.path = urlsplit(url).path or "/"
+        self.secret = secret
+        self.listen, self.port = listen, port
+        base_port = base_port or port + 1
+        env = dict(os.environ if env is None else env)
+        metrics_port = env.get("METRICS_PORT")
+        # лимит Bot API общий на бота — делим глобальную скорость отправки между воркерами;
+        # лимит на чат остаётся прежним: чат живёт ровно в одном воркере
+        send_rate = float(env.get("SEND_RATE", "30"))
+        if send_rate > 0:
+            env["SEND_RATE"] = str(send_rate / workers)
+        self.workers: List[Worker] = []
+        for i in range(workers):
+            wenv = dict(env, WORKER_INDEX=str(i), WEBHOOK_SECRET=secret, WEBHOOK_LISTEN="127.0.0.1",
+                        PORT=str(base_port + i))
+            wenv.pop("WORKERS", None)
+            if metrics_port:
+                wenv["METRICS_PORT"] = str(int(metrics_port) + i)
+            self.workers.append(Worker(i, base_port + i, wenv))
+        self._secret = secret.encode("utf-8")
+        self._client: Optional[httpx.AsyncClient] = None
+
+    # -------------------- ПРИЁМ И ПЕРЕСЫЛКА --------------------
+    async def _handle(self, req: Request) -> Response:
+        if req.path == "/healthz":
+            alive = sum(w.alive() for w in self.workers)
+            return text_response(200 if alive == len(self.workers) else 503, f"{alive}/{len(self.workers)}")
+        if req.path != self.path:
+            return text_response(404)
+        if req.method != "POST":
+            return text_response(405)
+        if not hmac.compare_digest(req.headers.get(SECRET_HEADER, "").encode("utf-8"), self._secret):
+            return text_response(403)
+        try:
+            worker = self.workers[shard_of(json.loads(req.body), len(self.workers))]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            logger.warning("Некорректное тело апдейта (%d байт)", len(req.body))
+            return text_response(400)
+        try:
+            resp = await self._client.post(
+                f"http://127.0.0.1:{worker.port}{self.path}", content=req.body,
+                headers={"Content-Type": "application/json", SECRET_HEADER: self.secret})
+        except httpx.HTTPError:
+            # воркер перезапускается — Telegram повторит доставку
+            return text_response(503)
+        return text_response(resp.status_code)
+
+    # -------------------- ЖИЗНЕННЫЙ ЦИКЛ --------------------
+    async def _wait_ready(self, timeout: float = 60.0) -> None:
+        deadline = time.monotonic() + timeout
+        pending = list(self.workers)
+        while pending and time.monotonic() < deadline:
+            for w in list(pending):
+                try:
+                    if (await self._client.get(f"http://127.0.0.1:{w.port}/healthz")).status_code == 200:
+                        pending.remove(w)
+                except httpx.HTTPError:
+                    pass
+            if pending:
+                await asyncio.sleep(0.2)
+        if pending:
+            raise RuntimeError(f"воркеры не запустились: {[w.index for w in pending]}")
+
+    async def run(self, bot: Bot, allowed_updates: Optional[list] = None,
+                  stop_event: Optional[asyncio.Event] = None) -> None:
+        """Работает до SIGINT/SIGTERM или stop_event; вебхук регистрируется, когда все воркеры готовы."""
+        stop_event = stop_event or asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        n = len(self.workers)
+        self._client = httpx.AsyncClient(timeout=10.0, limits=httpx.Limits(max_connections=64 * n,
+                                                                           max_keepalive_connections=16 * n))
+        tasks = [asyncio.create_task(w.run(stop_event)) for w in self.workers]
+        server = None
+        try:
+            await self._wait_ready()
+            server = await start_http_server(self._handle, self.listen, self.port)
+            async with bot:
+                await bot.set_webhook(url=self.url, secret_token=self.secret, allowed_updates=allowed_updates)
+            logger.info("Супервизор: %d воркеров, вебхук %s:%d%s", n, self.listen, self.port, self.path)
+            await stop_event.wait()
+        finally:
+            stop_event.set()
+            if server is not None:
+                server.close()
+                await server.wait_closed()
+            for w in self.workers:
+                w.stop()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            await self._client.aclose()
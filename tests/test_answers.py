@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from answers import answer_lines
+from calc.lexer import tokenize
+
+BIG = "9" * 400
+OVERFLOW = "Ошибка: числа вне допустимого диапазона."
+
+
+def _answers(mode: str, *lines: str):
+    return answer_lines(mode, [tokenize(line) for line in lines])
+
+
+def test_overflowing_line_does_not_drop_the_others():
+    cases = {
+        "time_by_pace": (f"10км, {BIG}:00", "5км, 4:00"),
+        "calc": (f"dist=10км, time={BIG}:00", "dist=5км, pace=4:00"),
+        "riegel": (f"10км, {BIG}:00 -> 21.1км", "10км, 41:30 -> 21.1км"),
+        "splits": (f"{BIG}:00", "4:00"),
+        "tread": (f"pace={BIG}:00", "pace=4:00"),
+    }
+    for mode, (bad, good) in cases.items():
+        replies = _answers(mode, good, bad, good)
+        assert replies == [_answers(mode, good)[0], OVERFLOW, _answers(mode, good)[0]], mode
+        assert not replies[0].startswith("Ошибка"), (mode, replies[0])
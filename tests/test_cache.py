@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+import cache as cache_module
+from answers import ANSWERS, answer_lines
+from cache import LRUReplyCache, SqliteReplyCache, cache_key, reply_code_version
+from calc.lexer import tokenize
+
+
+def _filled(path, version="v1", **kwargs) -> None:
+    cache = SqliteReplyCache(str(path), version=version, **kwargs)
+    cache.put("k1", "ответ 1")
+    cache.put("k2", "ответ 2")
+    cache.close()
+
+
+def _prefetched(cache: SqliteReplyCache, keys):
+    asyncio.run(cache.prefetch(keys))
+    return [cache.get(k) for k in keys]
+
+
+def test_shared_entries_come_through_prefetch(tmp_path):
+    db = tmp_path / "cache.db"
+    _filled(db)
+    cache = SqliteReplyCache(str(db), version="v1")
+    # get() не читает файл — только память, заполненная prefetch()
+    assert cache.get("k1") is None
+    assert _prefetched(cache, ["k1", "k2", "k3"]) == ["ответ 1", "ответ 2", None]
+    cache.close()
+
+
+def test_prefetch_reads_outside_event_loop_thread(tmp_path):
+    db = tmp_path / "cache.db"
+    _filled(db)
+    cache = SqliteReplyCache(str(db), version="v1")
+    threads = []
+    read = cache._read
+    cache._read = lambda keys: threads.append(threading.current_thread()) or read(keys)
+    assert _prefetched(cache, ["k1"]) == ["ответ 1"]
+    assert threads and threads[0] is not threading.main_thread()
+    cache.close()
+
+
+def test_other_code_version_is_not_served(tmp_path):
+    db = tmp_path / "cache.db"
+    _filled(db, version="old")
+    cache = SqliteReplyCache(str(db), version="new")
+    assert _prefetched(cache, ["k1", "k2"]) == [None, None]
+    cache.close()
+
+
+def test_key_format_is_part_of_the_version(tmp_path, monkeypatch):
+    db = tmp_path / "cache.db"
+    old = reply_code_version()
+    _filled(db, version=old)
+    monkeypatch.setattr(cache_module, "KEY_FORMAT", cache_module.KEY_FORMAT + 1)
+    cache = SqliteReplyCache(str(db))
+    assert cache.version != old
+    assert _prefetched(cache, ["k1", "k2"]) == [None, None]
+    cache.close()
+
+
+def test_expired_entries_are_not_served(tmp_path):
+    db = tmp_path / "cache.db"
+    _filled(db)
+    cache = SqliteReplyCache(str(db), version="v1", max_age=-1)
+    assert _prefetched(cache, ["k1"]) == [None]
+    cache.close()
+
+
+def test_key_ignores_spelling():
+    assert cache_key("calc", tokenize("10km, 4:00")) == cache_key("calc", tokenize("10 км, 4:00"))
+
+
+def test_same_key_same_reply():
+    pairs = [("hr", "196, 72-83 x", "196, 72–83 x"), ("hr", "3:30-5:00/km: 196", "3:30-5:00: 196"),
+             ("hr", "196, 70-x", "196, 70 -x")]
+    for mode, a, b in pairs:
+        ta, tb = tokenize(a), tokenize(b)
+        assert cache_key(mode, ta) == cache_key(mode, tb), (a, b)
+        assert answer_lines(mode, [ta]) == answer_lines(mode, [tb]), (a, b)
+
+
+def test_replies_do_not_read_token_text():
+    # ответ строится только из полей ключа: без исходного текста токенов он тот же
+    lines = ["196, 72-83 x", "Иванов: 196, покой=55", "Спортсмен 3: 180", "3:30-5:00/km: 196", "пано=172",
+             "10km, 4:10/km", "dist=10км, pace=3:45", "3:30-5:00, step=10", "400m", "10км, 41:30 -> 21.1km",
+             "5km 19:00, 10km 40:00 -> 15km, 1mi", "speed=12.5kmh", "pace=7:30/mi", "abc, 70"]
+    for mode in ANSWERS:
+        for line in lines:
+            tokens = tokenize(line)
+            blank = [t._replace(text="") for t in tokens]
+            assert answer_lines(mode, [tokens]) == answer_lines(mode, [blank]), (mode, line)
+
+
+def test_lru_limits():
+    cache = LRUReplyCache(max_entries=2)
+    for k in ("a", "b", "c"):
+        cache.put(k, k)
+    assert cache.get("a") is None and cache.get("c") == "c"
+    assert cache.evictions == 1
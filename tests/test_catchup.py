@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from catchup import Backlog
+
+CHAT = 10
+
+
+class Updates:
+    """Сырые апдейты Bot API с возрастающим update_id."""
+
+    def __init__(self) -> None:
+        self.next_id = 0
+
+    def _new(self, **body) -> dict:
+        self.next_id += 1
+        return dict(update_id=self.next_id, **body)
+
+    def text(self, text: str, user: int = CHAT, chat: int = CHAT) -> dict:
+        return self._new(message={"message_id": self.next_id, "text": text,
+                                  "chat": {"id": chat}, "from": {"id": user}})
+
+    def tap(self, data: str, user: int = CHAT) -> dict:
+        return self._new(callback_query={"id": str(self.next_id), "data": data, "from": {"id": user},
+                                         "message": {"message_id": 1, "chat": {"id": user}}})
+
+    def document(self, user: int = CHAT) -> dict:
+        return self._new(message={"message_id": self.next_id, "document": {"file_id": "f"},
+                                  "chat": {"id": user}, "from": {"id": user}})
+
+    def inline(self, query: str, user: int = CHAT) -> dict:
+        return self._new(inline_query={"id": str(self.next_id), "query": query, "from": {"id": user}})
+
+
+def _collapse(*updates: dict) -> list:
+    backlog = Backlog()
+    for u in updates:
+        backlog.add(u)
+    assert backlog.fetched == len(updates)
+    return backlog.collapse()
+
+
+def test_last_text_per_mode_is_kept():
+    u = Updates()
+    tap_hr, a, b = u.tap("menu_hr"), u.text("196, 70"), u.text("196, 80")
+    tap_calc, c = u.tap("menu_calc"), u.text("dist=10км, pace=4:00")
+    tap_hr2, d = u.tap("menu_hr"), u.text("190, 70")
+    assert _collapse(tap_hr, a, b, tap_calc, c, tap_hr2, d) == [tap_calc, c, tap_hr2, d]
+
+
+def test_consecutive_taps_keep_the_last():
+    u = Updates()
+    taps = [u.tap("menu_hr"), u.tap("back_main"), u.tap("menu_tread")]
+    text = u.text("speed=12")
+    assert _collapse(*taps, text) == [taps[-1], text]
+
+
+def test_taps_left_adjacent_by_evicted_text():
+    u = Updates()
+    first, a, second, b = u.tap("menu_hr"), u.text("196, 70"), u.tap("menu_hr"), u.text("196, 80")
+    assert _collapse(first, a, second, b) == [second, b]
+
+
+def test_text_in_restored_mode():
+    u = Updates()
+    a, b = u.text("196, 70"), u.text("196, 80")
+    assert _collapse(a, b) == [b]
+
+
+def test_navigation_commands_only_when_last():
+    u = Updates()
+    start, tap, text = u.text("/start"), u.tap("menu_hr"), u.text("196, 70")
+    assert _collapse(start, tap, text) == [tap, text]
+    u = Updates()
+    text, help_ = u.text("196, 70"), u.text("/help@athletics_bot")
+    assert _collapse(text, help_) == [text, help_]
+
+
+def test_other_updates_are_kept():
+    u = Updates()
+    doc, cmd, text, doc2 = u.document(), u.text("/stats"), u.text("196"), u.document()
+    poll = u._new(poll={"id": "p"})
+    assert _collapse(doc, cmd, text, doc2, poll) == [doc, cmd, text, doc2, poll]
+
+
+def test_last_inline_query_per_user():
+    u = Updates()
+    q1, q2, other, q3 = u.inline("1"), u.inline("10"), u.inline("5", user=2), u.inline("10км")
+    assert _collapse(q1, q2, other, q3) == [other, q3]
+
+
+def test_users_and_chats_are_independent_and_order_is_kept():
+    u = Updates()
+    a1, b1 = u.text("196, 70", user=1, chat=1), u.text("190, 70", user=2, chat=2)
+    a2 = u.text("196, 80", user=1, chat=1)
+    g1, g2 = u.text("180", user=1, chat=-5), u.text("181", user=2, chat=-5)
+    assert _collapse(a1, b1, a2, g1, g2) == [b1, a2, g1, g2]
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+from types import SimpleNamespace
+
+import main
+
+
+class _File:
+    async def download_to_drive(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("dist;time\n5km;20:00\n")
+
+
+def _upload(file_name: str):
+    """Прогоняет csv_document для документа с именем file_name; возвращает (путь на диске, filename=)."""
+    sent = {}
+
+    async def get_file():
+        return _File()
+
+    async def reply_text(*args, **kwargs):
+        pass
+
+    async def send_document(chat_id, f, filename, **kwargs):
+        sent["path"], sent["filename"] = f.name, filename
+
+    doc = SimpleNamespace(file_name=file_name, file_size=100, get_file=get_file)
+    message = SimpleNamespace(document=doc, caption=None, reply_text=reply_text)
+    update = SimpleNamespace(message=message, effective_chat=SimpleNamespace(id=1))
+    context = SimpleNamespace(bot=SimpleNamespace(send_document=send_document))
+    asyncio.run(main.csv_document(update, context))
+    return sent["path"], sent["filename"]
+
+
+def test_upload_name_does_not_leave_tmp_dir():
+    for name in ("../../tmp/pwn.csv", "/etc/cron.d/x.csv", "..\\..\\x.csv"):
+        path, filename = _upload(name)
+        assert os.path.basename(path) == "out.csv"
+        assert "/" not in filename and "\\" not in filename
+
+
+def test_result_name():
+    assert main._result_name("team.csv") == "team_result.csv"
+    assert main._result_name("../../tmp/pwn.csv") == "pwn_result.csv"
+    assert main._result_name("/etc/cron.d/x.csv") == "x_result.csv"
+    assert main._result_name(None) == "table_result.csv"
+    assert main._result_name("..") == "table_result.csv"
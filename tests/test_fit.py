@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import math
+
+import pytest
+
+import calc.fit
+from answers import answer_lines
+from cache import cache_key
+from calc.fit import fit_riegel, fit_riegel_batch
+from calc.lexer import tokenize
+
+
+def test_batch_shape_matches_for_any_number_of_athletes():
+    row = ([5.0, 10.0, 21.0975], [1140.0, 2400.0, 5280.0])
+    expected = fit_riegel(*row)
+    for n in (1, 3, 4, 5):
+        exp, coef, r2, rmse = fit_riegel_batch([row[0]] * n, [row[1]] * n)
+        assert len(exp) == len(coef) == len(r2) == len(rmse) == n
+        assert math.isclose(float(exp[-1]), expected.exp)
+        assert math.isclose(float(coef[0]), expected.coef)
+
+
+def test_batch_marks_impossible_fit_with_nan():
+    exp, coef, _, _ = fit_riegel_batch([[5.0, 10.0], [5.0]], [[1140.0, 2400.0], [1140.0]])
+    assert math.isfinite(float(exp[0]))
+    assert math.isnan(float(exp[1])) and math.isnan(float(coef[1]))
+
+
+def test_target_label_does_not_depend_on_spelling():
+    # один ключ кэша — один ответ, поэтому подпись цели не может браться из исходного текста
+    a, b = tokenize("5км 19:00, 10км 40:00 -> 15km"), tokenize("5км 19:00, 10км 40:00 -> 15 км")
+    assert cache_key("riegel_fit", a) == cache_key("riegel_fit", b)
+    assert answer_lines("riegel_fit", [a]) == answer_lines("riegel_fit", [b])
+    assert answer_lines("riegel_fit", [a])[0].endswith("• 15 км — 1:01:50 (4:07/км)")
+
+
+def test_implausible_exponent_fails_only_its_line():
+    bad, good = tokenize("1км 3:00, 1.01км 10:00:00"), tokenize("5км 20:00, 10км 41:30")
+    replies = answer_lines("riegel_fit", [bad, good])
+    assert replies[0].startswith("Ошибка: показатель exp=532 вне правдоподобного диапазона")
+    assert replies[1] == answer_lines("riegel_fit", [good])[0]
+    assert "• 10 км — 41:30 (4:09/км)" in replies[1]
+
+
+# спортсмены: подбор есть; результат ≤ 0; одна дистанция; один результат; длины не совпадают; четыре результата
+FIT_DISTS = [[5.0, 10.0, 21.0975], [5.0, 10.0, -1.0], [5.0, 5.0], [5.0], [5.0, 10.0, 21.0975], [1.0, 5.0, 10.0, 42.195]]
+FIT_TIMES = [[1140.0, 2400.0, 5280.0], [1140.0, 2400.0, 100.0], [1140.0, 1150.0], [1140.0], [1140.0, 2400.0],
+             [200.0, 1140.0, 2400.0, 10000.0]]
+
+
+def _fit_columns(monkeypatch, numpy: bool):
+    if not numpy:
+        monkeypatch.setattr(calc.fit, "load_numpy", lambda: None)
+    cols = [[float(v) for v in col] for col in fit_riegel_batch(FIT_DISTS, FIT_TIMES)]
+    monkeypatch.undo()
+    return cols
+
+
+def _same(a, b) -> bool:
+    return all(math.isnan(x) and math.isnan(y) or math.isclose(x, y, rel_tol=1e-9)
+               for col_a, col_b in zip(a, b) for x, y in zip(col_a, col_b))
+
+
+def test_batch_without_numpy_matches_scalar_fit(monkeypatch):
+    exp, coef, r2, rmse = _fit_columns(monkeypatch, numpy=False)
+    for i, (d, t) in enumerate(zip(FIT_DISTS, FIT_TIMES)):
+        try:
+            expected = fit_riegel(d, t)
+        except ValueError:
+            assert all(math.isnan(col[i]) for col in (exp, coef, r2, rmse)), i
+        else:
+            assert _same([[exp[i], coef[i], r2[i], rmse[i]]], [list(expected[:4])]), i
+    assert math.isnan(exp[1])       # [5, 10, -1] / [1140, 2400, 100]: результат ≤ 0 — подбора нет
+
+
+def test_batch_paths_agree(monkeypatch):
+    pytest.importorskip("numpy")
+    assert _same(_fit_columns(monkeypatch, numpy=True), _fit_columns(monkeypatch, numpy=False))
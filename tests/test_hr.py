@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+from answers import answer_lines
+from calc.lexer import tokenize
+
+HRMAX_ERROR = "Не удалось распознать HRmax (>0)."
+
+
+def _answer(text: str) -> str:
+    return answer_lines("hr", [tokenize(text)])[0]
+
+
+def test_garbage_before_hrmax_is_rejected():
+    for text in ("abc, 70", "-196, 70", "x 190, 70", "196: 72", "Иванов: x, 70"):
+        assert _answer(text) == HRMAX_ERROR, text
+
+
+def test_percent():
+    assert _answer("196, 70") == "70% от 196 = 137 уд/мин."
+    assert _answer("196, 72-83").startswith("Диапазон: 141–163 уд/мин")
+
+
+def test_athlete_name_with_colon():
+    assert _answer("Иванов: 196, покой=55") == _answer("196, покой=55")
+    assert _answer("Спортсмен 3: 180") == _answer("180")
+    assert _answer("Иван Петров : пано=172") == _answer("пано=172")
+
+
+def test_zones():
+    assert _answer("196").startswith("Зоны по % от HRmax 196:\nZ1 50–60%: 98–118")
+    assert _answer("196, покой=55").splitlines()[1] == "Z1 50–60%: 126–140 (восстановление)"
+    assert len(_answer("пано=172").splitlines()) == 8
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Сверка с разбором до лексера: обработчики из main.py до перехода на токены, перенесённые
+как чистые функции (текст → ответ или None). Пересчёт /mi в них уже исправлен, как в calc
+(pace_to_sec_per_km), — сравнивается разбор, а не прежняя ошибка с милями.
+Для сообщений, которые понимает прежний разбор, ответ через лексер должен совпадать;
+сообщения, которые он отвергал, лексер тоже отвергает (сообщением об ошибке).
+"""
+from answers import answer_lines
+from calc import (
+    convert_pace_to_speed, convert_speed_to_pace, format_seconds_to_hhmmss, km_to_m, km_to_miles,
+    parse_distance, parse_float, parse_pace, parse_time_to_seconds, pace_to_sec_per_km, riegel,
+    sec_per_km_to_sec_per_mile,
+)
+from calc.lexer import tokenize
+
+
+# -------------------- ПРЕЖНИЙ РАЗБОР --------------------
+def legacy_hr(text):
+    line = text.replace("%", "").replace(" ", "")
+    if "," in line:
+        left, right = line.split(",", 1)
+    elif ";" in line:
+        left, right = line.split(";", 1)
+    else:
+        return None
+    hrmax = parse_float(left)
+    if hrmax is None or hrmax <= 0:
+        return None
+    if "-" in right:
+        p1s, p2s = right.split("-", 1)
+        p1 = parse_float(p1s); p2 = parse_float(p2s)
+        if p1 is None or p2 is None:
+            return None
+        low = int(round(hrmax * min(p1, p2) / 100.0))
+        high = int(round(hrmax * max(p1, p2) / 100.0))
+        return f"Диапазон: {low}–{high} уд/мин (из {p1:.0f}–{p2:.0f}% от {hrmax:.0f})."
+    p1 = parse_float(right)
+    if p1 is None:
+        return None
+    return f"{p1:.0f}% от {hrmax:.0f} = {int(round(hrmax * p1 / 100.0))} уд/мин."
+
+
+def legacy_time_by_pace(text):
+    if "," in text:
+        ds, pace_s = text.split(",", 1)
+    elif ";" in text:
+        ds, pace_s = text.split(";", 1)
+    else:
+        return None
+    dist, pace = parse_distance(ds), parse_pace(pace_s)
+    if dist is None or pace is None:
+        return None
+    return f"Время: {format_seconds_to_hhmmss(pace_to_sec_per_km(*pace) * dist[0])}"
+
+
+def _extract_named(parts, keys):
+    for p in parts:
+        pl = p.lower().strip()
+        for k in keys:
+            if pl.startswith(k):
+                return p.split("=", 1)[1].strip()
+    return None
+
+
+def legacy_calc(text):
+    raw = [t for chunk in text.replace(";", ",").split(",") for t in chunk.strip().split() if t.strip()]
+    dist_tok = _extract_named(raw, ("dist=", "дист=", "distance="))
+    pace_tok = _extract_named(raw, ("pace=", "темп="))
+    time_tok = _extract_named(raw, ("time=", "время=", "t="))
+    if dist_tok is None:
+        for p in raw:
+            if p.lower().endswith(("км", "km", "м", "m", "mi", "mile", "miles")) or p.replace(",", ".").replace(".", "", 1).isdigit():
+                dist_tok = p; break
+    if pace_tok is None:
+        for p in raw:
+            if ":" in p and ("/" in p or "pace" in p.lower() or "темп" in p.lower()):
+                pace_tok = p; break
+    if time_tok is None:
+        for p in raw:
+            if ":" in p and (("pace" not in p.lower()) and ("/" not in p)):
+                time_tok = p; break
+    dist_km = parse_distance(dist_tok)[0] if dist_tok and parse_distance(dist_tok) else None
+    pace_parsed = parse_pace(pace_tok) if pace_tok else None
+    pace_sec = pace_parsed[0] if pace_parsed else None
+    pace_unit = pace_parsed[1] if pace_parsed else "/km"
+    time_sec = parse_time_to_seconds(time_tok) if time_tok else None
+    if sum(x is not None for x in (dist_km, pace_sec, time_sec)) < 2:
+        return None
+    if dist_km is None:
+        dist_km = time_sec / pace_to_sec_per_km(pace_sec, pace_unit)
+        return f"Дистанция: {dist_km:.3f} км ({int(round(km_to_m(dist_km)))} м, {km_to_miles(dist_km):.3f} mi)"
+    if pace_sec is None:
+        sec_per_km = time_sec / dist_km
+        return (f"Темп: {format_seconds_to_hhmmss(sec_per_km)}/км  |  "
+                f"{format_seconds_to_hhmmss(sec_per_km_to_sec_per_mile(sec_per_km))}/mi")
+    return f"Время: {format_seconds_to_hhmmss(pace_to_sec_per_km(pace_sec, pace_unit) * dist_km)}"
+
+
+def legacy_riegel(text):
+    parts = [p.strip() for p in text.replace("→", "->").split("->")]
+    if len(parts) < 2 or ("," not in parts[0] and ";" not in parts[0]):
+        return None
+    ldist_tok, ltime_tok = [x.strip() for x in parts[0].replace(";", ",").split(",", 1)]
+    dist1, t1 = parse_distance(ldist_tok), parse_time_to_seconds(ltime_tok)
+    rparts = [p.strip() for p in parts[1].split(",")]
+    dist2 = parse_distance(rparts[0])
+    if dist1 is None or t1 is None or dist2 is None:
+        return None
+    exp = 1.06
+    for rp in rparts[1:]:
+        if rp.lower().startswith("exp="):
+            maybe = parse_float(rp.split("=", 1)[1])
+            if maybe and 0.9 <= maybe <= 1.2:
+                exp = maybe
+    t2 = riegel(t1, dist1[0], dist2[0], exp)
+    pace2_per_km = t2 / dist2[0]
+    return ("Прогноз:\n"
+            f"• Время: {format_seconds_to_hhmmss(t2)}\n"
+            f"• Темп: {format_seconds_to_hhmmss(pace2_per_km)}/км  |  "
+            f"{format_seconds_to_hhmmss(sec_per_km_to_sec_per_mile(pace2_per_km))}/mi\n"
+            f"(exp={exp:.2f})")
+
+
+def legacy_tread(text):
+    q = text.strip().lower().replace(" ", "")
+    if q.startswith("speed="):
+        val = q.split("=", 1)[1]
+        unit = "kmh"
+        for suffix in ("kmh", "mph", "mps"):
+            if val.endswith(suffix):
+                val, unit = val[:-3], suffix
+                break
+        v = parse_float(val)
+        if v is None or v <= 0:
+            return None
+        return (f"Темп: {format_seconds_to_hhmmss(convert_speed_to_pace(v, unit, '/km'))}/км  |  "
+                f"{format_seconds_to_hhmmss(convert_speed_to_pace(v, unit, '/mi'))}/mi")
+    if q.startswith("pace=") or ":" in q:
+        pace = parse_pace(q.split("=", 1)[1] if q.startswith("pace=") else q)
+        if pace is None:
+            return None
+        return (f"Скорость: {convert_pace_to_speed(*pace, 'kmh'):.2f} км/ч  |  "
+                f"{convert_pace_to_speed(*pace, 'mph'):.2f} mph  |  {convert_pace_to_speed(*pace, 'mps'):.2f} м/с")
+    return None
+
+
+# -------------------- КОРПУС --------------------
+# (режим, прежний разбор, сообщения, которые оба понимают, сообщения, которые оба отвергают)
+CORPUS = [
+    ("hr", legacy_hr,
+     ["196, 70", "196,70%", "196; 72-83", "196, 72% - 83%", "185.5, 65", "200 , 90-95", "196,83-72"],
+     ["abc, 70", "0, 70", "196, x", "196, 70-x"]),
+    ("time_by_pace", legacy_time_by_pace,
+     ["1000м, 4:00", "10km, 4:10/km", "5 км; 3:45/км", "21.1km, 5:00", "1mi, 6:30/mi", "400m, 1:20",
+      "42.195км, 4:15/км", "3000m; 3:20"],
+     ["abc, 4:00", "10км, abc"]),
+    ("calc", legacy_calc,
+     ["dist=10км, pace=3:45", "dist=10km, time=41:30", "pace=4:10/км, time=1:05:00",
+      "дист=5км; темп=4:00", "10км, 41:30", "21.1km, время=1:30:00", "distance=1mi, pace=6:30/mi",
+      "time=41:30, dist=10км", "t=18:45, dist=5km"],
+     ["dist=10км", "pace=4:00", "abc"]),
+    ("riegel", legacy_riegel,
+     ["3000м, 10:00 -> 5000м", "10км, 41:30 → 21.1км", "5km, 18:45 -> 10km, exp=1.07",
+      "10км; 41:30 -> 42.195км, exp=1.10", "1mi, 5:00 -> 3000m", "5km, 18:45 -> 10km, exp=1.5"],
+     ["10км, 41:30", "abc, 41:30 -> 21.1км", "10км, 41:30 -> abc"]),
+    ("tread", legacy_tread,
+     ["speed=12.5kmh", "speed=12.5", "speed = 7.5mph", "speed=3.5mps", "pace=4:48/км", "pace=7:30/mi",
+      "4:10", "PACE=4:00/km", "Speed=10kmh"],
+     ["speed=abc", "speed=0", "pace=abc", "12"]),
+]
+
+
+def test_answers_match_legacy_parsing():
+    for mode, legacy, ok, _ in CORPUS:
+        for text in ok:
+            expected = legacy(text)
+            assert expected is not None, (mode, text)
+            assert answer_lines(mode, [tokenize(text)])[0] == expected, (mode, text)
+
+
+def test_both_reject_malformed_messages():
+    for mode, legacy, _, bad in CORPUS:
+        for text in bad:
+            assert legacy(text) is None, (mode, text)
+            reply = answer_lines(mode, [tokenize(text)])[0]
+            assert not reply.startswith(("Время:", "Темп:", "Дистанция:", "Скорость:", "Прогноз:", "Диапазон:")), \
+                (mode, text, reply)
+            assert "уд/мин." not in reply, (mode, text, reply)
+
+
+def test_space_instead_of_separator_is_accepted():
+    # прежний разбор требовал запятую; лексер делит значения и по пробелу
+    assert legacy_time_by_pace("10км 4:00") is None
+    assert answer_lines("time_by_pace", [tokenize("10км 4:00")]) == [legacy_time_by_pace("10км, 4:00")]
+    assert answer_lines("riegel", [tokenize("10км 41:30 -> 21.1км")]) == [legacy_riegel("10км, 41:30 -> 21.1км")]
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+import io
+import logging
+
+from telegram.error import BadRequest, Forbidden, TimedOut
+
+import main
+from calc import InputError, pace_by_time
+from logs import setup_logging, stop_logging
+
+
+def _classify(e: BaseException) -> str:
+    return main.log_error("Ошибка", e)
+
+
+def test_only_intended_errors_are_expected():
+    try:
+        pace_by_time(600, 0)
+    except InputError as e:
+        assert _classify(e) == "expected"
+    for e in (Forbidden("blocked"), TimedOut()):
+        assert _classify(e) == "expected", e
+    for e in (ValueError("bug"), ZeroDivisionError(), OverflowError(), BadRequest("Can't parse entities")):
+        assert _classify(e) == "exception", e
+
+
+def test_stop_logging_twice():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    out = io.StringIO()
+    try:
+        listener = setup_logging(fmt="text", stream=out, burst=0)
+        logging.getLogger("athletics-bot.test").warning("запись")
+        stop_logging(listener)
+        stop_logging(listener)
+    finally:
+        for h in root.handlers[:]:
+            root.removeHandler(h)
+        for h in handlers:
+            root.addHandler(h)
+        root.setLevel(level)
+    assert "запись" in out.getvalue()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import time
+
+from telegram import Chat, Message, Update
+
+from processing import PerChatUpdateProcessor, update_chat
+
+
+def _update(update_id: int, chat_id: int) -> Update:
+    chat = Chat(chat_id, Chat.PRIVATE)
+    return Update(update_id, message=Message(update_id, datetime.datetime.now(), chat, text="x"))
+
+
+def _run(processor: PerChatUpdateProcessor, updates, delay: float):
+    """Прогоняет апдейты (update_id, chat_id) так же, как PTB: задача на апдейт в порядке прихода."""
+    order, finished = [], {}
+
+    async def handler(update_id: int, chat_id: int) -> None:
+        assert update_chat() == chat_id
+        await asyncio.sleep(delay)
+        order.append((chat_id, update_id))
+        finished[chat_id] = time.perf_counter()
+
+    async def main():
+        t0 = time.perf_counter()
+        await asyncio.gather(*(
+            asyncio.create_task(processor.process_update(_update(u, c), handler(u, c))) for u, c in updates))
+        return {c: t - t0 for c, t in finished.items()}
+
+    return order, asyncio.run(main())
+
+
+def test_chat_order_is_kept():
+    updates = [(i, i % 3) for i in range(30)]
+    order, _ = _run(PerChatUpdateProcessor(4), updates, 0.001)
+    for chat in range(3):
+        assert [u for c, u in order if c == chat] == [u for u, c in updates if c == chat]
+
+
+def test_busy_chat_does_not_hold_slots():
+    processor = PerChatUpdateProcessor(4)
+    updates = [(i, 1) for i in range(8)] + [(100, 2)]
+    _, finished = _run(processor, updates, 0.05)
+    # апдейты первого чата ждут в его очереди, а не на семафоре: второй чат отвечает сразу
+    assert finished[2] < 0.05 * 2
+    assert finished[1] >= 0.05 * 8
+    assert processor.in_flight == 0
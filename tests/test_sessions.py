@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+import time
+
+from persistence import SqliteSessionBackend
+from sessions import SessionStore
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _backend(tmp_path, rows=()):
+    backend = SqliteSessionBackend(str(tmp_path / "sessions.db"))
+    for user_id, mode_code in rows:
+        backend.mark(user_id, mode_code)
+    backend.flush()
+    loads = []
+    load = backend.load
+    backend.load = lambda user_id: loads.append((user_id, threading.current_thread())) or load(user_id)
+    return backend, loads
+
+
+def test_set_get_clear():
+    store = SessionStore()
+    store.set(1, "hr")
+    assert store.get(1) == "hr"
+    store.clear(1)
+    assert store.get(1) is None and 1 not in store
+
+
+def test_ttl_and_limit():
+    clock = _Clock()
+    store = SessionStore(max_entries=2, ttl=10, clock=clock)
+    store.set(1, "hr")
+    clock.now = 11
+    assert store.get(1) is None
+    for user_id in (2, 3, 4):
+        store.set(user_id, "calc")
+    assert len(store) == 2 and store.evictions == 1
+
+
+def test_get_async_reads_backend_off_the_loop_thread(tmp_path):
+    backend, loads = _backend(tmp_path, [(7, 3)])
+    store = SessionStore(backend=backend)
+    assert asyncio.run(store.get_async(7)) == "calc"
+    assert loads[0][1] is not threading.main_thread()
+    assert asyncio.run(store.get_async(7)) == "calc"
+    assert len(loads) == 1
+    backend.close()
+
+
+def test_missing_mode_is_remembered(tmp_path):
+    backend, loads = _backend(tmp_path)
+    store = SessionStore(backend=backend)
+    for _ in range(3):
+        assert asyncio.run(store.get_async(42)) is None
+    assert store.get(42) is None
+    assert len(loads) == 1
+    store.set(42, "hr")
+    assert asyncio.run(store.get_async(42)) == "hr"
+    store.clear(42)
+    assert asyncio.run(store.get_async(42)) is None
+    assert len(loads) == 1
+    backend.close()
+
+
+def test_mode_set_during_load_wins(tmp_path):
+    backend, _ = _backend(tmp_path, [(5, 1)])
+    store = SessionStore(backend=backend)
+    load = backend.load
+
+    def slow_load(user_id):
+        time.sleep(0.05)
+        return load(user_id)
+
+    backend.load = slow_load
+
+    async def main():
+        task = asyncio.create_task(store.get_async(5))
+        await asyncio.sleep(0.01)
+        store.set(5, "splits")
+        return await task
+
+    assert asyncio.run(main()) == "splits"
+    backend.close()
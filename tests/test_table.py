@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+
+from calc.table import process_csv, process_rows
+
+
+def _rows(*rows):
+    return list(process_rows([list(r) for r in rows]))
+
+
+def test_valid_rows():
+    out = _rows(("name", "dist", "time"), ("Иванов", "5km", "20:00"), ("Петров", "10 км", "41:30"))
+    assert out[0][:5] == ["name", "dist", "time", "pace_km", "pace_mi"] and out[0][-1] == "error"
+    assert out[1][3:6] == ["4:00", "6:26", "20:00"] and out[1][-1] == ""
+    assert out[2][3] == "4:09" and out[2][-1] == ""
+    assert all(len(r) == len(out[0]) for r in out)
+
+
+def test_bad_rows_do_not_stop_the_file():
+    out = _rows(("dist", "time"), ("nan", "20:00"), ("inf", "20:00"), ("1e-300", "20:00"),
+                ("5km", "9" * 400), ("0", "20:00"), ("x", "y"), ("5km", "20:00"))
+    errors = [r[-1] for r in out[1:]]
+    assert errors[:2] == ["дистанция или время не распознаны"] * 2
+    assert errors[2] == "значения вне допустимого диапазона"
+    assert errors[3] == "дистанция или время не распознаны"
+    assert errors[4] == "дистанция и время должны быть > 0"
+    assert errors[5] == "дистанция или время не распознаны"
+    assert errors[6] == "" and out[-1][2] == "4:00"
+    assert all(len(r) == len(out[0]) for r in out)
+    assert all(cell == "" for r in out[1:-1] for cell in r[2:-1])
+
+
+def test_pace_and_speed_reject_non_finite():
+    out = _rows(("pace", "dist"), ("nan", "5"), ("4:00", "inf"), ("4:00", "5"))
+    assert out[1][-1] == "темп не распознан"
+    assert out[2][2:] == ["", "15.00", "9.32", ""]
+    assert out[3][2:] == ["20:00", "15.00", "9.32", ""]
+    out = _rows(("speed",), ("9" * 400,), ("12",))
+    assert out[1][-1] == "скорость не распознана" and out[2][1:] == ["5:00", "8:03", ""]
+
+
+def test_semicolon_dialect_and_error_count():
+    src = io.StringIO("Дистанция;Время\n5км;20:00\n\n10км;abc\nnan;20:00\n21,1км;1:30:00\n")
+    dst = io.StringIO()
+    assert process_csv(src, dst) == (4, 2)
+    rows = list(csv.reader(io.StringIO(dst.getvalue()), delimiter=";"))
+    assert rows[0][:4] == ["Дистанция", "Время", "pace_km", "pace_mi"]
+    assert [r[0] for r in rows[1:]] == ["5км", "10км", "nan", "21,1км"]
+    assert rows[1][2] == "4:00" and rows[4][2] == "4:16"
+    assert [bool(r[-1]) for r in rows[1:]] == [False, True, True, False]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Режим вебхука: встроенный HTTP-сервер принимает апдейты от Telegram и кладёт их
+прямо в очередь Application (без long-poll цикла getUpdates).
+Эндпоинты:
+  POST <путь из WEBHOOK_URL> — апдейт; проверяется X-Telegram-Bot-Api-Secret-Token.
+  GET  /healthz             — 200, если Application запущен, иначе 503.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import signal
+from typing import Optional
+from urllib.parse import urlsplit
+
+from telegram import Update
+from telegram.ext import Application
+
+from http_server import Request, Response, start_http_server, text_response
+
+logger = logging.getLogger("athletics-bot.webhook")
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def make_webhook_handler(app: Application, path: str, secret_token: str):
+    """Возвращает HTTP-обработчик, публикующий апдейты в app.update_queue."""
+    secret = secret_token.encode("utf-8")
+
+    async def handle(req: Request) -> Response:
+        if req.path == "/healthz":
+            if req.method not in ("GET", "HEAD"):
+                return text_response(405)
+            return text_response(200, "ok") if app.running else text_response(503, "starting")
+        if req.path != path:
+            return text_response(404)
+        if req.method != "POST":
+            return text_response(405)
+        if not hmac.compare_digest(req.headers.get(SECRET_HEADER, "").encode("utf-8"), secret):
+            return text_response(403)
+        try:
+            update = Update.de_json(json.loads(req.body), app.bot)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Некорректное тело апдейта (%d байт)", len(req.body))
+            return text_response(400)
+        await app.update_queue.put(update)
+        return text_response(200)
+
+    return handle
+
+
+async def run_webhook(app: Application, url: str, secret_token: str,
+                      listen: str = "0.0.0.0", port: int = 8080,
+                      allowed_updates: Optional[list] = None,
+                      stop_event: Optional[asyncio.Event] = None,
+                      register: bool = True) -> None:
+    """Полный жизненный цикл Application в режиме вебхука (аналог run_polling).
+
+    Работает до SIGINT/SIGTERM или до установки stop_event.
+    register=False — вебхук регистрирует кто-то другой (воркер за супервизором, supervisor.py).
+    """
+    path = urlsplit(url).path or "/"
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+    await app.initialize()
+    if app.post_init:
+        await app.post_init(app)
+    server = await start_http_server(make_webhook_handler(app, path, secret_token), listen, port)
+    try:
+        # сначала обработка, потом setWebhook: после перезапуска Telegram уже шлёт накопленные апдейты
+        # на старый (тот же) URL, и ждать ради них ещё один запрос к Bot API незачем
+        await app.start()
+        if register:
+            await app.bot.set_webhook(url=url, secret_token=secret_token,
+                                      allowed_updates=allowed_updates)
+        logger.info("Вебхук слушает %s:%d%s", listen, port, path)
+        await stop_event.wait()
+    finally:
+        server.close()
+        await server.wait_closed()
+        if app.running:
+            await app.stop()
+            if app.post_stop:
+                await app.post_stop(app)
+        await app.shutdown()
+        if app.post_shutdown:
+            await app.post_shutdown(app)